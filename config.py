@@ -6,7 +6,9 @@ MODEL_PATH = os.path.join(BASE_DIR, "data", "models", "best.pt")
 DB_PATH = os.path.join(BASE_DIR, "data", "inventory.db")
 SCANS_DIR = os.path.join(BASE_DIR, "data", "scans")
 CACHE_DIR = os.path.join(BASE_DIR, "data", "cache")
-THUMB_DIR = os.path.join(CACHE_DIR, "thumbnails")
+THUMB_DIR = os.path.join(CACHE_DIR, "thumbnails")   # Legacy loose files, imported into THUMB_STORE_PATH
+THUMB_STORE_PATH = os.path.join(CACHE_DIR, "images.db")
+FINGERPRINT_DB_PATH = os.path.join(CACHE_DIR, "fingerprints.db")
 
 # --- WINDOW SETTINGS ---
 DEFAULT_WINDOW_WIDTH = 1280
@@ -14,6 +16,8 @@ DEFAULT_WINDOW_HEIGHT = 800
 
 # --- OCR SETTINGS ---
 CROP_TITLE_RATIO = 0.15
+# Bottom-left collector line (number / rarity, set code / language) as (x0, y0, x1, y1) ratios
+CROP_SETLINE_BOX = (0.03, 0.91, 0.55, 0.98)
 
 # --- CAMERA SETTINGS ---
 CAMERA_INDEX = 0
@@ -54,10 +58,70 @@ STABILITY_HISTORY_LEN = 10
 API_BASE_URL = "https://api.scryfall.com"
 API_USER_AGENT = "MTGScannerLocal/1.0"
 API_RATE_LIMIT = 1.5      # Seconds between calls (Safe buffer)
+API_RATE_BURST = 4        # Calls allowed back-to-back before API_RATE_LIMIT spacing applies
+API_TIMEOUT = (3.05, 15)  # (Connect, Read) seconds
+API_MAX_RETRIES = 3
+API_BACKOFF_BASE = 1.0    # Seconds; doubles each retry unless the server sends Retry-After
+API_POOL_SIZE = 8         # Keep-alive connections held by the shared session
+COLLECTION_BATCH_SIZE = 75   # Scryfall /cards/collection max identifiers per request
+LOOKUP_BATCH_WINDOW = 0.5    # Seconds of quiet before pending name lookups are sent
+LOOKUP_BATCH_MAX_WAIT = 5.0  # Never hold a pending lookup longer than this
+SEARCH_PAGE_SIZE = 175       # Scryfall /cards/search page length
+
+# --- IMAGE DOWNLOADS ---
+IMAGE_FETCH_WORKERS = 6       # Parallel thumbnail downloads (keep <= API_POOL_SIZE)
+PREFETCH_PRINTINGS = True     # Warm every printing of a card as soon as the Librarian identifies it
+THUMB_STORE_MAX_BYTES = 500 * 1024 * 1024   # LRU eviction above this
+THUMB_STORE_WIDTH = 336       # Matcher thumbnails are downscaled to this width before storing
+THUMB_STORE_QUALITY = 90      # JPEG quality for downscaled thumbnails
+THUMB_STORE_ACCESS_FLUSH = 30 # Seconds LRU access times are buffered before one batched write
+
+# --- RESPONSE CACHE ---
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_PATH = os.path.join(CACHE_DIR, "http_cache.db")
+RESPONSE_CACHE_MAX_BYTES = 200 * 1024 * 1024   # LRU eviction above this
+CACHE_TTL_CARD = 7 * 24 * 3600    # Printing searches (matcher candidates); their prices are not stored
+CACHE_TTL_PRICE = 24 * 3600       # Anything written to the catalog: Scryfall refreshes prices daily
+RESPONSE_CACHE_ACCESS_FLUSH = 30  # Seconds LRU access times are buffered before one batched write
+
+# --- DATABASE ---
+# DBManager keeps one connection per thread in WAL mode
+DB_BUSY_TIMEOUT = 5.0          # Seconds a writer waits on a lock before "database is locked"
+DB_CACHE_SIZE_KB = 16 * 1024   # Page cache per connection
+DB_MMAP_SIZE = 256 * 1024 * 1024
+DB_STATEMENT_CACHE = 256       # Prepared statements kept per connection
+# Librarian intake writes are queued and committed together
+WRITE_BEHIND_ENABLED = True
+WRITE_BEHIND_INTERVAL_MS = 250
+WRITE_BEHIND_MAX_OPS = 500
+# Collection search (FTS5)
+SEARCH_COUNT_MAX = 1000        # Match counts stop here (shown as "1000+"); later pages aren't offered
+COLLECTION_SEARCH_PAGE_SIZE = 60
+LIST_PAGE_SIZE = 120           # Scans per page of the dashboard list view (keyset-paged)
+
+# --- COLLECTION EXPORT / IMPORT ---
+# python tools/export_collection.py / tools/import_collection.py
+EXPORT_BATCH_SIZE = 5000       # Rows fetched per cursor round-trip
+IMPORT_BATCH_SIZE = 5000       # Rows inserted per transaction
+
+# --- LOCAL BULK MIRROR ---
+# Offline copy of Scryfall bulk data. Build/refresh with: python tools/import_bulk.py
+USE_LOCAL_MIRROR = True
+MIRROR_DB_PATH = os.path.join(BASE_DIR, "data", "scryfall.db")
+BULK_DATA_TYPE = "default_cards"   # or "all_cards" (every language, much larger)
+BULK_DOWNLOAD_DIR = os.path.join(CACHE_DIR, "bulk")
+BULK_KEEP_DOWNLOAD = False         # Delete the raw JSON after import
+
+# --- PRICE HISTORY ---
+# Daily snapshots from the bulk mirror: python tools/refresh_prices.py [--download]
+PRICE_REFRESH_BATCH_SIZE = 2000    # Printings priced per transaction
+PRICE_HISTORY_DAYS = 365           # Window of the dashboard's value-over-time chart
+PRICE_HISTORY_POINTS = 40          # Snapshots plotted at most
 
 # --- LOGGING & STATS ---
 STATS_FILE = os.path.join(BASE_DIR, "data", "stats.json")
 LOG_FILE = os.path.join(BASE_DIR, "data", "app.log")
+SUMMARY_RECONCILE_INTERVAL = 300  # Seconds between full recounts of the running collection totals
 
 # --- UI SETTINGS  ---
 WIDGET_WIDTH = 220
@@ -75,6 +139,35 @@ PRICE_ALERTS = {
 # --- MATCHING SETTINGS (NEW) ---
 # Year to prefer if visual matches are identical (Tie-breaker)
 PREFERRED_SET_YEAR = 2015 
-# Minimum visual distance to consider a match "plausible"
+# Hash distance (bits of 256) at which structure evidence is neutral in the confidence score
 HASH_MATCH_THRESHOLD = 30
+# Cascade: how many hash survivors get ORB keypoint verification
+MATCH_TOP_K = 8
+ORB_FEATURES = 500
+ORB_RATIO = 0.75              # Lowe ratio test
+# Logistic weights for match confidence (inliers, inlier margin over runner-up, hash slack).
+# Hand-set, NOT calibrated against labelled scans: the confidence is a heuristic score
+MATCH_CONFIDENCE_COEFS = {"bias": -2.0, "inliers": 1.5, "margin": 1.0, "hash": 1.0}
+# Without this many keypoint inliers the winner is unverified (confidence 0). A RANSAC
+# homography fits any 4 matches, so chance alignments between different art land at
+# 4-8 inliers; the same art typically gives dozens
+MATCH_MIN_INLIERS = 10
+# Inspector / batch identification only write the catalog above this (heuristic) confidence
+MATCH_MIN_CONFIDENCE = 0.5
+
+# --- BATCH PRINTING IDENTIFICATION ---
+# python tools/identify_printings.py, or "Identify All Printings" on the dashboard
+BATCH_ID_WORKERS = max(1, (os.cpu_count() or 2) - 1)  # Matcher processes
+BATCH_ID_QUEUE_PER_WORKER = 2  # Name groups queued ahead per worker (candidates fetched meanwhile)
+
+# --- VISUAL IDENTIFICATION (OCR-free) ---
+# Whole-catalog dHash index. Build with: python tools/build_visual_index.py --download
+VISUAL_ID_ENABLED = True
+VISUAL_INDEX_DIR = os.path.join(BASE_DIR, "data", "visual_index")
+VISUAL_INDEX_PROBE_RADIUS = 2   # Exact recall up to 8 * (radius + 1) - 1 bits
+VISUAL_ID_MAX_DIST = 20         # Bits of 256; farther than this -> OCR
+VISUAL_ID_MIN_GAP = 8           # Top hit must beat the nearest different card by this many bits
+# Stop paging through printings once a candidate is this close (bits of 256) and this colourful
+EARLY_STOP_DISTANCE = 12
+EARLY_STOP_COLOR = 0.9
 
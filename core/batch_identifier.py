@@ -0,0 +1,153 @@
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from itertools import groupby
+import cv2
+from PySide6.QtCore import QThread, Signal
+from data.db_manager import DBManager
+from services.mtg_service import MTGService
+from core.printing_matcher import PrintingMatcher
+import config
+
+# One matcher per worker process (fingerprint store, thumb store, ORB)
+_worker_matcher = None
+
+
+def _match_group(name, candidates, rows):
+    """
+    Worker: matches every scan of one card name against its printings.
+    rows: [(row_id, image_path)]. Returns [(row_id, matched card JSON or None, confidence)].
+    """
+    global _worker_matcher
+    if _worker_matcher is None:
+        _worker_matcher = PrintingMatcher()
+
+    results = []
+    for row_id, path in rows:
+        scan = cv2.imread(path) if path else None
+        if scan is None:
+            logging.warning(f"[BatchID] Could not load image for {name}: {path}")
+            results.append((row_id, None, 0.0))
+            continue
+        best = _worker_matcher.find_best_match(scan, candidates)
+        results.append((row_id, best, _worker_matcher.last_confidence if best else 0.0))
+    return results
+
+
+class BatchIdentifier:
+    """
+    Identifies the printing of every collection row that hasn't been inspected yet.
+    Rows are grouped by card name so each candidate list is fetched (and fingerprinted)
+    once; matching runs in a process pool. Each finished group is written straight
+    to the collection table, so an interrupted run picks up where it stopped.
+    """
+    def __init__(self, workers=None, progress=None):
+        self.db = DBManager()
+        self.api = MTGService()
+        self.matcher = PrintingMatcher() # Parent side: only warms fingerprints
+        self.workers = workers or config.BATCH_ID_WORKERS
+        self.progress = progress # callback(done, total, rows_per_sec)
+        self._stop = False
+
+    def stop(self):
+        """Finish the groups already running, then return. Progress is kept."""
+        self._stop = True
+
+    def run(self, include_unsure=False):
+        """Returns (rows_done, rows_total)."""
+        rows = self.db.get_unidentified_scans(include_unsure)
+        total = len(rows)
+        if not total:
+            logging.info("[BatchID] Nothing to identify")
+            return 0, 0
+
+        groups = [(name, [(r[0], r[2]) for r in grp]) for name, grp in groupby(rows, key=lambda r: r[1])]
+        logging.info(f"[BatchID] {total} scans across {len(groups)} names, {self.workers} workers")
+
+        done = 0
+        start = time.time()
+        max_pending = self.workers * config.BATCH_ID_QUEUE_PER_WORKER
+        pending = set()
+        fresh = {} # scryfall_id -> card JSON with current prices
+
+        def collect(finished):
+            nonlocal done
+            groups_done = []
+            for future in finished:
+                try:
+                    groups_done.append(future.result())
+                except Exception as e:
+                    # Left unchecked: the next run retries this group
+                    logging.error(f"[BatchID] Group failed: {e}")
+            # Candidates come from week-cached search pages; current prices for every
+            # newly matched printing come in one batched lookup
+            matched = [card['id'] for results in groups_done for _, card, confidence in results
+                       if card and confidence >= config.MATCH_MIN_CONFIDENCE and card['id'] not in fresh]
+            if matched: fresh.update(self.api.get_cards_by_ids(matched))
+            for results in groups_done:
+                # Confident matches point the scan at that printing; unsure ones
+                # keep their current printing but are recorded (retry with include_unsure)
+                verdicts = []
+                for row_id, card, confidence in results:
+                    if card and confidence >= config.MATCH_MIN_CONFIDENCE:
+                        card = fresh.setdefault(card['id'], card)
+                        self.db.add_to_catalog(card)
+                        verdicts.append((row_id, card['id'], confidence))
+                    else:
+                        verdicts.append((row_id, None, confidence))
+                self.db.set_scan_printings(verdicts)
+                done += len(results)
+            if self.progress:
+                self.progress(done, total, done / max(time.time() - start, 1e-6))
+
+        # Spawn, not fork: the caller may be a Qt app with live threads
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx) as pool:
+            for name, group_rows in groups:
+                if self._stop: break
+                # Candidates + fingerprints are fetched here while workers match earlier groups
+                candidates = self.api.search_all_printings(name)
+                if candidates is None:
+                    # Offline or server error: left unchecked so the next run retries it
+                    logging.warning(f"[BatchID] Could not fetch printings of {name}, skipping")
+                    continue
+                if not candidates:
+                    self.db.set_scan_printings([(row_id, None, 0.0) for row_id, _ in group_rows])
+                    done += len(group_rows)
+                    continue
+                self.matcher.warm(candidates)
+                pending.add(pool.submit(_match_group, name, candidates, group_rows))
+
+                if len(pending) >= max_pending:
+                    finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(finished)
+
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+
+        elapsed = time.time() - start
+        logging.info(f"[BatchID] Identified {done}/{total} scans in {elapsed:.1f}s ({done / max(elapsed, 1e-6):.1f}/s)")
+        return done, total
+
+
+class BatchIdentifyThread(QThread):
+    # Signal: (Done, Total, RowsPerSecond)
+    progress_signal = Signal(int, int, float)
+    # Signal: (Done, Total)
+    finished_signal = Signal(int, int)
+
+    def __init__(self, include_unsure=False):
+        super().__init__()
+        self.include_unsure = include_unsure
+        self.job = None
+
+    def run(self):
+        self.job = BatchIdentifier(progress=self.progress_signal.emit)
+        done, total = self.job.run(self.include_unsure)
+        self.finished_signal.emit(done, total)
+
+    def stop(self):
+        if self.job: self.job.stop()
+        self.wait()
@@ -0,0 +1,229 @@
+import csv
+import json
+import re
+import time
+import uuid
+import logging
+from datetime import datetime
+import config
+
+# Our own lossless formats: one row per scan
+SCAN_FIELDS = ("tracker_id", "name", "set_code", "set_name", "collector_number", "rarity",
+               "scryfall_id", "price_usd", "date_scanned")
+# Collection-tool formats: one row (or line) per printing with a count
+MOXFIELD_FIELDS = ("Count", "Tradelist Count", "Name", "Edition", "Condition", "Language", "Foil",
+                   "Tags", "Last Modified", "Collector Number", "Alter", "Proxy", "Purchase Price")
+DECKBOX_FIELDS = ("Count", "Tradelist Count", "Name", "Edition", "Edition Code", "Card Number",
+                  "Condition", "Language", "Foil", "My Price")
+FORMATS = ("csv", "jsonl", "moxfield", "deckbox", "arena")
+
+# "4 Lightning Bolt (M10) 146", "1x Sol Ring", "2 Fire // Ice (MH2)"
+ARENA_LINE = re.compile(r"^(\d+)x?\s+(.+?)(?:\s+\(([A-Za-z0-9]+)\)(?:\s+(\S+))?)?\s*$")
+
+
+def _progress(progress, rows, start):
+    if progress: progress(rows, rows / max(time.time() - start, 1e-6))
+
+
+# --- EXPORT ---
+
+def export_collection(db, path, fmt, include_images=False, progress=None):
+    """
+    Streams the collection to `path` in `fmt` (see FORMATS). csv/jsonl write one row per
+    scan (local image paths only with include_images); the collection-tool formats write
+    one row per printing with its count. progress(rows, rows_per_sec) fires every
+    EXPORT_BATCH_SIZE rows. Returns (rows, seconds).
+    """
+    if fmt not in FORMATS: raise ValueError(f"Unknown format: {fmt}")
+    start = time.time()
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt in ("csv", "jsonl"):
+            fields = SCAN_FIELDS + (("local_image_path",) if include_images else ())
+            writer = None
+            if fmt == "csv":
+                writer = csv.DictWriter(f, fields, extrasaction="ignore")
+                writer.writeheader()
+            for scan in db.iter_collection():
+                if writer: writer.writerow(scan)
+                else: f.write(json.dumps({k: scan[k] for k in fields}, ensure_ascii=False) + "\n")
+                rows += 1
+                if rows % config.EXPORT_BATCH_SIZE == 0: _progress(progress, rows, start)
+        else:
+            writer = None
+            if fmt != "arena":
+                writer = csv.DictWriter(f, MOXFIELD_FIELDS if fmt == "moxfield" else DECKBOX_FIELDS)
+                writer.writeheader()
+            reported = 0
+            for count, name, set_code, set_name, number, price in db.iter_printing_counts():
+                set_code = (set_code or "").lower()
+                if fmt == "arena":
+                    f.write(f"{count} {name}" + (f" ({set_code.upper()}) {number or ''}".rstrip() if set_code else "") + "\n")
+                elif fmt == "moxfield":
+                    writer.writerow({"Count": count, "Tradelist Count": 0, "Name": name, "Edition": set_code,
+                                     "Condition": "Near Mint", "Language": "English", "Foil": "", "Tags": "",
+                                     "Last Modified": "", "Collector Number": number or "", "Alter": "False",
+                                     "Proxy": "False", "Purchase Price": ""})
+                else:
+                    writer.writerow({"Count": count, "Tradelist Count": 0, "Name": name, "Edition": set_name or "",
+                                     "Edition Code": set_code, "Card Number": number or "", "Condition": "Near Mint",
+                                     "Language": "English", "Foil": "", "My Price": price if price is not None else ""})
+                rows += count
+                if rows - reported >= config.EXPORT_BATCH_SIZE:
+                    reported = rows
+                    _progress(progress, rows, start)
+    _progress(progress, rows, start)
+    elapsed = time.time() - start
+    logging.info(f"[Export] {rows} rows -> {path} ({fmt}) in {elapsed:.1f}s ({rows / max(elapsed, 1e-6):,.0f}/s)")
+    return rows, elapsed
+
+
+# --- IMPORT ---
+
+def _read_entries(path, fmt):
+    """
+    Yields one dict per input row: count, name, set_code, number, scryfall_id,
+    tracker_id, date_scanned, local_image_path (missing fields None).
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if fmt == "arena":
+            for line in f:
+                m = ARENA_LINE.match(line.strip())
+                if not m: continue # Blank lines, "Deck" / "Sideboard" headers
+                count, name, set_code, number = m.groups()
+                yield {"count": int(count), "name": name, "set_code": set_code, "number": number}
+        elif fmt == "jsonl":
+            for line in f:
+                if not line.strip(): continue
+                row = json.loads(line)
+                yield {"count": 1, "name": row.get("name"), "set_code": row.get("set_code"),
+                       "number": row.get("collector_number"), "scryfall_id": row.get("scryfall_id"),
+                       "tracker_id": row.get("tracker_id"), "date_scanned": row.get("date_scanned"),
+                       "local_image_path": row.get("local_image_path")}
+        else:
+            for row in csv.DictReader(f):
+                if fmt == "csv":
+                    yield {"count": 1, "name": row.get("name"), "set_code": row.get("set_code"),
+                           "number": row.get("collector_number"), "scryfall_id": row.get("scryfall_id"),
+                           "tracker_id": row.get("tracker_id"), "date_scanned": row.get("date_scanned"),
+                           "local_image_path": row.get("local_image_path")}
+                else:
+                    # Moxfield's Edition is the set code; Deckbox's is the set name (code in Edition Code)
+                    set_code = row.get("Edition") if fmt == "moxfield" else row.get("Edition Code")
+                    number = row.get("Collector Number") if fmt == "moxfield" else row.get("Card Number")
+                    yield {"count": int(row.get("Count") or 1), "name": row.get("Name"),
+                           "set_code": set_code, "number": number}
+
+
+class _Resolver:
+    """
+    Maps import entries to printings: by Scryfall ID, else set + collector number,
+    else name (its default printing). Each distinct key is looked up once; printings
+    already in the catalog never leave the database, the rest go through MTGService
+    (local mirror first) and come back as cards to add to the catalog.
+    """
+    def __init__(self, db, api):
+        self.db = db
+        self.api = api
+        self.memo = {} # key -> (scryfall_id, normalized_name) or None
+
+    @staticmethod
+    def key(entry):
+        if entry.get("scryfall_id"): return ("id", entry["scryfall_id"])
+        if entry.get("set_code") and entry.get("number"):
+            return ("set", entry["set_code"].lower(), str(entry["number"]))
+        return ("name", (entry.get("name") or "").strip().lower())
+
+    def resolve(self, entries):
+        """Fills the memo for a batch. Returns the new cards (Scryfall JSON) to catalog."""
+        todo = {}
+        for entry in entries:
+            todo.setdefault(self.key(entry), entry)
+        todo = {k: e for k, e in todo.items() if k not in self.memo}
+        cards = []
+        names = {} # lowercased -> as written, looked up together
+
+        def found(key, card):
+            self.memo[key] = (card['id'], card['name'].lower()) if card else None
+            if card: cards.append(card)
+
+        known = self.db.known_printings(k[1] for k in todo if k[0] == "id")
+        for key, entry in todo.items():
+            if key[0] == "id" and key[1] in known:
+                self.memo[key] = (key[1], known[key[1]])
+                continue
+            card = None
+            if key[0] == "id": card = self.api.get_card_by_id(key[1])
+            elif key[0] == "set": card = self.api.get_card_by_set_number(key[1], key[2])
+            if card:
+                found(key, card)
+                continue
+            name = (entry.get("name") or "").strip()
+            if name and ("name", name.lower()) not in self.memo: names[name.lower()] = name
+
+        if names:
+            by_name, _ = self.api.get_cards_by_names(list(names.values()))
+            for lower in names:
+                found(("name", lower), by_name.get(lower))
+
+        # Entries whose ID / set lookup failed fall back to their name
+        for key, entry in todo.items():
+            if key not in self.memo:
+                self.memo[key] = self.memo.get(("name", (entry.get("name") or "").strip().lower()))
+        return cards
+
+    def printing(self, entry):
+        return self.memo.get(self.key(entry))
+
+
+def import_collection(db, path, fmt, api=None, progress=None):
+    """
+    Streams `path` (see FORMATS) into the collection, IMPORT_BATCH_SIZE entries per
+    transaction. Every copy becomes a new scan (tracker IDs from our own exports are
+    kept, others get an "import-" ID). Entries that match no card, and scans whose
+    tracker ID is already in the collection, are skipped, so re-importing an export
+    into the database it came from changes nothing.
+    progress(rows, rows_per_sec) fires after each batch.
+    Returns (rows_imported, unresolved_entries, seconds).
+    """
+    if fmt not in FORMATS: raise ValueError(f"Unknown format: {fmt}")
+    if api is None:
+        from services.mtg_service import MTGService
+        api = MTGService()
+    resolver = _Resolver(db, api)
+    start = time.time()
+    now = datetime.now().isoformat()
+    imported = 0
+    unresolved = []
+
+    def flush(batch):
+        nonlocal imported
+        cards = resolver.resolve(batch)
+        scans = []
+        for entry in batch:
+            printing = resolver.printing(entry)
+            if not printing:
+                unresolved.append(entry)
+                continue
+            scryfall_id, name = printing
+            for copy in range(entry["count"]):
+                tracker_id = entry.get("tracker_id") if copy == 0 and entry.get("tracker_id") else f"import-{uuid.uuid4().hex[:12]}"
+                scans.append((tracker_id, name, entry.get("date_scanned") or now,
+                              entry.get("local_image_path") or "", scryfall_id))
+        imported += db.import_scans(scans, cards)
+        _progress(progress, imported, start)
+
+    batch = []
+    pending = 0
+    for entry in _read_entries(path, fmt):
+        batch.append(entry)
+        pending += entry["count"]
+        if pending >= config.IMPORT_BATCH_SIZE:
+            flush(batch)
+            batch, pending = [], 0
+    if batch: flush(batch)
+
+    elapsed = time.time() - start
+    logging.info(f"[Import] {imported} rows <- {path} ({fmt}) in {elapsed:.1f}s "
+                 f"({imported / max(elapsed, 1e-6):,.0f}/s), {len(unresolved)} unresolved")
+    return imported, unresolved, elapsed
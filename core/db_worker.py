@@ -0,0 +1,113 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PySide6.QtCore import QObject, Signal
+from data.db_manager import DBManager
+
+
+class DBRequest:
+    """Handle for one queued query. cancel() drops its result (and stops it if running)."""
+    def __init__(self, owner, fn, on_result, on_error, channel):
+        self.owner = owner
+        self.fn = fn
+        self.on_result = on_result
+        self.on_error = on_error
+        self.channel = channel
+        self.future = None
+        self.cancelled = False
+
+    def cancel(self):
+        self.owner.cancel_request(self)
+
+
+class AsyncDB(QObject):
+    """
+    Runs DBManager work on one worker thread and hands results back on the GUI thread.
+    The DBManager, and so any migration it runs, is opened on the worker; fn may read
+    other SQLite stores (e.g. the image store) there too.
+    submit(fn, on_result) calls fn(db) on the worker; on_result(value) then runs on the
+    thread that owns this object. Requests run in submission order, so a write followed
+    by a read sees the write.
+    A request tagged with a channel supersedes the previous one on that channel: a
+    queued one never runs, a running one is interrupted (sqlite3 interrupt()) and its
+    result dropped. cancel() drops every channel-tagged request, e.g. on navigation.
+    Untagged requests (writes) are never cancelled.
+    """
+    # Signal: (DBRequest, Result, Exception or None) - worker -> owner thread
+    _finished_signal = Signal(object, object, object)
+
+    def __init__(self, parent=None, db_path=None):
+        super().__init__(parent)
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="DBWorker")
+        self.lock = threading.Lock()
+        self.db = None       # Built on the worker
+        self.conn = None     # The worker's connection, for interrupt()
+        self.running = None  # DBRequest the worker is executing
+        self.channels = {}   # channel -> latest DBRequest
+        self._closed = False
+        self._finished_signal.connect(self._deliver) # Queued: emitted from the worker
+        self.pool.submit(self._open, db_path)
+
+    def _open(self, db_path):
+        try:
+            self.db = DBManager(db_path)
+            self.conn = self.db._conn()
+        except Exception as e:
+            logging.error(f"[DB] Could not open the database: {e}") # Every request will fail with it
+
+    def submit(self, fn, on_result=None, on_error=None, channel=None):
+        """Queues fn(db). Returns a DBRequest; results of cancelled requests are never delivered."""
+        request = DBRequest(self, fn, on_result, on_error, channel)
+        if channel is not None:
+            previous = self.channels.get(channel)
+            if previous: self.cancel_request(previous)
+            self.channels[channel] = request
+        request.future = self.pool.submit(self._run, request)
+        return request
+
+    def cancel(self, channel=None):
+        """Cancels the request on `channel`, or on every channel."""
+        requests = [self.channels.get(channel)] if channel is not None else list(self.channels.values())
+        for request in requests:
+            if request: self.cancel_request(request)
+
+    def cancel_request(self, request):
+        with self.lock:
+            request.cancelled = True
+            request.future.cancel()
+            if self.channels.get(request.channel) is request:
+                del self.channels[request.channel]
+            # Aborts the statement in progress; SQLite ignores it between statements
+            if self.running is request and self.conn:
+                self.conn.interrupt()
+
+    def _run(self, request):
+        with self.lock:
+            if request.cancelled: return
+            self.running = request
+        result = error = None
+        try:
+            result = request.fn(self.db)
+        except Exception as e:
+            error = e
+        finally:
+            with self.lock:
+                self.running = None
+        self._finished_signal.emit(request, result, error)
+
+    def _deliver(self, request, result, error):
+        if self._closed or request.cancelled: return
+        if self.channels.get(request.channel) is request:
+            del self.channels[request.channel]
+        if error is not None:
+            if request.on_error: request.on_error(error)
+            else: logging.error(f"[DB] Background query failed: {error}")
+        elif request.on_result:
+            request.on_result(result)
+
+    def close(self):
+        """Cancels pending reads, lets queued writes finish, then stops the worker."""
+        self.cancel()
+        self._closed = True
+        self.pool.submit(lambda: self.db and self.db.close())
+        self.pool.shutdown(wait=True)
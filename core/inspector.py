@@ -4,7 +4,9 @@ import time
 from PySide6.QtCore import QThread, Signal
 from data.db_manager import DBManager
 from services.mtg_service import MTGService
+from services.ocr_service import get_ocr_service
 from core.printing_matcher import PrintingMatcher
+import config
 
 class Inspector(QThread):
     # Signal: (TrackerID, NewSetCode, NewPrice)
@@ -14,9 +16,11 @@ class Inspector(QThread):
 
     def __init__(self):
         super().__init__()
-        self.db = DBManager()
-        self.api = MTGService()
-        self.matcher = PrintingMatcher()
+        # Opened in run(): each touches SQLite, which the creating (GUI) thread must not
+        self.db = None
+        self.api = None
+        self.matcher = None
+        self.ocr = None # Shared with the Librarian
         self.queue = [] # List of (tracker_id, card_name, image_path)
         self._run_flag = True
 
@@ -26,6 +30,10 @@ class Inspector(QThread):
 
     def run(self):
         logging.info("Inspector Service Started.")
+        self.db = DBManager()
+        self.api = MTGService()
+        self.matcher = PrintingMatcher()
+        self.ocr = get_ocr_service()
         while self._run_flag:
             if self.queue:
                 tracker_id, name, img_path = self.queue.pop(0)
@@ -39,27 +47,32 @@ class Inspector(QThread):
                     self.status_signal.emit(tracker_id, "Error loading image")
                     continue
 
-                # 2. Fetch Candidates
-                candidates = self.api.search_all_printings(name)
-                if not candidates:
-                    self.status_signal.emit(tracker_id, "No prints found")
-                    continue
-
-                # 3. Visual Match
-                self.status_signal.emit(tracker_id, f"Comparing {len(candidates)} versions...")
-                
-                # This performs the dHash + Color Histogram logic
-                best_match = self.matcher.find_best_match(user_scan, candidates)
+                # 2. Read the collector line: set code + number name the printing exactly
+                best_match = self._resolve_set_line(user_scan, name)
+                if best_match:
+                    confidence = 1.0
+                else:
+                    # 3. Fetch Candidates page by page and match as they arrive
+                    # (dHash + Color Histogram; stops paging on a confident match)
+                    self.status_signal.emit(tracker_id, "Comparing versions...")
+                    best_match = self.matcher.find_best_match_pages(user_scan, self.api.iter_printings(name))
+                    confidence = self.matcher.last_confidence
+                    if best_match:
+                        # Search results can be a week old in the cache; prices come from the short-TTL path
+                        best_match = self.api.get_card_by_id(best_match['id']) or best_match
 
                 # 4. Save Result
-                if best_match:
+                if best_match and confidence < config.MATCH_MIN_CONFIDENCE:
+                    logging.info(f"[Inspector] Best guess {best_match.get('set', '???').upper()} too weak ({confidence:.2f})")
+                    self.status_signal.emit(tracker_id, f"Unsure ({confidence:.0%})")
+                elif best_match:
                     set_code = best_match.get('set', '???').upper()
                     price = best_match.get('prices', {}).get('usd', 'N/A')
                     logging.info(f"[Inspector] Match confirmed: {set_code}")
                     
-                    # Update the Catalog with the SPECIFIC printing details
-                    # (Note: Currently overwrites the default entry for this card name)
+                    # Store the SPECIFIC printing and point this scan (only) at it
                     self.db.add_to_catalog(best_match)
+                    self.db.set_scan_printing(tracker_id, best_match.get('id'), confidence)
                     
                     # Notify UI
                     self.inspection_complete_signal.emit(tracker_id, set_code, str(price))
@@ -68,6 +81,20 @@ class Inspector(QThread):
 
             self.msleep(100)
 
+    def _resolve_set_line(self, user_scan, name):
+        """Printing named by the scan's collector line, or None (unreadable / misread)."""
+        set_code, number, _ = self.ocr.read_set_line(user_scan)
+        if not set_code: return None
+        card = self.api.get_card_by_set_number(set_code, number)
+        if not card: return None
+        # A misread digit can land on a different card; only trust it if the name agrees
+        expected = name.lower().split(' // ')[0].strip()
+        if card.get('name', '').lower().split(' // ')[0].strip() != expected:
+            logging.info(f"[Inspector] {set_code.upper()} #{number} is {card.get('name')}, not {name}")
+            return None
+        logging.info(f"[Inspector] Collector line resolved {name} -> {set_code.upper()} #{number}")
+        return card
+
     def stop(self):
         self._run_flag = False
         self.wait()
\ No newline at end of file
@@ -2,10 +2,12 @@ import os
 import cv2
 import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from PySide6.QtCore import QThread, Signal
 from data.db_manager import DBManager
 from services.mtg_service import MTGService
-from services.ocr_service import OCRService
+from services.ocr_service import get_ocr_service
+from core.printing_matcher import PrintingMatcher
 import config
 
 
@@ -18,33 +20,72 @@ class Librarian(QThread):
 
     def __init__(self):
         super().__init__()
-        self.db = DBManager()
-        self.api = MTGService()
-        self.ocr = OCRService()
+        # Opened in run(): each touches SQLite, which the creating (GUI) thread must not
+        self.db = None
+        self.api = None
+        self.ocr = None
+        self.matcher = None
         self.queue = [] 
+        self.removals = [] # Tracker IDs the GUI asked to delete; run() deletes them
         self._run_flag = True
         self.active_scores = {} # ID -> Best Score (Len * Conf)
+        # Cache-miss names waiting for a bulk lookup: key -> (ocr_text, [(id, img, score, conf, printing)])
+        self.pending_lookups = {}
+        self.pending_since = 0
+        self.pending_last_add = 0
+        self.flushing = {} # The batch _flush_lookups is resolving right now
+        # Background warm-up of printing thumbnails/fingerprints for the Inspector
+        self.prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="PrintingPrefetch")
+        self.prefetched = set()
         os.makedirs(config.SCANS_DIR, exist_ok=True)
 
-    def add_task(self, tracker_id, ocr_text, card_image):
-        self.queue.append((tracker_id, ocr_text, card_image))
+    def add_task(self, tracker_id, ocr_text, card_image, printing_id=""):
+        self.queue.append((tracker_id, ocr_text, card_image, printing_id))
 
     def remove_entry(self, tracker_id):
         logging.info(f"[Librarian] Removing {tracker_id}")
         if tracker_id in self.active_scores:
             del self.active_scores[tracker_id]
-        self.db.delete_scan(tracker_id)
-        
-        # Emit updated stats
+        # Drop its queued reads and parked lookups, or a later flush would save it again
+        self.queue[:] = [task for task in self.queue if task[0] != tracker_id]
+        for _, tasks in list(self.pending_lookups.values()) + list(self.flushing.values()):
+            tasks[:] = [task for task in tasks if task[0] != tracker_id]
+        self.removals.append(tracker_id)
+
+    def _apply_removals(self):
+        while self.removals:
+            self.db.delete_scan(self.removals.pop(0))
+            # Emit updated stats (after the write lands, when batched)
+            if not self.db.writer: self._emit_stats()
+
+    def _emit_stats(self):
         count, val = self.db.get_collection_summary()
         self.collection_stats_signal.emit(count, val)
 
     def run(self):
         logging.info("Librarian Service Started.")
+        self.db = DBManager()
+        self.api = MTGService()
+        self.ocr = get_ocr_service()
+        self.matcher = PrintingMatcher()
+        # Intake writes are batched; totals are re-emitted once each batch lands
+        if config.WRITE_BEHIND_ENABLED:
+            self.db.start_write_behind(on_flush=self._emit_stats)
         run_time = time.time()
+        last_reconcile = time.time()
         while self._run_flag:
+            # Periodic drift correction for the trigger-maintained totals
+            if time.time() - last_reconcile > config.SUMMARY_RECONCILE_INTERVAL:
+                count, total_val = self.db.reconcile_collection_summary()
+                self.collection_stats_signal.emit(count, total_val)
+                last_reconcile = time.time()
+
+            self._apply_removals()
+            if self._lookup_due():
+                self._flush_lookups()
+
             if self.queue:
-                tracker_id, pre_text, card_img = self.queue.pop(0)
+                tracker_id, pre_text, card_img, printing_id = self.queue.pop(0)
                 
                 best_img = card_img 
                 ocr_text = pre_text
@@ -76,42 +117,114 @@ class Librarian(QThread):
                 else:
                     final_card_data = self.db.get_catalog_card(ocr_text)
                     if not final_card_data:
-                        api_result = self.api.get_card_by_name(ocr_text)
-                        if api_result:
-                            self.db.add_to_catalog(api_result)
-                            real_name = api_result['name']
-                            self.db.add_alias(ocr_text, real_name)
-                            final_card_data = self.db.get_catalog_card(real_name)
-                        else:
-                            self.db.add_alias(ocr_text, None)
-                            continue
+                        # Cache miss: park it and resolve in bulk with its neighbours
+                        self._defer_lookup(ocr_text, (tracker_id, best_img, current_score, current_conf, printing_id))
+                        continue
 
                 # --- STEP 4: SAVE ---
                 if final_card_data:
-                    self.active_scores[tracker_id] = current_score
-                    
-                    final_name = final_card_data['display_name']
-                    price_val = final_card_data['price_usd']
-                    price_str = f"${price_val}" if price_val else "N/A"
-                    
-                    timestamp = int(time.time())
-                    safe_name = "".join([c for c in final_name if c.isalnum()])
-                    filename = f"{safe_name}_{timestamp}_{tracker_id}.jpg"
-                    local_path = os.path.join(config.SCANS_DIR, filename)
-                    cv2.imwrite(local_path, best_img)
-                    
-                    self.db.update_scan(tracker_id, final_name, local_path)
-                    
-                    # Update GUI with Confidence
-                    self.card_found_signal.emit(tracker_id, final_name, price_str, local_path, current_conf)
-                    
-                    # Update Stats
-                    count, total_val = self.db.get_collection_summary()
-                    self.collection_stats_signal.emit(count, total_val)
+                    self._save_scan(tracker_id, final_card_data, best_img, current_score, current_conf, printing_id)
                 elapsed = time.time() - run_time
                 logging.info(f"[Librarian] Processed {tracker_id} in {elapsed:.2f}s")
             self.msleep(100)
+        self._apply_removals() # Deletes asked for while stopping
+
+    def _defer_lookup(self, ocr_text, task):
+        key = ocr_text.lower().strip()
+        now = time.time()
+        if not self.pending_lookups: self.pending_since = now
+        self.pending_last_add = now
+        if key not in self.pending_lookups:
+            self.pending_lookups[key] = (ocr_text, [])
+        self.pending_lookups[key][1].append(task)
+
+    def _lookup_due(self):
+        if not self.pending_lookups: return False
+        now = time.time()
+        return (len(self.pending_lookups) >= config.COLLECTION_BATCH_SIZE
+                or now - self.pending_last_add >= config.LOOKUP_BATCH_WINDOW
+                or now - self.pending_since >= config.LOOKUP_BATCH_MAX_WAIT)
+
+    def _flush_lookups(self):
+        """Resolve every parked name: one bulk exact-name request, fuzzy only for the leftovers."""
+        pending = self.flushing = self.pending_lookups
+        self.pending_lookups = {}
+
+        found, missing = self.api.get_cards_by_names([text for text, _ in pending.values()])
+        logging.info(f"[Librarian] Batch resolved {len(found)}/{len(pending)} names exactly")
+
+        for text in missing:
+            api_result = self.api.get_card_by_name(text)
+            if api_result: found[text.lower().strip()] = api_result
+
+        for key, (ocr_text, tasks) in pending.items():
+            api_result = found.get(key)
+            if not api_result:
+                self.db.add_alias(ocr_text, None)
+                continue
+            self.db.add_to_catalog(api_result, as_default=True)
+            real_name = api_result['name']
+            self.db.add_alias(ocr_text, real_name)
+            final_card_data = self.db.get_catalog_card(real_name)
+            if not final_card_data: continue
+            for task in list(tasks):
+                if not any(t is task for t in tasks): continue # Removed while the batch resolved
+                tracker_id, best_img, score, conf, printing_id = task
+                self._save_scan(tracker_id, final_card_data, best_img, score, conf, printing_id)
+        self.flushing = {}
+
+    def _save_scan(self, tracker_id, final_card_data, best_img, current_score, current_conf, printing_id=""):
+        # Re-check the gate: a better read may have landed while this one waited
+        if current_score <= self.active_scores.get(tracker_id, 0.0):
+            return
+        self.active_scores[tracker_id] = current_score
+        if printing_id:
+            final_card_data = self._known_printing(printing_id, final_card_data) or final_card_data
+        
+        final_name = final_card_data['display_name']
+        price_val = final_card_data['price_usd']
+        price_str = f"${price_val}" if price_val else "N/A"
+        
+        timestamp = int(time.time())
+        safe_name = "".join([c for c in final_name if c.isalnum()])
+        filename = f"{safe_name}_{timestamp}_{tracker_id}.jpg"
+        local_path = os.path.join(config.SCANS_DIR, filename)
+        cv2.imwrite(local_path, best_img)
+        
+        self.db.update_scan(tracker_id, final_name, local_path, final_card_data.get('scryfall_id'))
+        self._prefetch_printings(final_name)
+        
+        # Update GUI with Confidence
+        self.card_found_signal.emit(tracker_id, final_name, price_str, local_path, current_conf)
+        
+        # Update Stats (after the write lands, when batched)
+        if not self.db.writer: self._emit_stats()
+
+    def _known_printing(self, printing_id, card_data):
+        """The printing the visual index matched (catalogued on first sight), if it is that card."""
+        printing = self.db.get_printing(printing_id)
+        if not printing:
+            api_result = self.api.get_card_by_id(printing_id)
+            if not api_result: return None
+            self.db.add_to_catalog(api_result)
+            printing = self.db.get_printing(printing_id)
+        if not printing or printing['normalized_name'] != card_data['normalized_name']: return None
+        return printing
+
+    def _prefetch_printings(self, name):
+        """Start downloading/fingerprinting every printing of a newly seen card (once per session)."""
+        if not config.PREFETCH_PRINTINGS or name in self.prefetched: return
+        self.prefetched.add(name)
+
+        def job():
+            try:
+                self.matcher.warm(self.api.search_all_printings(name) or [])
+            except Exception as e:
+                logging.warning(f"[Librarian] Prefetch failed for {name}: {e}")
+        self.prefetch_pool.submit(job)
 
     def stop(self):
         self._run_flag = False
-        self.wait()
\ No newline at end of file
+        self.wait()
+        if self.db: self.db.stop_write_behind() # Flush barrier: nothing queued is lost on exit
+        self.prefetch_pool.shutdown(wait=False, cancel_futures=True)
\ No newline at end of file
@@ -0,0 +1,48 @@
+import time
+import logging
+from datetime import date
+import config
+from data.bulk_mirror import BulkMirror
+
+
+def snapshot_day(mirror, bulk_type=None):
+    """The day the mirror's prices are from: its bulk file's updated_at, else today."""
+    updated_at = mirror.get_meta(f"{bulk_type or config.BULK_DATA_TYPE}_updated_at")
+    try:
+        return date.fromisoformat(updated_at[:10]) if updated_at else date.today()
+    except ValueError:
+        return date.today()
+
+
+def refresh_prices(db, mirror=None, download=False, progress=None):
+    """
+    Prices every catalogued printing from the local bulk mirror, PRICE_REFRESH_BATCH_SIZE
+    printings per transaction, then records the catalog as the price_history snapshot
+    for the mirror's day, and the collection's value as today's for the dashboard chart
+    (a stale mirror must not overwrite an old day's value with today's collection).
+    No per-card API calls: with download the bulk file is fetched first
+    (skipped when Scryfall's hasn't changed). Printings missing from the mirror keep,
+    and are snapshotted at, their last price.
+    progress(done, rows_per_sec) fires after each batch.
+    Returns (printings_recorded, prices_changed, seconds).
+    """
+    mirror = mirror or BulkMirror()
+    if download:
+        from services.bulk_service import BulkDataService
+        BulkDataService(mirror).refresh()
+    if not mirror.is_populated():
+        raise RuntimeError("Bulk mirror is empty: run tools/import_bulk.py first")
+
+    day = snapshot_day(mirror)
+    start = time.time()
+    recorded = changed = 0
+    for ids in db.iter_catalog_ids():
+        prices = mirror.get_prices(ids)
+        changed += db.record_prices([(sid, usd, foil) for sid, (usd, foil) in prices.items()])
+        recorded += len(prices)
+        if progress: progress(recorded, recorded / max(time.time() - start, 1e-6))
+    db.snapshot_prices(day, value_day=date.today())
+
+    elapsed = time.time() - start
+    logging.info(f"[Prices] Snapshot {day}: {recorded} printings, {changed} changed in {elapsed:.1f}s")
+    return recorded, changed, elapsed
@@ -1,23 +1,40 @@
 import cv2
 import numpy as np
-import os
-import requests
 import logging
 import config
+from data.fingerprint_store import FingerprintStore
+from services.image_fetcher import get_fetcher
+from core.visual_index import dhash_bits
+
+# Set bits per byte value, for XOR + popcount Hamming distance on packed hashes
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
 
 class PrintingMatcher:
     """
     Engine for identifying the specific printing (Set/Edition) of a card
     by comparing a local image against a list of Scryfall thumbnails.
     
-    Uses two metrics:
-    1. Structure: dHash (Difference Hash) 16x16.
-    2. Color: HSV Histogram Correlation.
+    Coarse-to-fine cascade:
+    1. Structure + Color: dHash (16x16) and HSV Histogram Correlation over every
+       candidate, computed once per printing and kept in a FingerprintStore.
+    2. The top MATCH_TOP_K survivors are verified with ORB keypoints restricted
+       to the art box and set symbol, where reprints actually differ.
+    3. A confidence (0-1) for the winner is left in self.last_confidence.
     """
+    # Scryfall 'normal' image size; scans are histogrammed at this size
+    REF_SIZE = (488, 680)
+    # Both images are brought to the stored thumbnail size before keypoint matching
+    VERIFY_SIZE = (336, 468)
+    # Regions as card fractions (x1, y1, x2, y2): illustration, and set symbol at the end of the type line
+    ART_BOX = (0.08, 0.11, 0.92, 0.56)
+    SET_SYMBOL_BOX = (0.80, 0.55, 0.95, 0.63)
     
     def __init__(self):
-        self.cache_dir = config.THUMB_DIR
-        os.makedirs(self.cache_dir, exist_ok=True)
+        self.store = FingerprintStore()
+        self.fetcher = get_fetcher()
+        self.orb = cv2.ORB_create(nfeatures=config.ORB_FEATURES)
+        self.bf = cv2.BFMatcher(cv2.NORM_HAMMING)
+        self.last_confidence = 0.0
 
     def _dhash(self, image, hash_size=16):
         """
@@ -25,66 +42,63 @@ class PrintingMatcher:
         Returns a flattened boolean array (256 bits).
         """
         try:
-            # 1. Grayscale
-            if len(image.shape) == 3:
-                gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            else:
-                gray = image
-
-            # 2. Resize to (width+1, height)
+            # Grayscale -> Resize to (width+1, height) -> gradients (True if col[x] > col[x+1])
             # We use 16x16 for higher fidelity than the standard 8x8
-            resized = cv2.resize(gray, (hash_size + 1, hash_size))
-
-            # 3. Compute gradients (True if col[x] > col[x+1])
-            diff = resized[:, 1:] > resized[:, :-1]
-
-            return diff.flatten()
+            return dhash_bits(image, hash_size)
         except Exception as e:
             logging.error(f"Hashing failed: {e}")
             return None
 
-    def _color_hist_score(self, img1, img2):
+    def _hs_hist(self, image):
         """
-        Compare HSV color histograms.
-        Returns correlation float: 1.0 (Identical) to 0.0 (Different).
+        Normalized HSV histogram over Hue (color) and Saturation (intensity).
+        Value (Brightness) is ignored to handle lighting differences.
         """
-        #try:
-        hsv1 = cv2.cvtColor(img1, cv2.COLOR_BGR2HSV)
-        hsv2 = cv2.cvtColor(img2, cv2.COLOR_BGR2HSV)
-
-        # Calculate Hist for Hue (color) and Saturation (intensity)
-        # Ignore Value (Brightness) to handle lighting differences
-        hist1 = cv2.calcHist([hsv1], [0, 1], None, [30, 32], [0, 180, 0, 256])
-        hist2 = cv2.calcHist([hsv2], [0, 1], None, [30, 32], [0, 180, 0, 256])
-
-        cv2.normalize(hist1, hist1, 0, 1, cv2.NORM_MINMAX)
-        cv2.normalize(hist2, hist2, 0, 1, cv2.NORM_MINMAX)
-
-        score = cv2.compareHist(hist1, hist2, cv2.HISTCMP_CORREL)
-        return max(0.0, score)
-        # except:
-        #     return 0.0
-
-    def _download_thumb(self, url, card_id):
-        """Lazy download of small thumbnails for matching"""
-        if not url: return None
-        
-        # Use card_id to ensure uniqueness
-        path = os.path.join(self.cache_dir, f"{card_id}_small.jpg")
-        
-        if os.path.exists(path):
-            return cv2.imread(path)
-            
-        try:
-            resp = requests.get(url, headers={"User-Agent": config.API_USER_AGENT})
-            if resp.status_code == 200:
-                with open(path, 'wb') as f:
-                    f.write(resp.content)
-                arr = np.frombuffer(resp.content, np.uint8)
-                return cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        except Exception as e:
-            logging.warning(f"Thumbnail download failed: {e}")
-        return None
+        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        hist = cv2.calcHist([hsv], [0, 1], None, [30, 32], [0, 180, 0, 256])
+        cv2.normalize(hist, hist, 0, 1, cv2.NORM_MINMAX)
+        return hist
+
+    def _hist_correl_many(self, hist, hist_matrix):
+        """
+        HISTCMP_CORREL of one histogram against every row of hist_matrix at once.
+        Returns an array of correlations clipped to 0.0 - 1.0.
+        """
+        h = hist.ravel().astype(np.float64)
+        h = h - h.mean()
+        m = hist_matrix.astype(np.float64)
+        m = m - m.mean(axis=1, keepdims=True)
+        denom = np.sqrt((h * h).sum() * (m * m).sum(axis=1))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = np.where(denom > 0, (m @ h) / denom, 0.0)
+        return np.clip(corr, 0.0, 1.0)
+
+    def _fingerprints(self, candidates):
+        """
+        Stored (packed dHash, H-S hist) for each candidate printing.
+        Printings seen for the first time are downloaded, fingerprinted and stored
+        (in one transaction for the whole list).
+        """
+        ids = [c['id'] for c in candidates if c.get('image_uris')]
+        prints = self.store.get_many(ids)
+
+        # Download every missing thumbnail in parallel, then fingerprint as they land
+        missing = [c for c in candidates if c.get('image_uris') and c['id'] not in prints]
+        futures = self.fetcher.prefetch(missing)
+        new_rows = []
+        for card in missing:
+            future = futures.get(card['id'])
+            key = future.result() if future else None
+            # Half-resolution decode is plenty for a 16x16 hash and a colour histogram
+            ref_img = self.fetcher.store.load(key, reduce=2) if key else None
+            if ref_img is None: continue
+            ref_hash = self._dhash(ref_img, 16)
+            if ref_hash is None: continue
+            ref_hist = self._hs_hist(ref_img)
+            new_rows.append((card['id'], ref_hash, ref_hist))
+            prints[card['id']] = (np.packbits(ref_hash), ref_hist.ravel())
+        self.store.put_many(new_rows)
+        return prints
 
     def _get_year_delta(self, date_str):
         """Calculates year distance from user's preference"""
@@ -94,89 +108,184 @@ class PrintingMatcher:
         except:
             return 999
 
-    def find_best_match(self, user_scan, candidates):
-        """
-        Compares user_scan against a list of Scryfall candidates.
-        """
-        if not candidates: return None
-
-        # 1. Compute Hash for User Scan (Check 0 and 180 rotations)
-        # Scan might be upside down relative to Scryfall
-        hash_0 = self._dhash(user_scan, 16)
-        
-        # We also rotate the scan 180 to check
+    def _prepare_scan(self, user_scan):
+        """Hashes for the scan in both orientations (scan might be upside down relative to Scryfall)."""
         scan_180 = cv2.rotate(user_scan, cv2.ROTATE_180)
+        hash_0 = self._dhash(user_scan, 16)
         hash_180 = self._dhash(scan_180, 16)
+        return {
+            'scan_0': user_scan,
+            'scan_180': scan_180,
+            'features': {}, # Orientation -> ORB features, filled on demand
+            'packed': np.stack([np.packbits(hash_0), np.packbits(hash_180)]), # (2, 32)
+            # Rotation doesn't change a histogram, so one serves both orientations
+            'hist': self._hs_hist(cv2.resize(user_scan, self.REF_SIZE))
+        }
 
-        scored = []
-        logging.info(f"[Inspector] Matching {len(candidates)} prints...")
+    def _score_candidates(self, scan, candidates):
+        """Scores a list of candidate printings against a prepared scan."""
+        prints = self._fingerprints(candidates)
+        # No image (e.g. some Double Faced) or download failed
+        cards = [c for c in candidates if c['id'] in prints]
+        if not cards: return []
 
-        for card in candidates:
-            # Safety checks
-            uris = card.get('image_uris')
-            if not uris: continue # Some cards (Double Faced) handle uris differently, ignore for now
-            
-            thumb_url = uris.get('normal')
-            ref_img = self._download_thumb(thumb_url, card['id'])
-            if ref_img is None: continue
+        # Candidate set as matrices: (N, 32) packed hashes, (N, 960) histograms
+        hashes = np.stack([prints[c['id']][0] for c in cards])
+        hists = np.stack([prints[c['id']][1] for c in cards])
 
-            # A. Structural Match (dHash)
-            ref_hash = self._dhash(ref_img, 16)
-            
-            dist_0 = np.count_nonzero(hash_0 != ref_hash)
-            dist_180 = np.count_nonzero(hash_180 != ref_hash)
-            
-            # Pick best orientation
-            if dist_0 < dist_180:
-                dist = dist_0
-                scan_aligned = user_scan
-            else:
-                dist = dist_180
-                scan_aligned = scan_180
-
-            # B. Color Match (Histogram)
-            # Only perform CPU-heavy color check if structure is plausible
-            color_score = 0.0
-            # if dist < 60: # 60 bits diff out of 256 is roughly 25% difference
-            #     # Resize scan to match ref for fair histogram comparison
-            h, w = ref_img.shape[:2]
-            scan_resized = cv2.resize(scan_aligned, (w, h))
-            color_score = self._color_hist_score(scan_resized, ref_img)
+        # A. Structural Match (dHash): XOR + popcount for both orientations, keep the best
+        both = POPCOUNT[hashes[None, :, :] ^ scan['packed'][:, None, :]].sum(axis=2, dtype=np.int32)
+        rotated = both[1] < both[0]
+        dists = both.min(axis=0)
 
-            # C. Era Preference
-            year_delta = self._get_year_delta(card.get('released_at', '0000'))
+        # B. Color Match (Histogram): one matrix-vector correlation
+        colors = self._hist_correl_many(scan['hist'], hists)
 
-            # D. Weighted Score
-            # Structure (Dist) is dominant. Lower is better.
-            # Color is secondary. Higher (0.0-1.0) is better.
-            # We subtract color score * weight from distance to let color "heal" structure gaps.
-            # Weight 25: A perfect color match (1.0) reduces distance score by 25.
-            final_score = dist - (color_score * 25)
+        # D. Weighted Score
+        # Structure (Dist) is dominant. Lower is better.
+        # Color is secondary. Higher (0.0-1.0) is better.
+        # We subtract color score * weight from distance to let color "heal" structure gaps.
+        # Weight 25: A perfect color match (1.0) reduces distance score by 25.
+        final_scores = dists - (colors * 25)
 
+        scored = []
+        for card, final_score, dist, color_score, flip in zip(cards, final_scores, dists, colors, rotated):
+            # C. Era Preference
+            year_delta = self._get_year_delta(card.get('released_at', '0000'))
             scored.append({
                 'card': card,
-                'score': final_score,
-                'dist': dist,
-                'color': color_score,
+                'score': float(final_score),
+                'dist': int(dist),
+                'color': float(color_score),
                 'year': year_delta,
+                'rotated': bool(flip),
+                'inliers': 0,
                 'set': card.get('set')
             })
+        return scored
+
+    def _region_mask(self, shape):
+        h, w = shape[:2]
+        mask = np.zeros((h, w), dtype=np.uint8)
+        for x1, y1, x2, y2 in (self.ART_BOX, self.SET_SYMBOL_BOX):
+            mask[int(y1 * h):int(y2 * h), int(x1 * w):int(x2 * w)] = 255
+        return mask
+
+    def _orb_features(self, image):
+        """ORB keypoints/descriptors inside the art box and set symbol only."""
+        gray = cv2.cvtColor(cv2.resize(image, self.VERIFY_SIZE), cv2.COLOR_BGR2GRAY)
+        return self.orb.detectAndCompute(gray, self._region_mask(gray.shape))
+
+    def _count_inliers(self, feats_a, feats_b):
+        """Ratio-tested matches that survive a RANSAC homography. 0 if there's nothing to go on."""
+        kp_a, des_a = feats_a
+        kp_b, des_b = feats_b
+        if des_a is None or des_b is None or len(des_a) < 2 or len(des_b) < 2: return 0
+
+        good = []
+        for pair in self.bf.knnMatch(des_a, des_b, k=2):
+            if len(pair) == 2 and pair[0].distance < config.ORB_RATIO * pair[1].distance:
+                good.append(pair[0])
+        if len(good) < 4: return 0
 
-        # Sort: 
+        src = np.float32([kp_a[m.queryIdx].pt for m in good]).reshape(-1, 1, 2)
+        dst = np.float32([kp_b[m.trainIdx].pt for m in good]).reshape(-1, 1, 2)
+        _, mask = cv2.findHomography(src, dst, cv2.RANSAC, 5.0)
+        return int(mask.sum()) if mask is not None else 0
+
+    def _verify(self, scan, survivors):
+        """Stage 2: keypoint verification of the hash survivors (fills 'inliers')."""
+        futures = self.fetcher.prefetch([s['card'] for s in survivors])
+        for res in survivors:
+            future = futures.get(res['card']['id'])
+            key = future.result() if future else None
+            ref_img = self.fetcher.store.load(key) if key else None
+            if ref_img is None: continue
+
+            orient = 'scan_180' if res['rotated'] else 'scan_0'
+            if orient not in scan['features']:
+                scan['features'][orient] = self._orb_features(scan[orient])
+            res['inliers'] = self._count_inliers(scan['features'][orient], self._orb_features(ref_img))
+
+    def _confidence(self, winner, runner_up):
+        """
+        Logistic over: keypoint inliers, inlier margin over the runner-up, and how far
+        the hash distance is below HASH_MATCH_THRESHOLD (the point where hash evidence is neutral).
+        Coefficients live in config.MATCH_CONFIDENCE_COEFS. They are hand-set, not fitted
+        to labelled scans, so this is a heuristic score rather than a probability; a winner
+        without MATCH_MIN_INLIERS keypoint inliers scores 0 however close its hash is.
+        """
+        if winner['inliers'] < config.MATCH_MIN_INLIERS: return 0.0
+        c = config.MATCH_CONFIDENCE_COEFS
+        inliers = min(winner['inliers'], 50)
+        margin = inliers - min(runner_up['inliers'], 50) if runner_up else inliers
+        z = (c['bias']
+             + c['inliers'] * inliers / 10.0
+             + c['margin'] * margin / 10.0
+             + c['hash'] * (config.HASH_MATCH_THRESHOLD - winner['dist']) / 10.0)
+        return float(1.0 / (1.0 + np.exp(-z)))
+
+    def _pick_winner(self, scan, scored):
+        # Stage 1 sort: 
         # 1. Final Weighted Score (Lower is better)
         # 2. Year Delta (Closest to 2015 wins ties)
         scored.sort(key=lambda x: (x['score'], x['year']))
 
+        self.last_confidence = 0.0
         if not scored: return None
+
+        # Stage 2: only the survivors pay for keypoint matching
+        survivors = scored[:config.MATCH_TOP_K]
+        self._verify(scan, survivors)
+        # Geometry decides; the hash score only breaks ties (year last)
+        survivors.sort(key=lambda x: (-x['inliers'], x['score'], x['year']))
         
-        winner = scored[0]
+        winner = survivors[0]
+        runner_up = survivors[1] if len(survivors) > 1 else None
+        self.last_confidence = self._confidence(winner, runner_up)
         
         # Logging top 3 for debugging
-        for i, res in enumerate(scored[:3]):
-            logging.info(f"   #{i+1} {res['set'].upper()}: Score {res['score']:.1f} (Dist {res['dist']} | Color {res['color']:.2f})")
-
-        # Threshold check? 
-        # Even if the best match is bad, we usually return it as the "best guess" 
-        # but mark it if it's very weak.
+        for i, res in enumerate(survivors[:3]):
+            logging.info(f"   #{i+1} {res['set'].upper()}: Inliers {res['inliers']} | Score {res['score']:.1f} (Dist {res['dist']} | Color {res['color']:.2f})")
+        logging.info(f"   Confidence {self.last_confidence:.2f}")
         
-        return winner['card']
\ No newline at end of file
+        return winner['card']
+
+    def warm(self, candidates):
+        """Fingerprint printings ahead of time so a later inspection is pure lookup."""
+        prints = self._fingerprints(candidates)
+        logging.info(f"[Matcher] Warmed {len(prints)} printings")
+        return len(prints)
+
+    def find_best_match(self, user_scan, candidates):
+        """
+        Compares user_scan against a list of Scryfall candidates.
+        """
+        if not candidates: return None
+
+        scan = self._prepare_scan(user_scan)
+        logging.info(f"[Inspector] Matching {len(candidates)} prints...")
+        return self._pick_winner(scan, self._score_candidates(scan, candidates))
+
+    def find_best_match_pages(self, user_scan, pages):
+        """
+        Same as find_best_match, but consumes candidates page by page
+        (e.g. MTGService.iter_printings) and stops fetching once a page
+        produces a confident match.
+        """
+        scan = None
+        scored = []
+        seen = 0
+        for page in pages:
+            if scan is None: scan = self._prepare_scan(user_scan)
+            scored.extend(self._score_candidates(scan, page))
+            seen += len(page)
+            confident = [s for s in scored
+                         if s['dist'] <= config.EARLY_STOP_DISTANCE and s['color'] >= config.EARLY_STOP_COLOR]
+            if confident:
+                logging.info(f"[Inspector] Confident match after {seen} prints, skipping the rest")
+                if hasattr(pages, 'close'): pages.close()
+                break
+
+        logging.info(f"[Inspector] Matched against {seen} prints")
+        return self._pick_winner(scan, scored)
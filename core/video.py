@@ -5,6 +5,7 @@ import numpy as np
 from core.detector import CardDetector
 from core.tracker import CentroidTracker
 from core.image_processor import ImageProcessor
+from core.visual_index import VisualIndex
 import config
 
 class VideoThread(QThread):
@@ -12,8 +13,9 @@ class VideoThread(QThread):
     change_pixmap_signal = Signal(np.ndarray)
     # Signal to tell the GUI which Cards are currently active (for Widgets)
     tracker_ids_signal = Signal(list)
-    # Signal to ask Librarian to identify a card: (TrackerID, EmptyText, WarpedImage)
-    scan_request_signal = Signal(str, str, np.ndarray)
+    # Signal to ask Librarian to identify a card:
+    # (TrackerID, KnownName or "" for OCR, WarpedImage, KnownPrintingID or "")
+    scan_request_signal = Signal(str, str, np.ndarray, str)
     # Signal for debug text overlay
     debug_info_signal = Signal(str)
     # Objects Seen Signal
@@ -25,6 +27,9 @@ class VideoThread(QThread):
         self.detector = None 
         self.tracker = CentroidTracker() 
         self.image_processor = ImageProcessor()
+        self.visual_index = None
+        if config.VISUAL_ID_ENABLED:
+            self.visual_index = VisualIndex().load()
 
     def run(self):
         # Initialize Camera
@@ -79,8 +84,16 @@ class VideoThread(QThread):
                             box = self.tracker.bboxes[objectID]
                             # Warp the card to flat view
                             warped_img = self.image_processor.process_card(frame, box)
+                            # Try the whole-catalog visual index first; OCR only if it's unsure
+                            name, printing_id = "", ""
+                            if self.visual_index:
+                                hit = self.visual_index.identify(warped_img)
+                                if hit:
+                                    name, printing_id = hit['name'], hit['id']
+                                    if hit['orientation'] == 1:
+                                        warped_img = cv2.rotate(warped_img, cv2.ROTATE_180)
                             # Send to Librarian (Empty text = "Please read this")
-                            self.scan_request_signal.emit(objectID, "", warped_img)
+                            self.scan_request_signal.emit(objectID, name, warped_img, printing_id)
 
                 # --- 3. DEBUG VISUALIZATION ---
                 # Build debug string
@@ -0,0 +1,186 @@
+import os
+import json
+import itertools
+import logging
+import cv2
+import numpy as np
+import config
+
+HASH_BYTES = 32          # 256-bit dHash, packed
+CHUNKS = 8               # Multi-index hashing: 8 substrings of 32 bits
+CHUNK_BYTES = HASH_BYTES // CHUNKS
+
+# Set bits per byte value, for XOR + popcount Hamming distance on packed hashes
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def dhash_bits(image, hash_size=16):
+    """
+    16x16 Difference Hash as a flat boolean array (256 bits).
+    Same algorithm PrintingMatcher fingerprints are built with.
+    """
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if len(image.shape) == 3 else image
+    resized = cv2.resize(gray, (hash_size + 1, hash_size))
+    return (resized[:, 1:] > resized[:, :-1]).flatten()
+
+
+def _chunk_keys(packed):
+    """(N, 32) uint8 -> (CHUNKS, N) uint32 substring keys."""
+    return np.ascontiguousarray(packed).view('>u4').reshape(-1, CHUNKS).T.astype(np.uint32)
+
+
+def _probe_masks(radius):
+    """All 32-bit XOR masks with at most `radius` bits set."""
+    masks = [0]
+    for r in range(1, radius + 1):
+        for bits in itertools.combinations(range(32), r):
+            m = 0
+            for b in bits: m |= 1 << b
+            masks.append(m)
+    return np.array(masks, dtype=np.uint32)
+
+
+class VisualIndex:
+    """
+    Nearest-neighbour index over the dHash of every paper printing.
+    Multi-index hashing: the 256-bit hash is cut into 8 substrings, each with its
+    own sorted key table. By pigeonhole, any printing within distance D shares at
+    least one substring within floor(D / 8) bits, so probing each table with every
+    key within `radius` bits finds all matches up to 8 * (radius + 1) - 1 bits.
+    Tables are .npy files opened memory-mapped, so loading is near-instant.
+    """
+    def __init__(self, index_dir=None):
+        self.index_dir = index_dir or config.VISUAL_INDEX_DIR
+        self.hashes = None
+        self.radius = config.VISUAL_INDEX_PROBE_RADIUS
+        self.masks = {self.radius: _probe_masks(self.radius)} # Probe radius -> XOR masks
+
+    @staticmethod
+    def recall(radius):
+        """Distance up to which probing at `radius` is guaranteed to find every printing."""
+        return CHUNKS * (radius + 1) - 1
+
+    def _masks(self, radius):
+        if radius not in self.masks: self.masks[radius] = _probe_masks(radius)
+        return self.masks[radius]
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def exists(self):
+        return os.path.exists(self._path("meta.json"))
+
+    # --- BUILD ---
+
+    def build(self, entries):
+        """
+        entries: iterable of (scryfall_id, name, packed_hash uint8[32]).
+        Writes the index files. Returns number of printings indexed.
+        """
+        ids, name_idx, hashes = [], [], []
+        names, name_pos = [], {}
+        for sid, name, packed in entries:
+            if name not in name_pos:
+                name_pos[name] = len(names)
+                names.append(name)
+            ids.append(sid)
+            name_idx.append(name_pos[name])
+            hashes.append(np.asarray(packed, dtype=np.uint8))
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        hashes = np.stack(hashes) if hashes else np.zeros((0, HASH_BYTES), dtype=np.uint8)
+        keys = _chunk_keys(hashes)
+        perm = np.argsort(keys, axis=1, kind='stable').astype(np.int32)
+        sorted_keys = np.take_along_axis(keys, perm, axis=1)
+
+        np.save(self._path("hashes.npy"), hashes)
+        np.save(self._path("ids.npy"), np.array(ids, dtype='S36'))
+        np.save(self._path("name_idx.npy"), np.array(name_idx, dtype=np.int32))
+        np.save(self._path("keys.npy"), sorted_keys)
+        np.save(self._path("perm.npy"), perm)
+        with open(self._path("names.json"), 'w', encoding='utf-8') as f:
+            json.dump(names, f)
+        # Written last: its presence marks a complete index
+        with open(self._path("meta.json"), 'w') as f:
+            json.dump({"count": len(ids), "chunks": CHUNKS}, f)
+
+        logging.info(f"[VisualIndex] Built index of {len(ids)} printings ({len(names)} names)")
+        return len(ids)
+
+    # --- QUERY ---
+
+    def load(self):
+        """Memory-maps the index files. Returns self (or None if not built)."""
+        if not self.exists(): return None
+        self.hashes = np.load(self._path("hashes.npy"), mmap_mode='r')
+        self.ids = np.load(self._path("ids.npy"), mmap_mode='r')
+        self.name_idx = np.load(self._path("name_idx.npy"), mmap_mode='r')
+        self.keys = np.load(self._path("keys.npy"), mmap_mode='r')
+        self.perm = np.load(self._path("perm.npy"), mmap_mode='r')
+        with open(self._path("names.json"), encoding='utf-8') as f:
+            self.names = json.load(f)
+        logging.info(f"[VisualIndex] Loaded {len(self.ids)} printings")
+        return self
+
+    def _candidates(self, packed, radius):
+        """Row numbers sharing at least one substring (within `radius` bits) with packed."""
+        query_keys = _chunk_keys(packed[None, :])[:, 0]
+        masks = self._masks(radius)
+        found = []
+        for j in range(CHUNKS):
+            probes = np.sort(query_keys[j] ^ masks)
+            lo = np.searchsorted(self.keys[j], probes, side='left')
+            hi = np.searchsorted(self.keys[j], probes, side='right')
+            for a, b in zip(lo[hi > lo], hi[hi > lo]):
+                found.append(self.perm[j, a:b])
+        if not found: return np.zeros(0, dtype=np.int32)
+        return np.unique(np.concatenate(found))
+
+    def query(self, packed_hashes, k=5, radius=None):
+        """
+        packed_hashes: (O, 32) uint8, one row per orientation tried.
+        Returns up to k (every candidate for k=None) dicts (id, name, dist, orientation),
+        nearest first. Complete up to recall(radius) bits; radius defaults to
+        VISUAL_INDEX_PROBE_RADIUS.
+        """
+        best = {}
+        for orient, packed in enumerate(np.asarray(packed_hashes, dtype=np.uint8)):
+            rows = self._candidates(packed, self.radius if radius is None else radius)
+            if not len(rows): continue
+            dists = POPCOUNT[np.asarray(self.hashes[rows]) ^ packed].sum(axis=1, dtype=np.int32)
+            for row, dist in zip(rows, dists):
+                if row not in best or dist < best[row][0]:
+                    best[row] = (int(dist), orient)
+
+        ranked = sorted(best.items(), key=lambda x: x[1][0])[:k] # [:None] keeps all
+        return [{
+            'id': self.ids[row].decode(),
+            'name': self.names[self.name_idx[row]],
+            'dist': dist,
+            'orientation': orient
+        } for row, (dist, orient) in ranked]
+
+    def identify(self, image):
+        """
+        Card name and printing straight from a flattened card image.
+        Returns the top hit (dict) if it is close and clearly ahead of the nearest
+        printing with a *different* name; None if ambiguous (caller falls back to OCR).
+        Every printing that could fail the gap check is looked at: when it lies past
+        the default probe's exact recall, the index is probed again, wider.
+        """
+        if self.hashes is None or not len(self.ids): return None
+        rotated = cv2.rotate(image, cv2.ROTATE_180)
+        packed = np.stack([np.packbits(dhash_bits(image)), np.packbits(dhash_bits(rotated))])
+        hits = self.query(packed, k=None)
+        if not hits or hits[0]['dist'] > config.VISUAL_ID_MAX_DIST: return None
+
+        top = hits[0]
+        reach = top['dist'] + config.VISUAL_ID_MIN_GAP - 1 # Farthest rival that still disqualifies
+        if reach > self.recall(self.radius):
+            radius = next(r for r in range(self.radius, CHUNK_BYTES * 8) if self.recall(r) >= reach)
+            hits = self.query(packed, k=None, radius=radius)
+        # Scans every candidate, not just the top few: a card with many printings (basic
+        # lands) can fill the nearest slots by itself
+        rival = next((h for h in hits[1:] if h['name'] != top['name']), None)
+        if rival and rival['dist'] - top['dist'] < config.VISUAL_ID_MIN_GAP: return None
+        return top
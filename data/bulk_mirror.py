@@ -0,0 +1,299 @@
+import sqlite3
+import json
+import os
+import gzip
+import difflib
+import logging
+from datetime import datetime
+import config
+
+# Fields the app actually reads; everything else in the bulk file is dropped on import
+KEEP_FIELDS = (
+    "id", "oracle_id", "name", "lang", "set", "set_name", "collector_number", "rarity",
+    "released_at", "mana_cost", "cmc", "type_line", "oracle_text", "flavor_text",
+    "power", "toughness", "colors", "color_identity", "legalities", "artist",
+    "image_uris", "card_faces", "prices", "scryfall_uri", "games", "digital"
+)
+FACE_FIELDS = ("name", "mana_cost", "type_line", "oracle_text", "flavor_text",
+               "power", "toughness", "colors", "artist", "image_uris")
+
+
+def iter_json_array(stream, chunk_size=1 << 20):
+    """
+    Yields the elements of a top-level JSON array one at a time.
+    Only ever holds one chunk plus one partial element in memory, so
+    multi-hundred-MB bulk files parse in constant space.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+    started = False
+
+    while True:
+        # Skip separators between elements
+        while True:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buf) or eof: break
+            buf = stream.read(chunk_size)
+            pos = 0
+            eof = not buf
+
+        if pos >= len(buf): return
+        if not started:
+            if buf[pos] != "[":
+                raise ValueError("Bulk file is not a JSON array")
+            started = True
+            pos += 1
+            continue
+        if buf[pos] == "]": return
+
+        try:
+            obj, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof: raise
+            # Object straddles the chunk boundary: keep the tail, read more
+            more = stream.read(chunk_size)
+            eof = not more
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+        if (not eof and isinstance(obj, (int, float)) and (end == len(buf) or buf[end] in ".eE+-")):
+            # A number running into the end of the chunk may go on in the next one ("12" of 12345, "1." of 1.5)
+            more = stream.read(chunk_size)
+            eof = not more
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+
+        yield obj
+        pos = end
+        if pos > chunk_size:
+            buf = buf[pos:]
+            pos = 0
+
+
+class BulkMirror:
+    """
+    Local, indexed copy of Scryfall bulk data (default_cards / all_cards).
+    Lets MTGService answer name, printing and price lookups without the network.
+    """
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.MIRROR_DB_PATH
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._names = None # Lazy list for offline fuzzy matching
+        self._init_db()
+
+    def _init_db(self):
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS cards (
+                id TEXT PRIMARY KEY,
+                oracle_id TEXT,
+                name TEXT,
+                normalized_name TEXT,
+                front_name TEXT,
+                set_code TEXT,
+                collector_number TEXT,
+                lang TEXT,
+                released_at TEXT,
+                paper INTEGER,
+                price_usd REAL,
+                price_foil REAL,
+                data TEXT
+            )
+        ''')
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_name ON cards(normalized_name, lang, paper, released_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_front ON cards(front_name, lang, paper, released_at)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_set ON cards(set_code, collector_number, lang)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_oracle ON cards(oracle_id)")
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    # --- IMPORT ---
+
+    def _row(self, card):
+        slim = {k: card[k] for k in KEEP_FIELDS if k in card}
+        if 'card_faces' in slim:
+            slim['card_faces'] = [{k: f[k] for k in FACE_FIELDS if k in f} for f in slim['card_faces']]
+        prices = card.get('prices') or {}
+        name = card.get('name', '')
+        return (
+            card['id'],
+            card.get('oracle_id'),
+            name,
+            name.lower(),
+            name.split(' // ')[0].lower(),
+            card.get('set'),
+            card.get('collector_number'),
+            card.get('lang', 'en'),
+            card.get('released_at'),
+            1 if 'paper' in card.get('games', []) else 0,
+            float(prices['usd']) if prices.get('usd') else None,
+            float(prices['usd_foil']) if prices.get('usd_foil') else None,
+            json.dumps(slim, separators=(',', ':'))
+        )
+
+    def import_file(self, path, batch_size=5000, progress=None):
+        """
+        Streams a bulk JSON file (plain or .gz) into the mirror.
+        Unchanged rows are skipped, so re-importing a newer file only rewrites what moved.
+        Returns (rows_seen, rows_written).
+        """
+        opener = gzip.open if path.endswith('.gz') else open
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        cursor = conn.cursor()
+
+        seen = 0
+        before = conn.total_changes
+        batch = []
+        sql = '''
+            INSERT INTO cards (id, oracle_id, name, normalized_name, front_name, set_code,
+                               collector_number, lang, released_at, paper, price_usd, price_foil, data)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                oracle_id=excluded.oracle_id, name=excluded.name, normalized_name=excluded.normalized_name,
+                front_name=excluded.front_name, set_code=excluded.set_code,
+                collector_number=excluded.collector_number, lang=excluded.lang,
+                released_at=excluded.released_at, paper=excluded.paper,
+                price_usd=excluded.price_usd, price_foil=excluded.price_foil, data=excluded.data
+            WHERE cards.data IS NOT excluded.data
+        '''
+        with opener(path, 'rt', encoding='utf-8') as f:
+            for card in iter_json_array(f):
+                if card.get('object', 'card') != 'card' or 'id' not in card: continue
+                batch.append(self._row(card))
+                seen += 1
+                if len(batch) >= batch_size:
+                    cursor.executemany(sql, batch)
+                    conn.commit()
+                    batch = []
+                    if progress: progress(seen)
+        if batch:
+            cursor.executemany(sql, batch)
+        conn.commit()
+        written = conn.total_changes - before
+        conn.close()
+
+        self._names = None
+        logging.info(f"[Mirror] Imported {path}: {seen} cards seen, {written} written")
+        return seen, written
+
+    def get_meta(self, key):
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        conn.commit()
+        conn.close()
+
+    # --- LOOKUPS ---
+
+    def is_populated(self):
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute("SELECT 1 FROM cards LIMIT 1").fetchone()
+        conn.close()
+        return row is not None
+
+    def _query(self, sql, params):
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(sql, params).fetchall()
+        conn.close()
+        return [json.loads(r[0]) for r in rows]
+
+    def get_card_by_name(self, name):
+        """Exact (case-insensitive) name or front-face match. Newest English paper printing."""
+        normalized = name.lower().strip()
+        for column in ("normalized_name", "front_name"):
+            rows = self._query(f'''
+                SELECT data FROM cards
+                WHERE {column} = ? AND lang = 'en' AND paper = 1
+                ORDER BY released_at DESC LIMIT 1
+            ''', (normalized,))
+            if rows: return rows[0]
+        return None
+
+    def fuzzy_name(self, text, cutoff=0.8):
+        """Offline stand-in for Scryfall's fuzzy search. Returns a card name or None."""
+        if self._names is None:
+            conn = sqlite3.connect(self.db_path)
+            self._names = [r[0] for r in conn.execute(
+                "SELECT DISTINCT front_name FROM cards WHERE lang = 'en' AND paper = 1")]
+            conn.close()
+        matches = difflib.get_close_matches(text.lower().strip(), self._names, n=1, cutoff=cutoff)
+        return matches[0] if matches else None
+
+    def search_printings(self, name):
+        """Every English paper printing of a card, newest first."""
+        normalized = name.lower().strip()
+        return self._query('''
+            SELECT data FROM cards
+            WHERE (normalized_name = ? OR front_name = ?) AND lang = 'en' AND paper = 1
+            ORDER BY released_at DESC
+        ''', (normalized, normalized))
+
+    def iter_paper_cards(self, batch_size=1000):
+        """Yields lists of every English paper printing (for whole-catalog jobs)."""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.execute("SELECT data FROM cards WHERE lang = 'en' AND paper = 1 ORDER BY id")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows: break
+            yield [json.loads(r[0]) for r in rows]
+        conn.close()
+
+    def get_names(self, scryfall_ids):
+        """{scryfall_id: name} for the given printings."""
+        ids = list(scryfall_ids)
+        names = {}
+        conn = sqlite3.connect(self.db_path)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for sid, name in conn.execute(f"SELECT id, name FROM cards WHERE id IN ({marks}) AND paper = 1", chunk):
+                names[sid] = name
+        conn.close()
+        return names
+
+    def get_prices(self, scryfall_ids):
+        """{scryfall_id: (price_usd, price_foil)} for the given printings (no JSON decoding)."""
+        ids = list(scryfall_ids)
+        prices = {}
+        conn = sqlite3.connect(self.db_path)
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            for sid, usd, foil in conn.execute(f"SELECT id, price_usd, price_foil FROM cards WHERE id IN ({marks})", chunk):
+                prices[sid] = (usd, foil)
+        conn.close()
+        return prices
+
+    def get_card_by_id(self, scryfall_id):
+        rows = self._query("SELECT data FROM cards WHERE id = ?", (scryfall_id,))
+        return rows[0] if rows else None
+
+    def get_by_set_number(self, set_code, collector_number):
+        rows = self._query('''
+            SELECT data FROM cards
+            WHERE set_code = ? AND collector_number = ?
+            ORDER BY lang = 'en' DESC LIMIT 1
+        ''', (set_code.lower(), str(collector_number)))
+        return rows[0] if rows else None
+
+    def record_refresh(self, bulk_type, updated_at):
+        self.set_meta(f"{bulk_type}_updated_at", updated_at)
+        self.set_meta("last_refresh", datetime.now().isoformat())
@@ -2,39 +2,331 @@ import sqlite3
 import json
 import os
 import logging
-from datetime import datetime
+import threading
+from datetime import datetime, date, timedelta
 import config
+from data.write_behind import WriteBehindQueue
+
+# Colour bitmask bits (color_mask / identity_mask columns)
+COLOR_BITS = {"W": 1, "U": 2, "B": 4, "R": 8, "G": 16}
+
+
+def color_mask(colors):
+    """['U', 'R'] -> 10. Unknown symbols are ignored."""
+    mask = 0
+    for c in colors or ():
+        mask |= COLOR_BITS.get(c, 0)
+    return mask
+
+
+# Oracle-level (one row per card name) and printing-level (one row per Scryfall ID) columns,
+# in the order DBManager._catalog_rows builds them
+ORACLE_COLUMNS = (
+    "normalized_name", "oracle_id", "display_name",
+    "mana_cost", "cmc", "type_line", "oracle_text",
+    "power", "toughness", "colors", "legalities",
+    "default_printing", "color_mask", "identity_mask"
+)
+PRINTING_COLUMNS = (
+    "scryfall_id", "normalized_name",
+    "set_code", "set_name", "collector_number", "rarity", "released_at",
+    "flavor_text", "artist", "image_url", "price_usd", "price_foil", "scryfall_uri",
+    "last_fetched"
+)
+ORACLE_UPSERT = f'''
+    INSERT INTO oracle ({", ".join(ORACLE_COLUMNS)})
+    VALUES ({", ".join("?" * len(ORACLE_COLUMNS))})
+    ON CONFLICT(normalized_name) DO UPDATE SET
+        {", ".join(f"{c}=excluded.{c}" for c in ORACLE_COLUMNS[1:] if c != "default_printing")},
+        default_printing=COALESCE(oracle.default_printing, excluded.default_printing)
+'''
+# Name resolution picked this printing: it replaces whatever the name pointed at before
+SET_DEFAULT_PRINTING = "UPDATE oracle SET default_printing = ? WHERE normalized_name = ?"
+# UPSERT (not REPLACE) so the summary triggers see a price change as an UPDATE
+CATALOG_UPSERT = f'''
+    INSERT INTO catalog ({", ".join(PRINTING_COLUMNS)})
+    VALUES ({", ".join("?" * len(PRINTING_COLUMNS))})
+    ON CONFLICT(scryfall_id) DO UPDATE SET
+        {", ".join(f"{c}=excluded.{c}" for c in PRINTING_COLUMNS[1:])}
+'''
+# Every scan with its printing and card: col.*, c.* (printing), o.* (oracle)
+COLLECTION_JOIN = """
+    collection col
+    JOIN catalog c ON c.scryfall_id = col.scryfall_id
+    JOIN oracle o ON o.normalized_name = c.normalized_name
+"""
+
+
+def _color_bucket(mask):
+    """SQL for the dashboard colour bucket of a color_mask expression (NULL while unknown)."""
+    mono = " ".join(f"WHEN {bit} THEN '{c}'" for c, bit in COLOR_BITS.items())
+    return (f"CASE WHEN {mask} IS NULL THEN NULL WHEN {mask} = 0 THEN 'Colorless' "
+            f"WHEN {mask} & ({mask} - 1) != 0 THEN 'Multi' ELSE CASE {mask} {mono} END END")
+
+
+# collection_breakdown dimensions: key expression over a printing row and its oracle row `o`
+BREAKDOWN_KEYS = {
+    "color": lambda row: _color_bucket("o.color_mask"),
+    "rarity": lambda row: f"{row}.rarity",
+    "set": lambda row: f"{row}.set_code",
+}
+BREAKDOWN_ADD = """
+    INSERT INTO collection_breakdown (dimension, key, card_count, total_value)
+    SELECT '{dim}', {key}, {count}, {value} {source} AND {key} IS NOT NULL {group}
+    ON CONFLICT(dimension, key) DO UPDATE SET
+        card_count = card_count + excluded.card_count,
+        total_value = total_value + excluded.total_value;
+"""
+# Most valuable scans kept in collection_top for the dashboard
+TOP_CARDS_KEPT = 10
+TOP_CARDS_REFRESH = (
+    "DELETE FROM collection_top",
+    f"""INSERT INTO collection_top (scan_id, price_usd)
+        SELECT col.id, c.price_usd
+        FROM collection col JOIN catalog c ON c.scryfall_id = col.scryfall_id
+        WHERE c.price_usd IS NOT NULL
+        ORDER BY c.price_usd DESC LIMIT {TOP_CARDS_KEPT}""",
+)
+
+# catalog_fts columns and their values for a catalog row {c} joined to its oracle row o
+SEARCH_COLUMNS = ("name", "type_line", "oracle_text", "artist", "set_code", "set_name")
+SEARCH_VALUES = "o.display_name, o.type_line, o.oracle_text, {c}.artist, {c}.set_code, {c}.set_name"
+
+
+def _fts_query(text):
+    """User text -> FTS5 query: every word must match as a prefix ('light bol' finds Lightning Bolt)."""
+    words = [w.replace('"', '') for w in text.split()]
+    return " ".join(f'"{w}"*' for w in words if w) or None
+
+
+# price_history days are counted from here; prices are stored in integer cents
+PRICE_EPOCH = date(1970, 1, 1)
+
+
+def day_number(day):
+    """date -> price_history day."""
+    return (day - PRICE_EPOCH).days
+
+
+# Copies the catalog's current prices into price_history as the snapshot for day ?
+PRICE_SNAPSHOT = """
+    INSERT OR REPLACE INTO price_history (day, scryfall_id, usd_cents, foil_cents)
+    SELECT ?, scryfall_id, CAST(ROUND(price_usd * 100) AS INTEGER), CAST(ROUND(price_foil * 100) AS INTEGER)
+    FROM catalog
+    WHERE price_usd IS NOT NULL OR price_foil IS NOT NULL
+"""
+# Records the collection as it stands, at the catalog's current prices, as day ?'s value
+VALUE_SNAPSHOT = """
+    INSERT OR REPLACE INTO collection_value_history (day, card_count, total_value)
+    SELECT ?, COUNT(*), COALESCE(SUM(c.price_usd), 0)
+    FROM collection col JOIN catalog c ON c.scryfall_id = col.scryfall_id
+"""
+
 
 class DBManager:
-    def __init__(self):
-        self.db_path = config.DB_PATH
+    # Schema steps, applied in order and recorded in PRAGMA user_version.
+    # Append only: never edit a step that has shipped.
+    MIGRATIONS = (
+        (1, "printing columns on collection", "_migrate_printing_columns"),
+        (2, "lookup and sort indexes", "_migrate_indexes"),
+        (3, "printing-level catalog keyed by scryfall_id", "_migrate_printing_catalog"),
+        (4, "colour bitmask columns", "_migrate_color_masks"),
+        (5, "trigger-maintained dashboard aggregates", "_migrate_dashboard_aggregates"),
+        (6, "full-text search index", "_migrate_search_index"),
+        (7, "daily price history", "_migrate_price_history"),
+        (8, "daily collection value", "_migrate_value_history"),
+        (9, "collection without the name foreign key", "_migrate_collection_table"),
+        (10, "explicit integer catalog key for the search index", "_migrate_catalog_id"),
+    )
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.DB_PATH
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._local = threading.local() # One long-lived connection per thread
+        self.writer = None # WriteBehindQueue once start_write_behind() is called
         self._init_db()
 
+    def _conn(self):
+        """
+        This thread's connection, opened on first use and kept for the thread's life.
+        WAL lets the dashboard read while the Librarian/Inspector write.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=config.DB_BUSY_TIMEOUT,
+                                   cached_statements=config.DB_STATEMENT_CACHE)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA cache_size=-{int(config.DB_CACHE_SIZE_KB)}")
+            conn.execute(f"PRAGMA mmap_size={int(config.DB_MMAP_SIZE)}")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Closes the calling thread's connection (reopened on next use)."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
     def _init_db(self):
-        conn = sqlite3.connect(self.db_path)
+        conn = self._conn()
         cursor = conn.cursor()
         
-        # 1. CATALOG (Updated Schema)
+        # Version-0 baseline; MIGRATIONS take it from here. Later databases already have it.
+        if self.schema_version() == 0:
+            # 1. CATALOG (Updated Schema)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS catalog (
+                    normalized_name TEXT PRIMARY KEY,
+                    scryfall_id TEXT,
+                    display_name TEXT,
+                    set_code TEXT,
+                    set_name TEXT,
+                    collector_number TEXT,
+                    rarity TEXT,
+                    released_at TEXT,  -- NEW
+                    mana_cost TEXT,
+                    cmc REAL,
+                    type_line TEXT,
+                    oracle_text TEXT,
+                    flavor_text TEXT,  -- NEW
+                    power TEXT,
+                    toughness TEXT,
+                    colors TEXT,
+                    legalities TEXT,
+                    artist TEXT,
+                    image_url TEXT,
+                    price_usd REAL,
+                    price_foil REAL,
+                    scryfall_uri TEXT,
+                    last_fetched TIMESTAMP
+                )
+            ''')
+
+            # 2. COLLECTION
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS collection (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    tracker_id TEXT,
+                    normalized_name TEXT,
+                    date_scanned TIMESTAMP,
+                    local_image_path TEXT,
+                    scryfall_id TEXT,           -- Identified printing (NULL until inspected)
+                    printing_confidence REAL,
+                    printing_checked TIMESTAMP, -- Set once inspected; batch jobs resume from NULLs
+                    FOREIGN KEY(normalized_name) REFERENCES catalog(normalized_name)
+                )
+            ''')
+
+            # 3. ALIASES
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS aliases (
+                    input_text TEXT PRIMARY KEY,
+                    real_name TEXT,
+                    last_checked TIMESTAMP
+                )
+            ''')
+
+            # 4. SUMMARY (Running totals, single row kept current by triggers)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS collection_summary (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    card_count INTEGER NOT NULL DEFAULT 0,
+                    total_value REAL NOT NULL DEFAULT 0.0,
+                    last_reconciled TIMESTAMP
+                )
+            ''')
+            cursor.execute("INSERT OR IGNORE INTO collection_summary (id) VALUES (1)")
+            self._create_legacy_summary_triggers(cursor)
+
+        conn.commit()
+
+        # Migrated databases start from a true baseline; drift on open databases is the
+        # Librarian's periodic reconcile's job (a full recount on every open would cost
+        # every worker process and tool a write lock)
+        if self._migrate(conn):
+            self.reconcile_collection_summary()
+
+    def schema_version(self):
+        return self._conn().execute("PRAGMA user_version").fetchone()[0]
+
+    def _migrate(self, conn):
+        """
+        Brings the database up to the latest MIGRATIONS step. Each step runs in its own
+        write transaction together with the version bump, so a crash leaves either the
+        old or the new schema, and concurrent processes never apply a step twice.
+        Returns the number of steps this call applied.
+        """
+        applied = 0
+        for target, description, method in self.MIGRATIONS:
+            if self.schema_version() >= target: continue
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Re-check under the write lock: another process may have just done it
+                if self.schema_version() < target:
+                    logging.info(f"[DB] Migrating schema to v{target}: {description}")
+                    getattr(self, method)(conn.cursor())
+                    conn.execute(f"PRAGMA user_version = {int(target)}")
+                    applied += 1
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return applied
+
+    def _migrate_printing_columns(self, cursor):
+        self._add_missing_columns(cursor, "collection", {
+            "scryfall_id": "TEXT",
+            "printing_confidence": "REAL",
+            "printing_checked": "TIMESTAMP"
+        })
+
+    def _migrate_indexes(self, cursor):
+        # update_scan / delete_scan / get_card_details look scans up by tracker
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_collection_tracker ON collection(tracker_id)")
+        # Every collection JOIN catalog, plus the summary triggers' per-name counts
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_collection_name ON collection(normalized_name)")
+        # get_recent_scans
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_collection_date ON collection(date_scanned)")
+        # Leaderboard / list views sort by price, optionally within one rarity
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_catalog_price ON catalog(price_usd)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_catalog_rarity ON catalog(rarity, price_usd)")
+
+    def _migrate_printing_catalog(self, cursor):
+        """
+        catalog (one row per name) -> oracle (one row per name) + catalog (one row per printing).
+        Each scan points at a printing: the one it was identified as, else the name's
+        printing from before. Copies run as INSERT ... SELECT inside SQLite, so large
+        inventories convert in place without passing through Python.
+        """
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS catalog (
+            CREATE TABLE oracle (
                 normalized_name TEXT PRIMARY KEY,
-                scryfall_id TEXT,
+                oracle_id TEXT,
                 display_name TEXT,
-                set_code TEXT,
-                set_name TEXT,
-                collector_number TEXT,
-                rarity TEXT,
-                released_at TEXT,  -- NEW
                 mana_cost TEXT,
                 cmc REAL,
                 type_line TEXT,
                 oracle_text TEXT,
-                flavor_text TEXT,  -- NEW
                 power TEXT,
                 toughness TEXT,
                 colors TEXT,
                 legalities TEXT,
+                default_printing TEXT  -- Printing new scans of this name start out as
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE catalog_v3 (
+                scryfall_id TEXT PRIMARY KEY,
+                normalized_name TEXT,
+                set_code TEXT,
+                set_name TEXT,
+                collector_number TEXT,
+                rarity TEXT,
+                released_at TEXT,
+                flavor_text TEXT,
                 artist TEXT,
                 image_url TEXT,
                 price_usd REAL,
@@ -43,251 +335,1123 @@ class DBManager:
                 last_fetched TIMESTAMP
             )
         ''')
+        # Old rows without an ID still need a key of their own
+        cursor.execute('''
+            INSERT INTO oracle (normalized_name, display_name, mana_cost, cmc, type_line, oracle_text,
+                                power, toughness, colors, legalities, default_printing)
+            SELECT normalized_name, display_name, mana_cost, cmc, type_line, oracle_text,
+                   power, toughness, colors, legalities, COALESCE(scryfall_id, 'legacy:' || normalized_name)
+            FROM catalog
+        ''')
+        cursor.execute('''
+            INSERT OR IGNORE INTO catalog_v3 (scryfall_id, normalized_name, set_code, set_name, collector_number,
+                                              rarity, released_at, flavor_text, artist, image_url,
+                                              price_usd, price_foil, scryfall_uri, last_fetched)
+            SELECT COALESCE(scryfall_id, 'legacy:' || normalized_name), normalized_name, set_code, set_name,
+                   collector_number, rarity, released_at, flavor_text, artist, image_url,
+                   price_usd, price_foil, scryfall_uri, last_fetched
+            FROM catalog
+        ''')
+
+        # Printings identified before this version have no catalog row (no price):
+        # fall back to the name's printing and let the batch job redo them
+        cursor.execute('''
+            UPDATE collection SET scryfall_id = NULL, printing_confidence = NULL, printing_checked = NULL
+            WHERE scryfall_id IS NOT NULL AND scryfall_id NOT IN (SELECT scryfall_id FROM catalog_v3)
+        ''')
+        cursor.execute('''
+            UPDATE collection SET scryfall_id =
+                (SELECT default_printing FROM oracle o WHERE o.normalized_name = collection.normalized_name)
+            WHERE scryfall_id IS NULL
+        ''')
+
+        for trigger in ("col_insert", "col_delete", "col_rename", "cat_insert", "cat_price", "cat_delete"):
+            cursor.execute(f"DROP TRIGGER IF EXISTS trg_summary_{trigger}")
+        cursor.execute("DROP TABLE catalog")
+        cursor.execute("ALTER TABLE catalog_v3 RENAME TO catalog")
+
+        cursor.execute("CREATE INDEX idx_catalog_name ON catalog(normalized_name)")
+        cursor.execute("CREATE INDEX idx_catalog_price ON catalog(price_usd)")
+        cursor.execute("CREATE INDEX idx_catalog_rarity ON catalog(rarity, price_usd)")
+        cursor.execute("CREATE INDEX idx_collection_printing ON collection(scryfall_id)")
+        self._create_summary_triggers(cursor)
+
+    def _migrate_color_masks(self, cursor):
+        """
+        Integer colour / colour-identity bitmasks (W=1 U=2 B=4 R=8 G=16) so colour stats and
+        filters are SQL aggregates instead of json.loads / LIKE over every row.
+        Colour identity was never stored before, so existing rows start from their colours
+        (a lower bound) until the card is next fetched.
+        """
+        self._add_missing_columns(cursor, "oracle", {"color_mask": "INTEGER", "identity_mask": "INTEGER"})
+        cases = " ".join(f"WHEN '{c}' THEN {bit}" for c, bit in COLOR_BITS.items())
+        cursor.execute(f'''
+            UPDATE oracle SET color_mask =
+                (SELECT COALESCE(SUM(DISTINCT CASE value {cases} ELSE 0 END), 0) FROM json_each(oracle.colors))
+            WHERE json_valid(colors)
+        ''')
+        cursor.execute("UPDATE oracle SET identity_mask = color_mask WHERE identity_mask IS NULL")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_oracle_color ON oracle(color_mask)")
+
+    def _migrate_dashboard_aggregates(self, cursor):
+        """
+        Per colour / rarity / set counts and values, plus the most valuable scans,
+        kept current by triggers so the dashboard home never scans the collection.
+        """
+        cursor.execute('''
+            CREATE TABLE collection_breakdown (
+                dimension TEXT NOT NULL,  -- 'color' | 'rarity' | 'set'
+                key TEXT NOT NULL,
+                card_count INTEGER NOT NULL DEFAULT 0,
+                total_value REAL NOT NULL DEFAULT 0.0,
+                PRIMARY KEY (dimension, key)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE collection_top (
+                scan_id INTEGER PRIMARY KEY,  -- collection.id
+                price_usd REAL NOT NULL
+            )
+        ''')
+        cursor.execute("CREATE INDEX idx_collection_top_price ON collection_top(price_usd)")
+        self._create_aggregate_triggers(cursor)
+        self._rebuild_aggregates(cursor)
+
+    def _create_summary_triggers(self, cursor):
+        """
+        Keeps collection_summary equal to COUNT(*)/SUM(price_usd) over collection JOIN catalog
+        on the scan's printing. Scans only count once their printing is in the catalog.
+        One statement per execute(): executescript() would commit the migration midway.
+        """
+        for sql in ('''
+            CREATE TRIGGER trg_summary_col_insert AFTER INSERT ON collection
+            BEGIN
+                UPDATE collection_summary SET
+                    card_count = card_count + (SELECT COUNT(*) FROM catalog WHERE scryfall_id = NEW.scryfall_id),
+                    total_value = total_value + COALESCE((SELECT price_usd FROM catalog WHERE scryfall_id = NEW.scryfall_id), 0)
+                WHERE id = 1;
+            END
+        ''', '''
+            CREATE TRIGGER trg_summary_col_delete AFTER DELETE ON collection
+            BEGIN
+                UPDATE collection_summary SET
+                    card_count = card_count - (SELECT COUNT(*) FROM catalog WHERE scryfall_id = OLD.scryfall_id),
+                    total_value = total_value - COALESCE((SELECT price_usd FROM catalog WHERE scryfall_id = OLD.scryfall_id), 0)
+                WHERE id = 1;
+            END
+        ''', '''
+            CREATE TRIGGER trg_summary_col_printing AFTER UPDATE OF scryfall_id ON collection
+            WHEN OLD.scryfall_id IS NOT NEW.scryfall_id
+            BEGIN
+                UPDATE collection_summary SET
+                    card_count = card_count
+                        - (SELECT COUNT(*) FROM catalog WHERE scryfall_id = OLD.scryfall_id)
+                        + (SELECT COUNT(*) FROM catalog WHERE scryfall_id = NEW.scryfall_id),
+                    total_value = total_value
+                        - COALESCE((SELECT price_usd FROM catalog WHERE scryfall_id = OLD.scryfall_id), 0)
+                        + COALESCE((SELECT price_usd FROM catalog WHERE scryfall_id = NEW.scryfall_id), 0)
+                WHERE id = 1;
+            END
+        ''', '''
+            CREATE TRIGGER trg_summary_cat_insert AFTER INSERT ON catalog
+            BEGIN
+                UPDATE collection_summary SET
+                    card_count = card_count + (SELECT COUNT(*) FROM collection WHERE scryfall_id = NEW.scryfall_id),
+                    total_value = total_value + COALESCE(NEW.price_usd, 0) * (SELECT COUNT(*) FROM collection WHERE scryfall_id = NEW.scryfall_id)
+                WHERE id = 1;
+            END
+        ''', '''
+            CREATE TRIGGER trg_summary_cat_price AFTER UPDATE OF price_usd ON catalog
+            WHEN OLD.price_usd IS NOT NEW.price_usd
+            BEGIN
+                UPDATE collection_summary SET
+                    total_value = total_value
+                        + (COALESCE(NEW.price_usd, 0) - COALESCE(OLD.price_usd, 0))
+                        * (SELECT COUNT(*) FROM collection WHERE scryfall_id = NEW.scryfall_id)
+                WHERE id = 1;
+            END
+        ''', '''
+            CREATE TRIGGER trg_summary_cat_delete AFTER DELETE ON catalog
+            BEGIN
+                UPDATE collection_summary SET
+                    card_count = card_count - (SELECT COUNT(*) FROM collection WHERE scryfall_id = OLD.scryfall_id),
+                    total_value = total_value - COALESCE(OLD.price_usd, 0) * (SELECT COUNT(*) FROM collection WHERE scryfall_id = OLD.scryfall_id)
+                WHERE id = 1;
+            END
+        '''):
+            cursor.execute(sql)
+
+    def _create_aggregate_triggers(self, cursor):
+        """
+        Keeps collection_breakdown equal to GROUP BY colour / rarity / set over
+        collection JOIN catalog (oracle for colour), and collection_top equal to the
+        TOP_CARDS_KEPT priciest scans. Same counting rule as the summary triggers.
+        """
+        def breakdown(row, sign, count, source):
+            # One upsert per dimension for `count` scans of printing row `row`
+            value = f"{sign}{count} * COALESCE({row}.price_usd, 0)"
+            return "".join(BREAKDOWN_ADD.format(dim=dim, key=key(row), count=f"{sign}{count}",
+                                                value=value, source=source, group="")
+                           for dim, key in BREAKDOWN_KEYS.items())
+
+        def scan(printing_id):
+            return (f"FROM catalog c LEFT JOIN oracle o ON o.normalized_name = c.normalized_name "
+                    f"WHERE c.scryfall_id = {printing_id}")
+
+        def copies(row):
+            return (f"FROM (SELECT COUNT(*) AS n FROM collection WHERE scryfall_id = {row}.scryfall_id) copies "
+                    f"LEFT JOIN oracle o ON o.normalized_name = {row}.normalized_name WHERE copies.n > 0")
+
+        def card_color(mask, sign):
+            # Every scan of the oracle row's printings moves in or out of `mask`'s bucket
+            return BREAKDOWN_ADD.format(
+                dim="color", key=_color_bucket(mask), count=f"{sign}COUNT(*)",
+                value=f"{sign}SUM(COALESCE(c.price_usd, 0))", group="GROUP BY 2",
+                source=("FROM collection col JOIN catalog c ON c.scryfall_id = col.scryfall_id "
+                        "WHERE c.normalized_name = NEW.normalized_name"))
+
+        top = "".join(f"{sql};" for sql in TOP_CARDS_REFRESH)
+
+        def beats_top(price):
+            # A scan at `price` would enter the list (it isn't full, or it beats the cheapest entry)
+            return (f"((SELECT COUNT(*) FROM collection_top) < {TOP_CARDS_KEPT} "
+                    f"OR {price} > (SELECT MIN(price_usd) FROM collection_top))")
+
+        def owned(row):
+            return f"EXISTS (SELECT 1 FROM collection WHERE scryfall_id = {row}.scryfall_id)"
+
+        def in_top(row):
+            return (f"EXISTS (SELECT 1 FROM collection_top t JOIN collection col ON col.id = t.scan_id "
+                    f"WHERE col.scryfall_id = {row}.scryfall_id)")
+
+        scan_price = "(SELECT price_usd FROM catalog WHERE scryfall_id = NEW.scryfall_id)"
+
+        triggers = (
+            ("col_insert", "AFTER INSERT ON collection", "",
+             breakdown("c", "+", "1", scan("NEW.scryfall_id"))),
+            ("col_delete", "AFTER DELETE ON collection", "",
+             breakdown("c", "-", "1", scan("OLD.scryfall_id"))),
+            ("col_printing", "AFTER UPDATE OF scryfall_id ON collection",
+             "WHEN OLD.scryfall_id IS NOT NEW.scryfall_id",
+             breakdown("c", "-", "1", scan("OLD.scryfall_id")) + breakdown("c", "+", "1", scan("NEW.scryfall_id"))),
+            ("cat_insert", "AFTER INSERT ON catalog", "",
+             breakdown("NEW", "+", "copies.n", copies("NEW"))),
+            ("cat_update", "AFTER UPDATE OF price_usd, rarity, set_code ON catalog",
+             "WHEN OLD.price_usd IS NOT NEW.price_usd OR OLD.rarity IS NOT NEW.rarity OR OLD.set_code IS NOT NEW.set_code",
+             breakdown("OLD", "-", "copies.n", copies("OLD")) + breakdown("NEW", "+", "copies.n", copies("NEW"))),
+            ("cat_delete", "AFTER DELETE ON catalog", "",
+             breakdown("OLD", "-", "copies.n", copies("OLD"))),
+            ("oracle_insert", "AFTER INSERT ON oracle", "",
+             card_color("NEW.color_mask", "+")),
+            ("oracle_color", "AFTER UPDATE OF color_mask ON oracle",
+             "WHEN OLD.color_mask IS NOT NEW.color_mask",
+             card_color("OLD.color_mask", "-") + card_color("NEW.color_mask", "+")),
+            # The top list is re-read from idx_catalog_price (LIMIT TOP_CARDS_KEPT), and only
+            # when the change can affect it
+            # (bulk catalog loads of unowned printings never touch it)
+            ("top_col_insert", "AFTER INSERT ON collection", f"WHEN {beats_top(scan_price)}", top),
+            ("top_col_delete", "AFTER DELETE ON collection",
+             "WHEN OLD.id IN (SELECT scan_id FROM collection_top)", top),
+            ("top_col_printing", "AFTER UPDATE OF scryfall_id ON collection",
+             f"WHEN OLD.scryfall_id IS NOT NEW.scryfall_id AND "
+             f"(OLD.id IN (SELECT scan_id FROM collection_top) OR {beats_top(scan_price)})", top),
+            ("top_cat_insert", "AFTER INSERT ON catalog",
+             f"WHEN NEW.price_usd IS NOT NULL AND {owned('NEW')} AND {beats_top('NEW.price_usd')}", top),
+            ("top_cat_price", "AFTER UPDATE OF price_usd ON catalog",
+             f"WHEN OLD.price_usd IS NOT NEW.price_usd AND {owned('NEW')} "
+             f"AND ({in_top('NEW')} OR {beats_top('NEW.price_usd')})", top),
+            ("top_cat_delete", "AFTER DELETE ON catalog", f"WHEN {in_top('OLD')}", top),
+        )
+        # One statement per execute(): executescript() would commit the migration midway
+        for name, event, when, body in triggers:
+            cursor.execute(f"CREATE TRIGGER trg_agg_{name} {event} {when} BEGIN {body} END")
+
+    def _migrate_search_index(self, cursor):
+        """
+        FTS5 index over each printing's searchable text: its card's name, type line and
+        rules text (oracle) plus artist and set (catalog). Rows share catalog's rowid
+        (its id column from version 10), so the triggers update one index row per
+        changed printing.
+        """
+        cursor.execute(f'''
+            CREATE VIRTUAL TABLE catalog_fts USING fts5(
+                {", ".join(SEARCH_COLUMNS)},
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+        ''')
+        self._create_search_triggers(cursor, "rowid")
+        self._rebuild_search_index(cursor)
+
+    def _create_search_triggers(self, cursor, key):
+        """
+        Keeps catalog_fts in step with catalog and oracle: index row `key` (the catalog
+        column FTS rowids mirror) is re-derived whenever a searchable column changes.
+        """
+        for sql in (f'''
+            CREATE TRIGGER trg_fts_cat_insert AFTER INSERT ON catalog
+            BEGIN
+                INSERT INTO catalog_fts (rowid, {", ".join(SEARCH_COLUMNS)})
+                SELECT NEW.{key}, {SEARCH_VALUES.format(c="NEW")}
+                FROM (SELECT 1) LEFT JOIN oracle o ON o.normalized_name = NEW.normalized_name;
+            END
+        ''', f'''
+            CREATE TRIGGER trg_fts_cat_update AFTER UPDATE OF normalized_name, artist, set_code, set_name ON catalog
+            WHEN OLD.normalized_name IS NOT NEW.normalized_name OR OLD.artist IS NOT NEW.artist
+              OR OLD.set_code IS NOT NEW.set_code OR OLD.set_name IS NOT NEW.set_name
+            BEGIN
+                DELETE FROM catalog_fts WHERE rowid = OLD.{key};
+                INSERT INTO catalog_fts (rowid, {", ".join(SEARCH_COLUMNS)})
+                SELECT NEW.{key}, {SEARCH_VALUES.format(c="NEW")}
+                FROM (SELECT 1) LEFT JOIN oracle o ON o.normalized_name = NEW.normalized_name;
+            END
+        ''', f'''
+            CREATE TRIGGER trg_fts_cat_delete AFTER DELETE ON catalog
+            BEGIN
+                DELETE FROM catalog_fts WHERE rowid = OLD.{key};
+            END
+        ''', f'''
+            CREATE TRIGGER trg_fts_oracle_text AFTER UPDATE OF display_name, type_line, oracle_text ON oracle
+            WHEN OLD.display_name IS NOT NEW.display_name OR OLD.type_line IS NOT NEW.type_line
+              OR OLD.oracle_text IS NOT NEW.oracle_text
+            BEGIN
+                UPDATE catalog_fts SET name = NEW.display_name, type_line = NEW.type_line, oracle_text = NEW.oracle_text
+                WHERE rowid IN (SELECT {key} FROM catalog WHERE normalized_name = NEW.normalized_name);
+            END
+        ''', f'''
+            CREATE TRIGGER trg_fts_oracle_insert AFTER INSERT ON oracle
+            BEGIN
+                UPDATE catalog_fts SET name = NEW.display_name, type_line = NEW.type_line, oracle_text = NEW.oracle_text
+                WHERE rowid IN (SELECT {key} FROM catalog WHERE normalized_name = NEW.normalized_name);
+            END
+        '''):
+            cursor.execute(sql)
 
-        # 2. COLLECTION
+    def _migrate_price_history(self, cursor):
+        """
+        Daily price snapshots: one row per printing per day, prices in integer cents,
+        ~20 bytes a row. WITHOUT ROWID clusters the table on (day, scryfall_id), so each
+        snapshot is one contiguous, append-only run. Seeded with today's catalog prices.
+        """
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS collection (
+            CREATE TABLE price_history (
+                day INTEGER NOT NULL,
+                scryfall_id TEXT NOT NULL,
+                usd_cents INTEGER,
+                foil_cents INTEGER,
+                PRIMARY KEY (day, scryfall_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute(PRICE_SNAPSHOT, (day_number(date.today()),))
+
+    def _migrate_value_history(self, cursor):
+        """
+        One row per price snapshot with the collection's count and value that day, so
+        the dashboard chart is a plain read. Snapshots taken before this version only
+        have printing prices: they are valued against the collection as it is now.
+        """
+        cursor.execute('''
+            CREATE TABLE collection_value_history (
+                day INTEGER PRIMARY KEY,  -- price_history day
+                card_count INTEGER NOT NULL,
+                total_value REAL NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            WITH owned AS MATERIALIZED (
+                SELECT scryfall_id, COUNT(*) AS copies FROM collection
+                WHERE scryfall_id IS NOT NULL GROUP BY scryfall_id
+            )
+            INSERT INTO collection_value_history (day, card_count, total_value)
+            SELECT h.day, SUM(owned.copies), COALESCE(SUM(h.usd_cents * owned.copies), 0) / 100.0
+            FROM price_history h
+            JOIN owned ON owned.scryfall_id = h.scryfall_id
+            GROUP BY h.day
+        ''')
+
+    def _migrate_collection_table(self, cursor):
+        """
+        Rebuilds collection without its baseline FOREIGN KEY on catalog(normalized_name),
+        which stopped naming a unique column in version 3 (scans point at printings by
+        scryfall_id now). Rows keep their ids, so collection_top entries stay valid.
+        """
+        # Triggers on other tables read collection: drop them all, so the rename doesn't
+        # trip over references to the table in between
+        self._drop_triggers(cursor)
+        cursor.execute('''
+            CREATE TABLE collection_v9 (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 tracker_id TEXT,
                 normalized_name TEXT,
                 date_scanned TIMESTAMP,
                 local_image_path TEXT,
-                FOREIGN KEY(normalized_name) REFERENCES catalog(normalized_name)
+                scryfall_id TEXT,           -- Printing: identified, else the name's default
+                printing_confidence REAL,
+                printing_checked TIMESTAMP  -- Set once inspected; batch jobs resume from NULLs
             )
         ''')
+        cursor.execute('''
+            INSERT INTO collection_v9 (id, tracker_id, normalized_name, date_scanned, local_image_path,
+                                       scryfall_id, printing_confidence, printing_checked)
+            SELECT id, tracker_id, normalized_name, date_scanned, local_image_path,
+                   scryfall_id, printing_confidence, printing_checked
+            FROM collection
+        ''')
+        # Deleted scans' ids are never handed out again
+        seq = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = 'collection'").fetchone()
+        cursor.execute("DROP TABLE collection")
+        cursor.execute("ALTER TABLE collection_v9 RENAME TO collection")
+        if seq: cursor.execute("UPDATE sqlite_sequence SET seq = MAX(seq, ?) WHERE name = 'collection'", seq)
 
-        # 3. ALIASES
+        cursor.execute("CREATE INDEX idx_collection_tracker ON collection(tracker_id)")
+        cursor.execute("CREATE INDEX idx_collection_name ON collection(normalized_name)")
+        cursor.execute("CREATE INDEX idx_collection_date ON collection(date_scanned)")
+        cursor.execute("CREATE INDEX idx_collection_printing ON collection(scryfall_id)")
+        self._create_summary_triggers(cursor)
+        self._create_aggregate_triggers(cursor)
+        self._create_search_triggers(cursor, "rowid")
+
+    def _migrate_catalog_id(self, cursor):
+        """
+        Gives catalog an INTEGER PRIMARY KEY `id` for catalog_fts rows to mirror. Until now
+        they mirrored the implicit rowid of a table keyed by TEXT, which VACUUM may
+        renumber; a declared integer key is never changed behind our back. Ids start out
+        equal to the old rowids, so the index itself carries over as it is.
+        """
+        self._drop_triggers(cursor)
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS aliases (
-                input_text TEXT PRIMARY KEY,
-                real_name TEXT,
-                last_checked TIMESTAMP
+            CREATE TABLE catalog_v10 (
+                id INTEGER PRIMARY KEY,
+                scryfall_id TEXT NOT NULL UNIQUE,
+                normalized_name TEXT,
+                set_code TEXT,
+                set_name TEXT,
+                collector_number TEXT,
+                rarity TEXT,
+                released_at TEXT,
+                flavor_text TEXT,
+                artist TEXT,
+                image_url TEXT,
+                price_usd REAL,
+                price_foil REAL,
+                scryfall_uri TEXT,
+                last_fetched TIMESTAMP
             )
         ''')
-        
-        conn.commit()
-        conn.close()
+        cursor.execute(f'''
+            INSERT INTO catalog_v10 (id, {", ".join(PRINTING_COLUMNS)})
+            SELECT rowid, {", ".join(PRINTING_COLUMNS)} FROM catalog
+            WHERE scryfall_id IS NOT NULL
+        ''')
+        cursor.execute("DROP TABLE catalog")
+        cursor.execute("ALTER TABLE catalog_v10 RENAME TO catalog")
+        cursor.execute("DELETE FROM catalog_fts WHERE rowid NOT IN (SELECT id FROM catalog)")
 
-    def add_to_catalog(self, data):
-        """Parses Scryfall JSON -> DB"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor.execute("CREATE INDEX idx_catalog_name ON catalog(normalized_name)")
+        cursor.execute("CREATE INDEX idx_catalog_price ON catalog(price_usd)")
+        cursor.execute("CREATE INDEX idx_catalog_rarity ON catalog(rarity, price_usd)")
+        self._create_summary_triggers(cursor)
+        self._create_aggregate_triggers(cursor)
+        self._create_search_triggers(cursor, "id")
 
+    def _drop_triggers(self, cursor):
+        """Drops every trigger (ahead of a table rebuild; the caller recreates them)."""
+        names = [row[0] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")]
+        for name in names:
+            cursor.execute(f"DROP TRIGGER {name}")
+
+    def _rebuild_search_index(self, cursor):
+        """Refills catalog_fts from catalog + oracle."""
+        cursor.execute("DELETE FROM catalog_fts")
+        cursor.execute(f'''
+            INSERT INTO catalog_fts (rowid, {", ".join(SEARCH_COLUMNS)})
+            SELECT c.rowid, {SEARCH_VALUES.format(c="c")}
+            FROM catalog c LEFT JOIN oracle o ON o.normalized_name = c.normalized_name
+        ''')
+        cursor.execute("INSERT INTO catalog_fts (catalog_fts) VALUES ('optimize')")
+
+    def _rebuild_aggregates(self, cursor):
+        """Recomputes collection_breakdown and collection_top with full GROUP BYs."""
+        cursor.execute("DELETE FROM collection_breakdown")
+        for dim, key in BREAKDOWN_KEYS.items():
+            cursor.execute(f'''
+                INSERT INTO collection_breakdown (dimension, key, card_count, total_value)
+                SELECT '{dim}', {key("c")}, COUNT(*), COALESCE(SUM(c.price_usd), 0)
+                FROM collection col
+                JOIN catalog c ON c.scryfall_id = col.scryfall_id
+                LEFT JOIN oracle o ON o.normalized_name = c.normalized_name
+                WHERE {key("c")} IS NOT NULL
+                GROUP BY 2
+            ''')
+        for sql in TOP_CARDS_REFRESH:
+            cursor.execute(sql)
+
+    def _add_missing_columns(self, cursor, table, columns):
+        """Brings databases created by older versions up to the current schema."""
+        existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+        for name, col_type in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}")
+
+    def _create_legacy_summary_triggers(self, cursor):
+        """
+        Version-0 triggers (catalog keyed by name), replaced by migration 3.
+        Keeps collection_summary equal to COUNT(*)/SUM(price_usd) over collection JOIN catalog.
+        Collection rows only count once their catalog entry exists (same as the JOIN).
+        """
+        cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS trg_summary_col_insert AFTER INSERT ON collection
+            BEGIN
+                UPDATE collection_summary SET
+                    card_count = card_count + (SELECT COUNT(*) FROM catalog WHERE normalized_name = NEW.normalized_name),
+                    total_value = total_value + COALESCE((SELECT price_usd FROM catalog WHERE normalized_name = NEW.normalized_name), 0)
+                WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_summary_col_delete AFTER DELETE ON collection
+            BEGIN
+                UPDATE collection_summary SET
+                    card_count = card_count - (SELECT COUNT(*) FROM catalog WHERE normalized_name = OLD.normalized_name),
+                    total_value = total_value - COALESCE((SELECT price_usd FROM catalog WHERE normalized_name = OLD.normalized_name), 0)
+                WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_summary_col_rename AFTER UPDATE OF normalized_name ON collection
+            WHEN OLD.normalized_name IS NOT NEW.normalized_name
+            BEGIN
+                UPDATE collection_summary SET
+                    card_count = card_count
+                        - (SELECT COUNT(*) FROM catalog WHERE normalized_name = OLD.normalized_name)
+                        + (SELECT COUNT(*) FROM catalog WHERE normalized_name = NEW.normalized_name),
+                    total_value = total_value
+                        - COALESCE((SELECT price_usd FROM catalog WHERE normalized_name = OLD.normalized_name), 0)
+                        + COALESCE((SELECT price_usd FROM catalog WHERE normalized_name = NEW.normalized_name), 0)
+                WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_summary_cat_insert AFTER INSERT ON catalog
+            BEGIN
+                UPDATE collection_summary SET
+                    card_count = card_count + (SELECT COUNT(*) FROM collection WHERE normalized_name = NEW.normalized_name),
+                    total_value = total_value + COALESCE(NEW.price_usd, 0) * (SELECT COUNT(*) FROM collection WHERE normalized_name = NEW.normalized_name)
+                WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_summary_cat_price AFTER UPDATE OF price_usd ON catalog
+            WHEN OLD.price_usd IS NOT NEW.price_usd
+            BEGIN
+                UPDATE collection_summary SET
+                    total_value = total_value
+                        + (COALESCE(NEW.price_usd, 0) - COALESCE(OLD.price_usd, 0))
+                        * (SELECT COUNT(*) FROM collection WHERE normalized_name = NEW.normalized_name)
+                WHERE id = 1;
+            END;
+
+            CREATE TRIGGER IF NOT EXISTS trg_summary_cat_delete AFTER DELETE ON catalog
+            BEGIN
+                UPDATE collection_summary SET
+                    card_count = card_count - (SELECT COUNT(*) FROM collection WHERE normalized_name = OLD.normalized_name),
+                    total_value = total_value - COALESCE(OLD.price_usd, 0) * (SELECT COUNT(*) FROM collection WHERE normalized_name = OLD.normalized_name)
+                WHERE id = 1;
+            END;
+        ''')
+
+    def add_to_catalog(self, data, as_default=False):
+        """
+        Parses Scryfall JSON -> DB: the printing's catalog row plus its card's oracle row.
+        as_default marks a name lookup's answer (Scryfall's newest paper printing): new
+        scans of the name point at it from now on. Other printings (identified scans,
+        imports) only become the default of a name that has none yet.
+        """
+        rows = self._catalog_rows(data, as_default)
+        if self.writer:
+            self.writer.add_catalog(rows)
+        else:
+            self._apply_writes([rows], [], {})
+
+    def _catalog_rows(self, data, as_default=False):
+        """(oracle_row, printing_row, as_default), rows in ORACLE_COLUMNS / PRINTING_COLUMNS order."""
         prices = data.get('prices', {})
         uris = data.get('image_uris', {})
-        
-        cursor.execute('''
-            INSERT OR REPLACE INTO catalog (
-                normalized_name, scryfall_id, display_name, 
-                set_code, set_name, collector_number, rarity, released_at,
-                mana_cost, cmc, type_line, oracle_text, flavor_text,
-                power, toughness, colors, legalities, artist,
-                image_url, price_usd, price_foil, scryfall_uri,
-                last_fetched
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        colors = data.get('colors')
+        if colors is None and data.get('card_faces'):
+            # Double-faced cards only carry colours per face
+            colors = sorted({c for face in data['card_faces'] for c in face.get('colors', [])})
+        colors = colors or []
+        oracle_row = (
             data['name'].lower(),
-            data.get('id'),
+            data.get('oracle_id'),
             data.get('name'),
-            data.get('set'),
-            data.get('set_name'),
-            data.get('collector_number'),
-            data.get('rarity'),
-            data.get('released_at'), # NEW
             data.get('mana_cost'),
             data.get('cmc'),
             data.get('type_line'),
             data.get('oracle_text'),
-            data.get('flavor_text'), # NEW
             data.get('power'),
             data.get('toughness'),
-            json.dumps(data.get('colors', [])),
+            json.dumps(colors),
             json.dumps(data.get('legalities', {})),
+            data.get('id'),
+            color_mask(colors),
+            color_mask(data.get('color_identity', colors))
+        )
+        printing_row = (
+            data.get('id'),
+            data['name'].lower(),
+            data.get('set'),
+            data.get('set_name'),
+            data.get('collector_number'),
+            data.get('rarity'),
+            data.get('released_at'),
+            data.get('flavor_text'),
             data.get('artist'),
             uris.get('normal'),
-            prices.get('usd'),
-            prices.get('usd_foil'),
+            # Same as the REAL column affinity, so queued rows read back like stored ones
+            float(prices['usd']) if prices.get('usd') else None,
+            float(prices['usd_foil']) if prices.get('usd_foil') else None,
             data.get('scryfall_uri'),
             datetime.now().isoformat()
-        ))
-        
-        conn.commit()
-        conn.close()
+        )
+        return oracle_row, printing_row, as_default
+
+    def _apply_writes(self, catalog_rows, alias_rows, scans):
+        """
+        Writes catalog rows, alias rows and scan changes in ONE transaction.
+        catalog_rows: [(oracle_row, printing_row, as_default)].
+        scans: {tracker_id: ('update', name, path, date, scryfall_id) | ('delete',)}.
+        A scan without a scryfall_id points at its name's default printing.
+        Replaced/deleted scan images are removed only after the commit.
+        """
+        conn = self._conn()
+        cursor = conn.cursor()
+        stale_files = []
+        try:
+            if catalog_rows:
+                cursor.executemany(ORACLE_UPSERT, [o for o, _, _ in catalog_rows])
+                cursor.executemany(CATALOG_UPSERT, [p for _, p, _ in catalog_rows])
+                cursor.executemany(SET_DEFAULT_PRINTING, [(p[0], p[1]) for _, p, default in catalog_rows if default])
+            if alias_rows:
+                cursor.executemany('INSERT OR REPLACE INTO aliases (input_text, real_name, last_checked) VALUES (?, ?, ?)',
+                                   alias_rows)
+            if scans:
+                existing = {}
+                ids = list(scans)
+                for i in range(0, len(ids), 500):
+                    chunk = ids[i:i + 500]
+                    marks = ",".join("?" * len(chunk))
+                    for tid, path, name in cursor.execute(
+                            f"SELECT tracker_id, local_image_path, normalized_name FROM collection WHERE tracker_id IN ({marks})", chunk):
+                        existing[tid] = (path, name)
+
+                updates, renamed, inserts, deletes = [], [], [], []
+                default = "(SELECT default_printing FROM oracle WHERE normalized_name = ?)"
+                for tracker_id, op in scans.items():
+                    old = existing.get(tracker_id)
+                    if op[0] == 'delete':
+                        if old:
+                            deletes.append((tracker_id,))
+                            if old[0]: stale_files.append(old[0])
+                        continue
+                    _, name, path, date, scryfall_id = op
+                    if old:
+                        if old[0] and old[0] != path: stale_files.append(old[0])
+                        if old[1] != name:
+                            # Different card now: the old printing no longer applies
+                            renamed.append((name, path, date, scryfall_id, name, tracker_id))
+                        else:
+                            # Same card: keep whatever printing it was identified as
+                            updates.append((path, date, scryfall_id, name, tracker_id))
+                    else:
+                        inserts.append((tracker_id, name, date, path, scryfall_id, name))
+
+                cursor.executemany(f'''UPDATE collection SET local_image_path=?, date_scanned=?,
+                                      scryfall_id=COALESCE(scryfall_id, ?, {default}) WHERE tracker_id=?''', updates)
+                cursor.executemany(f'''UPDATE collection SET normalized_name=?, local_image_path=?, date_scanned=?,
+                                      scryfall_id=COALESCE(?, {default}),
+                                      printing_confidence=NULL, printing_checked=NULL
+                                      WHERE tracker_id=?''', renamed)
+                cursor.executemany(f'''INSERT INTO collection (tracker_id, normalized_name, date_scanned, local_image_path, scryfall_id)
+                                      VALUES (?, ?, ?, ?, COALESCE(?, {default}))''', inserts)
+                cursor.executemany("DELETE FROM collection WHERE tracker_id = ?", deletes)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        for path in stale_files:
+            if os.path.exists(path):
+                try: os.remove(path)
+                except: pass
+
+    # --- WRITE-BEHIND ---
+
+    def start_write_behind(self, on_flush=None):
+        """
+        Queue catalog/alias/scan writes from now on and commit them in batches.
+        on_flush() runs (on the flushing thread) after each committed batch.
+        """
+        if self.writer: return
+        self.writer = WriteBehindQueue(self, on_flush)
+        self.writer.start()
+
+    def flush(self):
+        """Barrier: returns once every queued write is committed."""
+        if self.writer: self.writer.flush()
+
+    def stop_write_behind(self):
+        """Flushes and goes back to writing straight through."""
+        if not self.writer: return
+        writer, self.writer = self.writer, None
+        writer.stop()
 
     # --- KEEP ALL OTHER METHODS (get_catalog_card, get_alias, update_scan, etc.) EXACTLY AS THEY WERE ---
     # Copy them from the previous task. The only change in this file is _init_db and add_to_catalog.
     
     def get_catalog_card(self, name):
         normalized = name.lower().strip()
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        if self.writer:
+            pending = self.writer.get_catalog(normalized)
+            if pending: return {**dict(zip(ORACLE_COLUMNS, pending[0])), **dict(zip(PRINTING_COLUMNS, pending[1]))}
+        conn = self._conn()
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM catalog WHERE normalized_name = ?", (normalized,))
+        cursor.row_factory = sqlite3.Row
+        # The name's default printing
+        cursor.execute('''
+            SELECT o.*, c.* FROM oracle o
+            JOIN catalog c ON c.scryfall_id = o.default_printing
+            WHERE o.normalized_name = ?
+        ''', (normalized,))
+        row = cursor.fetchone()
+        return dict(row) if row else None
+
+    def get_printing(self, scryfall_id):
+        """One printing with its card's oracle columns, or None if it isn't catalogued."""
+        if self.writer:
+            pending = self.writer.get_printing(scryfall_id)
+            if pending: return {**dict(zip(ORACLE_COLUMNS, pending[0])), **dict(zip(PRINTING_COLUMNS, pending[1]))}
+        conn = self._conn()
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute('''
+            SELECT o.*, c.* FROM catalog c
+            JOIN oracle o ON o.normalized_name = c.normalized_name
+            WHERE c.scryfall_id = ?
+        ''', (scryfall_id,))
         row = cursor.fetchone()
-        conn.close()
         return dict(row) if row else None
 
     def get_alias(self, ocr_text):
         normalized = ocr_text.lower().strip()
-        conn = sqlite3.connect(self.db_path)
+        row = self.writer.get_alias(normalized) if self.writer else None
+        if row: return row[1] if row[1] is not None else False
+        conn = self._conn()
         cursor = conn.cursor()
         cursor.execute("SELECT real_name FROM aliases WHERE input_text = ?", (normalized,))
         row = cursor.fetchone()
-        conn.close()
         if row: return row[0] if row[0] is not None else False
         return None
 
     def add_alias(self, ocr_text, real_name):
         normalized_in = ocr_text.lower().strip()
         normalized_real = real_name.lower().strip() if real_name else None
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('INSERT OR REPLACE INTO aliases (input_text, real_name, last_checked) VALUES (?, ?, ?)', 
-                       (normalized_in, normalized_real, datetime.now().isoformat()))
-        conn.commit()
-        conn.close()
+        row = (normalized_in, normalized_real, datetime.now().isoformat())
+        if self.writer:
+            self.writer.add_alias(row)
+        else:
+            self._apply_writes([], [row], {})
 
-    def update_scan(self, tracker_id, name, local_path):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, local_image_path FROM collection WHERE tracker_id = ?", (tracker_id,))
-        row = cursor.fetchone()
-        if row:
-            old_path = row[1]
-            if old_path and os.path.exists(old_path) and old_path != local_path:
-                try: os.remove(old_path)
-                except: pass
-            cursor.execute('''UPDATE collection SET normalized_name=?, local_image_path=?, date_scanned=? WHERE tracker_id=?''',
-                           (name.lower(), local_path, datetime.now().isoformat(), tracker_id))
+    def update_scan(self, tracker_id, name, local_path, scryfall_id=None):
+        """Saves a scan. scryfall_id: its printing if known (else the name's default printing)."""
+        op = ('update', name.lower(), local_path, datetime.now().isoformat(), scryfall_id)
+        if self.writer:
+            self.writer.update_scan(tracker_id, *op[1:])
         else:
-            cursor.execute('''INSERT INTO collection (tracker_id, normalized_name, date_scanned, local_image_path) VALUES (?, ?, ?, ?)''',
-                           (tracker_id, name.lower(), datetime.now().isoformat(), local_path))
-        conn.commit()
-        conn.close()
+            self._apply_writes([], [], {tracker_id: op})
 
     def delete_scan(self, tracker_id):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT local_image_path FROM collection WHERE tracker_id = ?", (tracker_id,))
-        row = cursor.fetchone()
-        if row and row[0] and os.path.exists(row[0]):
-            try: os.remove(row[0])
-            except: pass
-        cursor.execute("DELETE FROM collection WHERE tracker_id = ?", (tracker_id,))
+        if self.writer:
+            self.writer.delete_scan(tracker_id)
+        else:
+            self._apply_writes([], [], {tracker_id: ('delete',)})
+
+    def set_scan_printing(self, tracker_id, scryfall_id, confidence):
+        """Records the Inspector's verdict for one scan (scryfall_id None keeps its current printing)."""
+        conn = self._conn()
+        conn.execute('''UPDATE collection SET scryfall_id=COALESCE(?, scryfall_id), printing_confidence=?, printing_checked=?
+                        WHERE tracker_id=?''', (scryfall_id, confidence, datetime.now().isoformat(), tracker_id))
+        conn.commit()
+
+    def get_unidentified_scans(self, include_unsure=False):
+        """
+        Scans the batch identifier still has to look at: (id, normalized_name, local_image_path).
+        include_unsure also returns rows whose last verdict was below MATCH_MIN_CONFIDENCE.
+        """
+        conn = self._conn()
+        query = "SELECT id, normalized_name, local_image_path FROM collection WHERE printing_checked IS NULL"
+        params = ()
+        if include_unsure:
+            query += " OR printing_confidence IS NULL OR printing_confidence < ?"
+            params = (config.MATCH_MIN_CONFIDENCE,)
+        rows = conn.execute(query + " ORDER BY normalized_name, id", params).fetchall()
+        return rows
+
+    def set_scan_printings(self, results):
+        """Checkpoints a batch of verdicts: iterable of (row_id, scryfall_id or None, confidence)."""
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        conn.executemany('''UPDATE collection SET scryfall_id=COALESCE(?, scryfall_id), printing_confidence=?, printing_checked=?
+                            WHERE id=?''', [(sid, conf, now, row_id) for row_id, sid, conf in results])
         conn.commit()
-        conn.close()
 
     def get_collection_summary(self):
-        conn = sqlite3.connect(self.db_path)
+        """O(1) read of the trigger-maintained running totals."""
+        conn = self._conn()
+        cursor = conn.cursor()
+        cursor.execute("SELECT card_count, total_value FROM collection_summary WHERE id = 1")
+        row = cursor.fetchone()
+        if not row: return 0, 0.0
+        count = row[0] if row[0] else 0
+        val = round(row[1], 2) if row[1] else 0.0
+        return count, val
+
+    def reconcile_collection_summary(self):
+        """
+        Recomputes the totals and dashboard aggregates with full JOINs and overwrites
+        the running rows. Corrects drift (float accumulation, manual edits). Returns (count, value).
+        """
+        conn = self._conn()
         cursor = conn.cursor()
         cursor.execute("""
             SELECT COUNT(*), SUM(c.price_usd)
             FROM collection col
-            JOIN catalog c ON col.normalized_name = c.normalized_name
+            JOIN catalog c ON c.scryfall_id = col.scryfall_id
         """)
         row = cursor.fetchone()
-        conn.close()
         count = row[0] if row[0] else 0
         val = row[1] if row[1] else 0.0
+        cursor.execute("""
+            INSERT OR REPLACE INTO collection_summary (id, card_count, total_value, last_reconciled)
+            VALUES (1, ?, ?, ?)
+        """, (count, val, datetime.now().isoformat()))
+        self._rebuild_aggregates(cursor)
+        conn.commit()
+        self._refresh_planner_stats(conn)
         return count, val
 
+    def _refresh_planner_stats(self, conn):
+        """
+        Re-runs ANALYZE when the collection has grown or shrunk 2x since the last one.
+        Without fresh statistics SQLite drives the JOINs from the wrong table and
+        ignores the price/rarity indexes.
+        """
+        rows = conn.execute("SELECT COUNT(*) FROM collection").fetchone()[0]
+        if rows < 1000: return
+        try:
+            stat = conn.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = 'collection' LIMIT 1").fetchone()
+        except sqlite3.OperationalError:
+            stat = None # Never analyzed
+        analyzed = int(stat[0].split()[0]) if stat else 0
+        if analyzed and analyzed / 2 <= rows <= analyzed * 2: return
+        logging.info(f"[DB] Refreshing planner statistics ({rows} collection rows)")
+        conn.execute("ANALYZE")
+        conn.commit()
+
     def get_dashboard_stats(self):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        """Dashboard home numbers, read from the trigger-maintained aggregate tables."""
         stats = {}
-        cursor.execute("SELECT COUNT(*), SUM(c.price_usd) FROM collection col JOIN catalog c ON col.normalized_name = c.normalized_name")
-        row = cursor.fetchone()
-        stats['total_count'] = row[0] if row[0] else 0
-        stats['total_value'] = round(row[1], 2) if row[1] else 0.00
-        cursor.execute("""
-            SELECT c.display_name, c.price_usd, col.local_image_path, col.tracker_id
-            FROM collection col
-            JOIN catalog c ON col.normalized_name = c.normalized_name
-            ORDER BY c.price_usd DESC LIMIT 1
-        """)
-        top = cursor.fetchone()
-        stats['top_card'] = dict(top) if top else None
-        cursor.execute("SELECT c.colors FROM collection col JOIN catalog c ON col.normalized_name = c.normalized_name")
-        rows = cursor.fetchall()
-        color_counts = {"W": 0, "U": 0, "B": 0, "R": 0, "G": 0, "Multi": 0, "Colorless": 0}
-        for r in rows:
-            try:
-                colors = json.loads(r['colors'])
-                if not colors: color_counts["Colorless"] += 1
-                elif len(colors) > 1: color_counts["Multi"] += 1
-                else: color_counts[colors[0]] += 1
-            except: pass
-        stats['colors'] = color_counts
-        cursor.execute("""
-            SELECT c.rarity, COUNT(*) 
-            FROM collection col 
-            JOIN catalog c ON col.normalized_name = c.normalized_name 
-            GROUP BY c.rarity
-        """)
-        rarity_rows = cursor.fetchall()
+        stats['total_count'], stats['total_value'] = self.get_collection_summary()
+        top = self.get_top_cards(1)
+        stats['top_card'] = top[0] if top else None
+        colors = self.get_breakdown('color')
+        stats['colors'] = {label: colors.get(label, (0, 0.0))[0]
+                           for label in list(COLOR_BITS) + ["Multi", "Colorless"]}
         rarity_counts = {"common": 0, "uncommon": 0, "rare": 0, "mythic": 0}
-        for r in rarity_rows:
-            r_name = r[0]
-            if r_name in rarity_counts: rarity_counts[r_name] = r[1]
-            else: rarity_counts[r_name] = r[1]
+        for r_name, (count, _) in self.get_breakdown('rarity').items():
+            rarity_counts[r_name] = count
         stats['rarity'] = rarity_counts
-        conn.close()
         return stats
 
-    def get_cards_by_filter(self, filter_type=None, filter_value=None, limit=100):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+    def get_breakdown(self, dimension):
+        """{key: (count, value)} for 'color', 'rarity' or 'set'; O(keys), not O(collection)."""
+        conn = self._conn()
+        rows = conn.execute(
+            "SELECT key, card_count, total_value FROM collection_breakdown WHERE dimension = ? AND card_count > 0",
+            (dimension,)).fetchall()
+        return {key: (count, round(value, 2)) for key, count, value in rows}
+
+    def get_top_cards(self, limit=TOP_CARDS_KEPT):
+        """Most valuable scans (up to TOP_CARDS_KEPT), from the trigger-maintained top list."""
+        conn = self._conn()
         cursor = conn.cursor()
-        query = """
-            SELECT col.tracker_id, c.display_name, c.price_usd, col.local_image_path, c.colors, c.rarity
-            FROM collection col
-            JOIN catalog c ON col.normalized_name = c.normalized_name
+        cursor.row_factory = sqlite3.Row
+        cursor.execute("""
+            SELECT o.display_name, c.price_usd, col.local_image_path, col.tracker_id
+            FROM collection_top t
+            JOIN collection col ON col.id = t.scan_id
+            JOIN catalog c ON c.scryfall_id = col.scryfall_id
+            JOIN oracle o ON o.normalized_name = c.normalized_name
+            ORDER BY t.price_usd DESC LIMIT ?
+        """, (min(limit, TOP_CARDS_KEPT),))
+        return [dict(r) for r in cursor.fetchall()]
+
+    def get_cards_by_filter(self, filter_type=None, filter_value=None, limit=100, after=None):
+        """
+        One page of scans, most valuable first (unpriced last), ties by scan id.
+        Keyset paging: pass the previous page's last (price_usd, scan_id) as `after`
+        for the next one, so every page costs the same however deep it is.
+        """
+        conn = self._conn()
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        query = f"""
+            SELECT col.id AS scan_id, col.tracker_id, o.display_name, c.price_usd, col.local_image_path, o.colors, c.rarity
+            FROM {COLLECTION_JOIN}
+            WHERE 1
         """
         params = []
         if filter_type == 'color':
-            if filter_value in ["W", "U", "B", "R", "G"]:
-                query += f" WHERE c.colors LIKE ?"
-                params.append(f'%"{filter_value}"%')
+            if filter_value in COLOR_BITS:
+                query += " AND o.color_mask & ? != 0"
+                params.append(COLOR_BITS[filter_value])
             elif filter_value == "Colorless":
-                query += " WHERE c.colors = '[]'"
+                query += " AND o.color_mask = 0"
             elif filter_value == "Multi":
-                query += " WHERE LENGTH(c.colors) > 6" 
+                query += " AND o.color_mask & (o.color_mask - 1) != 0"
         elif filter_type == 'rarity':
-            query += " WHERE c.rarity = ?"
+            query += " AND c.rarity = ?"
             params.append(filter_value)
-        query += " ORDER BY c.price_usd DESC NULLS LAST"
-        if limit: query += f" LIMIT {limit}"
-        cursor.execute(query, tuple(params))
-        rows = cursor.fetchall()
-        conn.close()
-        return [dict(r) for r in rows]
+
+        def fetch(seek, seek_params, order, n):
+            cursor.execute(f"{query} {seek} ORDER BY {order}" + (f" LIMIT {int(n)}" if n else ""),
+                           tuple(params + seek_params))
+            return [dict(r) for r in cursor.fetchall()]
+
+        price, scan_id = after or (None, None)
+        rows = []
+        if after is None or price is not None:
+            seek, seek_params = "AND c.price_usd IS NOT NULL", []
+            if after is not None:
+                # (price, id) past the cursor, written so the price indexes can range-scan it
+                seek, seek_params = "AND c.price_usd <= ? AND (c.price_usd < ? OR col.id > ?)", [price, price, scan_id]
+            rows = fetch(seek, seek_params, "c.price_usd DESC, col.id", limit)
+            scan_id = None # Priced rows ran out: the unpriced tail starts from its beginning
+        if not limit or len(rows) < limit:
+            seek, seek_params = ("AND c.price_usd IS NULL", []) if scan_id is None else \
+                                ("AND c.price_usd IS NULL AND col.id > ?", [scan_id])
+            rows += fetch(seek, seek_params, "col.id", limit - len(rows) if limit else None)
+        return rows
+
+    def search(self, text, limit=50, offset=0, counts=None):
+        """
+        Scans whose card matches `text` in name, type line, rules text, artist or set.
+        Pages through matching printings, `limit` at a time, each expanded to all of its
+        scans (printings nobody owns yield none). Name hits come first, shortest name
+        (closest to what was typed) first; the rest follow in catalog order. Each part is
+        one plain FTS lookup of at most SEARCH_COUNT_MAX + 1 ids (meaning "more"); bm25
+        ranking is left out, as scoring every prefix match alone blows the 10 ms budget.
+        A capped name part runs on to the last page offered. Pass the returned counts
+        back for the query's later pages: they then skip the lookups they can.
+        Returns (rows, (total_printings, name_hits)); rows have the get_cards_by_filter columns.
+        """
+        query = _fts_query(text)
+        if not query: return [], (0, 0)
+        conn = self._conn()
+        cap = config.SEARCH_COUNT_MAX + 1
+        reach = max(cap, offset + limit)
+        ids = "SELECT rowid FROM catalog_fts WHERE catalog_fts MATCH ? LIMIT ?"
+        capped = counts is not None and counts[1] >= cap
+        try:
+            named = [] if counts and not counts[1] else [
+                r[0] for r in conn.execute(ids, (f"name : ({query})", offset + limit if capped else reach))]
+            if capped or len(named) >= cap:
+                # More name hits than are counted: nothing else is ever reached
+                order, total = named, cap
+            else:
+                # Every name hit is also a hit on the full query: the rest is the difference
+                hits = [r[0] for r in conn.execute(ids, (query, reach + len(named)))]
+                is_name = set(named)
+                if len(named) > 1:
+                    named = [r[0] for r in conn.execute('''
+                        SELECT c.id FROM catalog c LEFT JOIN oracle o ON o.normalized_name = c.normalized_name
+                        WHERE c.id IN (SELECT value FROM json_each(?))
+                        ORDER BY length(o.display_name), o.display_name, c.id
+                    ''', (json.dumps(named),))]
+                order, total = named + [i for i in hits if i not in is_name], min(len(hits), cap)
+        except sqlite3.OperationalError as e:
+            logging.warning(f"[DB] Search failed for {text!r}: {e}")
+            return [], (0, 0)
+        counts = counts or (total, min(len(named), cap))
+        page = order[offset:offset + limit] # catalog ids in result order
+        if not page: return [], counts
+
+        cursor = conn.cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(f"""
+            SELECT c.id AS printing_key, col.tracker_id, o.display_name, c.price_usd,
+                   col.local_image_path, o.colors, c.rarity, c.set_code, o.type_line
+            FROM {COLLECTION_JOIN}
+            WHERE c.id IN ({", ".join("?" * len(page))})
+            ORDER BY col.id
+        """, page)
+        position = {key: i for i, key in enumerate(page)}
+        rows = sorted((dict(r) for r in cursor.fetchall()), key=lambda r: position[r.pop('printing_key')])
+        return rows, counts
 
     def get_recent_scans(self, limit=10):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._conn()
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT col.tracker_id, c.display_name, c.price_usd, col.local_image_path
-            FROM collection col
-            JOIN catalog c ON col.normalized_name = c.normalized_name
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(f"""
+            SELECT col.tracker_id, o.display_name, c.price_usd, col.local_image_path
+            FROM {COLLECTION_JOIN}
             ORDER BY col.date_scanned DESC
             LIMIT ?
         """, (limit,))
         rows = cursor.fetchall()
-        conn.close()
         return [dict(row) for row in rows]
 
+    # --- EXPORT / IMPORT (streaming) ---
+
+    def iter_collection(self, batch_size=None):
+        """
+        Every scan with its printing, in scan order, as dicts. Rows stream from a
+        live cursor `batch_size` at a time, so memory stays flat however big the collection.
+        """
+        cursor = self._conn().cursor()
+        cursor.row_factory = sqlite3.Row
+        cursor.arraysize = batch_size or config.EXPORT_BATCH_SIZE
+        cursor.execute(f"""
+            SELECT col.tracker_id, o.display_name AS name, c.set_code, c.set_name, c.collector_number,
+                   c.rarity, c.scryfall_id, c.price_usd, col.date_scanned, col.local_image_path
+            FROM {COLLECTION_JOIN}
+            ORDER BY col.id
+        """)
+        while True:
+            rows = cursor.fetchmany()
+            if not rows: break
+            for row in rows:
+                yield dict(row)
+
+    def iter_printing_counts(self, batch_size=None):
+        """(count, name, set_code, set_name, collector_number, price_usd) per owned printing, by name."""
+        cursor = self._conn().cursor()
+        cursor.arraysize = batch_size or config.EXPORT_BATCH_SIZE
+        cursor.execute(f"""
+            SELECT COUNT(*), o.display_name, c.set_code, c.set_name, c.collector_number, c.price_usd
+            FROM {COLLECTION_JOIN}
+            GROUP BY c.scryfall_id
+            ORDER BY o.display_name, c.set_code, c.collector_number
+        """)
+        while True:
+            rows = cursor.fetchmany()
+            if not rows: break
+            yield from rows
+
+    def known_printings(self, scryfall_ids):
+        """{scryfall_id: normalized_name} for the ids already in the catalog."""
+        ids = list(scryfall_ids)
+        conn = self._conn()
+        known = {}
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            known.update(conn.execute(f"SELECT scryfall_id, normalized_name FROM catalog WHERE scryfall_id IN ({marks})", chunk))
+        return known
+
+    def import_scans(self, scans, cards=()):
+        """
+        Bulk insert for importers, in ONE transaction: catalog entries for `cards`
+        (Scryfall JSON), then new collection rows for
+        scans = [(tracker_id, normalized_name, date_scanned, local_image_path, scryfall_id)].
+        Scans whose tracker_id is already in the collection (e.g. our own export read
+        back into the same database) are skipped. Returns the number of scans added.
+        """
+        conn = self._conn()
+        try:
+            rows = [self._catalog_rows(card) for card in cards]
+            if rows:
+                conn.executemany(ORACLE_UPSERT, [o for o, _, _ in rows])
+                conn.executemany(CATALOG_UPSERT, [p for _, p, _ in rows])
+            added = conn.executemany('''INSERT INTO collection (tracker_id, normalized_name, date_scanned, local_image_path, scryfall_id)
+                                        SELECT ?, ?, ?, ?, ?
+                                        WHERE NOT EXISTS (SELECT 1 FROM collection WHERE tracker_id = ?)''',
+                                     [scan + (scan[0],) for scan in scans]).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return added
+
+    # --- PRICE HISTORY ---
+
+    def iter_catalog_ids(self, batch_size=None):
+        """Yields lists of every catalogued scryfall_id, `batch_size` at a time."""
+        cursor = self._conn().cursor()
+        cursor.arraysize = batch_size or config.PRICE_REFRESH_BATCH_SIZE
+        cursor.execute("SELECT scryfall_id FROM catalog ORDER BY scryfall_id")
+        while True:
+            rows = cursor.fetchmany()
+            if not rows: break
+            yield [r[0] for r in rows]
+
+    def record_prices(self, prices):
+        """
+        Writes current prices, prices = [(scryfall_id, price_usd, price_foil)], to the
+        catalog in ONE transaction. Only rows whose price moved are updated, so the
+        aggregate triggers fire for real changes only. Returns the number of rows changed.
+        """
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        try:
+            changed = conn.executemany('''UPDATE catalog SET price_usd = ?, price_foil = ?, last_fetched = ?
+                                          WHERE scryfall_id = ? AND (price_usd IS NOT ? OR price_foil IS NOT ?)''',
+                                       [(usd, foil, now, sid, usd, foil) for sid, usd, foil in prices]).rowcount
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return changed
+
+    def snapshot_prices(self, day=None, value_day=None):
+        """
+        Copies every catalog price into price_history for `day`, and the collection's
+        count and value into collection_value_history for `value_day` (default: `day`),
+        in ONE transaction (replacing an earlier run those days). The two differ when the
+        prices are older than the collection they value, e.g. from a stale bulk mirror.
+        """
+        day = day or date.today()
+        conn = self._conn()
+        try:
+            conn.execute(PRICE_SNAPSHOT, (day_number(day),))
+            conn.execute(VALUE_SNAPSHOT, (day_number(value_day or day),))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def get_value_history(self, days=None, points=None):
+        """
+        [(date, collection_value)] recorded by each price snapshot over the last `days`,
+        thinned to about `points` snapshots (the newest is always kept).
+        """
+        days = days or config.PRICE_HISTORY_DAYS
+        step = max(1, days // (points or config.PRICE_HISTORY_POINTS))
+        since = day_number(date.today()) - days
+        rows = self._conn().execute(
+            "SELECT day, total_value FROM collection_value_history WHERE day > ? ORDER BY day", (since,)).fetchall()
+        kept = []
+        for i, (day, value) in enumerate(rows):
+            if not kept or day >= kept[-1][0] + step or i == len(rows) - 1:
+                kept.append((day, value))
+        return [(PRICE_EPOCH + timedelta(days=day), value) for day, value in kept]
+
     def get_card_details(self, tracker_id):
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        conn = self._conn()
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT col.*, c.*
-            FROM collection col
-            JOIN catalog c ON col.normalized_name = c.normalized_name
+        cursor.row_factory = sqlite3.Row
+        cursor.execute(f"""
+            SELECT o.*, c.*, col.* -- Last wins: `id` is the scan's
+            FROM {COLLECTION_JOIN}
             WHERE col.tracker_id = ?
         """, (tracker_id,))
         row = cursor.fetchone()
-        conn.close()
         return dict(row) if row else None
\ No newline at end of file
@@ -0,0 +1,83 @@
+import sqlite3
+import os
+import numpy as np
+import config
+
+HASH_BITS = 256          # 16x16 dHash
+HIST_BINS = (30, 32)     # Hue x Saturation
+
+
+class FingerprintStore:
+    """
+    Persistent visual fingerprints keyed by Scryfall printing ID.
+    Each row holds the packed 16x16 dHash (32 bytes) and the normalized
+    H-S histogram (float32), so matching never has to decode a thumbnail twice.
+    """
+    def __init__(self, db_path=None):
+        self.db_path = db_path or config.FINGERPRINT_DB_PATH
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                scryfall_id TEXT PRIMARY KEY,
+                dhash BLOB,
+                hist BLOB
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def put(self, scryfall_id, hash_bits, hist):
+        """hash_bits: flat bool array (256). hist: H-S histogram (any shape, 960 values)."""
+        self.put_many([(scryfall_id, hash_bits, hist)])
+
+    def put_many(self, rows):
+        """Stores [(scryfall_id, hash_bits, hist)] (as for put) in ONE transaction."""
+        packed = [(sid, np.packbits(np.asarray(hash_bits, dtype=bool)).tobytes(),
+                   np.asarray(hist, dtype=np.float32).ravel().tobytes()) for sid, hash_bits, hist in rows]
+        if not packed: return
+        conn = self._connect()
+        try:
+            conn.executemany("INSERT OR REPLACE INTO fingerprints (scryfall_id, dhash, hist) VALUES (?, ?, ?)", packed)
+            conn.commit()
+        finally:
+            conn.close()
+
+    def get_many(self, scryfall_ids):
+        """Returns {scryfall_id: (packed_hash uint8[32], hist float32[960])} for the IDs we have."""
+        ids = list(scryfall_ids)
+        found = {}
+        conn = self._connect()
+        # Stay under SQLite's bound-parameter limit
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            marks = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT scryfall_id, dhash, hist FROM fingerprints WHERE scryfall_id IN ({marks})", chunk)
+            for sid, dhash, hist in rows:
+                found[sid] = (np.frombuffer(dhash, dtype=np.uint8), np.frombuffer(hist, dtype=np.float32))
+        conn.close()
+        return found
+
+    def iter_hashes(self, batch_size=5000):
+        """Yields (scryfall_id, packed_hash) for every stored printing."""
+        conn = self._connect()
+        cursor = conn.execute("SELECT scryfall_id, dhash FROM fingerprints")
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows: break
+            for sid, dhash in rows:
+                yield sid, np.frombuffer(dhash, dtype=np.uint8)
+        conn.close()
+
+    def count(self):
+        conn = self._connect()
+        row = conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()
+        conn.close()
+        return row[0]
@@ -0,0 +1,146 @@
+import sqlite3
+import os
+import glob
+import time
+import threading
+import logging
+import cv2
+import numpy as np
+import config
+
+# cv2 flags for decoding at 1/1, 1/2, 1/4, 1/8 resolution (much cheaper than decode + resize)
+REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+
+class ThumbStore:
+    """
+    Single-file image store (SQLite BLOBs) replacing one-JPEG-per-printing directories.
+    Matcher thumbnails are downscaled before storing; the file is held under a
+    byte budget by evicting the least recently used images. Reads only note their
+    access time in memory; those are written in one batch every
+    THUMB_STORE_ACCESS_FLUSH seconds (and before any eviction), so concurrent
+    readers (e.g. the batch job's worker processes) never queue for the write lock.
+    """
+    def __init__(self, db_path=None, max_bytes=None):
+        self.db_path = db_path or config.THUMB_STORE_PATH
+        self.max_bytes = max_bytes or config.THUMB_STORE_MAX_BYTES
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.accessed = {} # key -> access time not yet written
+        self.accessed_flushed = time.time()
+        self._init_db()
+        self.total_bytes = self._sum_bytes()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL") # Persistent: readers no longer block on a writer
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS images (
+                key TEXT PRIMARY KEY,
+                data BLOB,
+                size INTEGER,
+                last_access REAL
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_images_access ON images(last_access)")
+        conn.commit()
+        conn.close()
+
+    def _sum_bytes(self):
+        conn = self._connect()
+        row = conn.execute("SELECT COALESCE(SUM(size), 0) FROM images").fetchone()
+        conn.close()
+        return row[0]
+
+    def _shrink(self, data, max_width):
+        """Re-encode at most max_width wide. Returns the original bytes if already small enough."""
+        img = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        if img is None: return None
+        h, w = img.shape[:2]
+        if w <= max_width: return data
+        small = cv2.resize(img, (max_width, int(h * max_width / w)), interpolation=cv2.INTER_AREA)
+        ok, buf = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, config.THUMB_STORE_QUALITY])
+        return buf.tobytes() if ok else None
+
+    def put(self, key, data, max_width=None):
+        """Stores encoded image bytes, optionally downscaled first. Returns False if undecodable."""
+        if max_width:
+            data = self._shrink(data, max_width)
+            if data is None: return False
+        size = len(data)
+        with self.lock:
+            conn = self._connect()
+            old = conn.execute("SELECT size FROM images WHERE key = ?", (key,)).fetchone()
+            conn.execute("INSERT OR REPLACE INTO images (key, data, size, last_access) VALUES (?, ?, ?, ?)",
+                         (key, data, size, time.time()))
+            self.total_bytes += size - (old[0] if old else 0)
+            self._flush_access(conn)
+            self._evict(conn)
+            conn.commit()
+            conn.close()
+        return True
+
+    def _flush_access(self, conn):
+        """Writes the buffered access times (caller holds the lock and commits)."""
+        if self.accessed:
+            conn.executemany("UPDATE images SET last_access = ? WHERE key = ? AND last_access < ?",
+                             [(t, key, t) for key, t in self.accessed.items()])
+        self.accessed = {}
+        self.accessed_flushed = time.time()
+
+    def _evict(self, conn):
+        """Drops least recently used images until back under budget (caller holds the lock)."""
+        if self.total_bytes <= self.max_bytes: return
+        target = self.max_bytes * 0.9 # Hysteresis: don't evict on every put
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM images ORDER BY last_access ASC"):
+            if self.total_bytes <= target: break
+            victims.append((key,))
+            self.total_bytes -= size
+        conn.executemany("DELETE FROM images WHERE key = ?", victims)
+        logging.info(f"[ThumbStore] Evicted {len(victims)} images")
+
+    def has(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT 1 FROM images WHERE key = ?", (key,)).fetchone()
+        conn.close()
+        return row is not None
+
+    def get_bytes(self, key):
+        conn = self._connect()
+        row = conn.execute("SELECT data FROM images WHERE key = ?", (key,)).fetchone()
+        with self.lock:
+            if row: self.accessed[key] = time.time()
+            if self.accessed and time.time() - self.accessed_flushed >= config.THUMB_STORE_ACCESS_FLUSH:
+                self._flush_access(conn)
+                conn.commit()
+        conn.close()
+        return row[0] if row else None
+
+    def load(self, key, reduce=1):
+        """Decoded BGR image, optionally at 1/2, 1/4 or 1/8 resolution. None if missing."""
+        data = self.get_bytes(key)
+        if data is None: return None
+        return cv2.imdecode(np.frombuffer(data, np.uint8), REDUCED_FLAGS.get(reduce, cv2.IMREAD_COLOR))
+
+    def import_legacy_files(self, pattern, key_fn, max_width=None):
+        """Moves loose image files (old cache layout) into the store. Returns how many were imported."""
+        count = 0
+        for path in glob.glob(pattern):
+            key = key_fn(os.path.basename(path))
+            try:
+                with open(path, 'rb') as f:
+                    if self.put(key, f.read(), max_width): count += 1
+                os.remove(path)
+            except OSError as e:
+                logging.warning(f"[ThumbStore] Could not import {path}: {e}")
+        if count: logging.info(f"[ThumbStore] Imported {count} legacy files from {pattern}")
+        return count
@@ -0,0 +1,142 @@
+import os
+import threading
+import logging
+import config
+
+
+class WriteBehindQueue:
+    """
+    Buffers DBManager mutations and commits them in one transaction every
+    WRITE_BEHIND_INTERVAL_MS or WRITE_BEHIND_MAX_OPS operations, whichever comes first.
+    Repeated writes to the same printing, alias or tracker_id collapse to the
+    latest one. Pending catalog/alias rows stay readable through get_catalog/get_alias,
+    so callers never see their own writes go missing before a flush.
+    """
+    def __init__(self, db, on_flush=None):
+        self.db = db
+        self.on_flush = on_flush
+        self.interval = config.WRITE_BEHIND_INTERVAL_MS / 1000.0
+        self.max_ops = config.WRITE_BEHIND_MAX_OPS
+        self.cond = threading.Condition()
+        self.flush_lock = threading.Lock() # One flush at a time (timer vs barrier)
+        self._reset()
+        self.inflight = ({}, {}, {}) # Snapshot being committed; still visible to readers
+        self.ops = 0
+        self._running = False
+        self.thread = None
+
+    def _reset(self):
+        self.catalog = {}  # scryfall_id -> (oracle_row, printing_row, as_default)
+        self.aliases = {}  # input_text -> alias row tuple
+        self.scans = {}    # tracker_id -> ('update', name, path, date, scryfall_id) | ('delete',)
+        self.orphans = []  # Scan images superseded before they ever reached the DB
+
+    def start(self):
+        self._running = True
+        self.thread = threading.Thread(target=self._run, name="DBWriteBehind", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self._running:
+            with self.cond:
+                self.cond.wait_for(lambda: not self._running or self.ops >= self.max_ops, timeout=self.interval)
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"[DB] Write-behind flush failed, will retry: {e}")
+
+    # --- ENQUEUE ---
+
+    def _added(self):
+        self.ops += 1
+        if self.ops >= self.max_ops: self.cond.notify()
+
+    def add_catalog(self, rows):
+        with self.cond:
+            prev = self.catalog.get(rows[1][0])
+            if prev and prev[2] and not rows[2]:
+                rows = (rows[0], rows[1], True) # Still the name's pick
+            self.catalog[rows[1][0]] = rows
+            self._added()
+
+    def add_alias(self, row):
+        with self.cond:
+            self.aliases[row[0]] = row
+            self._added()
+
+    def update_scan(self, tracker_id, name, local_path, date, scryfall_id):
+        with self.cond:
+            self._supersede(tracker_id, local_path)
+            self.scans[tracker_id] = ('update', name, local_path, date, scryfall_id)
+            self._added()
+
+    def delete_scan(self, tracker_id):
+        with self.cond:
+            self._supersede(tracker_id, None)
+            self.scans[tracker_id] = ('delete',)
+            self._added()
+
+    def _supersede(self, tracker_id, new_path):
+        prev = self.scans.get(tracker_id)
+        if prev and prev[0] == 'update' and prev[2] and prev[2] != new_path:
+            self.orphans.append(prev[2])
+
+    # --- READ-THROUGH ---
+
+    def get_catalog(self, normalized_name):
+        """Pending (oracle_row, printing_row, as_default) the name now defaults to, or None."""
+        with self.cond:
+            for pending in (self.catalog, self.inflight[0]):
+                for rows in pending.values():
+                    if rows[2] and rows[0][0] == normalized_name: return rows
+            return None
+
+    def get_printing(self, scryfall_id):
+        """Pending (oracle_row, printing_row, as_default) for one printing, or None."""
+        with self.cond:
+            return self.catalog.get(scryfall_id) or self.inflight[0].get(scryfall_id)
+
+    def get_alias(self, input_text):
+        """Pending alias row, or None if nothing is queued for this text."""
+        with self.cond:
+            return self.aliases.get(input_text) or self.inflight[1].get(input_text)
+
+    # --- FLUSH ---
+
+    def flush(self):
+        """Commits everything queued so far (blocking barrier). Returns operations written."""
+        with self.flush_lock:
+            with self.cond:
+                if not self.ops: return 0
+                catalog, aliases, scans, orphans = self.catalog, self.aliases, self.scans, self.orphans
+                ops = self.ops
+                self.inflight = (catalog, aliases, scans)
+                self._reset()
+                self.ops = 0
+            try:
+                self.db._apply_writes(list(catalog.values()), list(aliases.values()), scans)
+            except Exception:
+                # Put the batch back under anything queued since
+                with self.cond:
+                    for pending, failed in ((self.catalog, catalog), (self.aliases, aliases), (self.scans, scans)):
+                        for key, value in failed.items(): pending.setdefault(key, value)
+                    self.orphans.extend(orphans)
+                    self.ops += ops
+                    self.inflight = ({}, {}, {})
+                raise
+            with self.cond:
+                self.inflight = ({}, {}, {})
+
+        for path in orphans:
+            try: os.remove(path)
+            except OSError: pass
+        if self.on_flush: self.on_flush()
+        return ops
+
+    def stop(self):
+        """Stops the timer thread and flushes whatever is left."""
+        self._running = False
+        with self.cond:
+            self.cond.notify()
+        if self.thread: self.thread.join()
+        self.flush()
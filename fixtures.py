@@ -0,0 +1,7 @@
+"""Test data shared by the test_*.py modules."""
+
+
+def card(scryfall_id, name, usd="1.00", set_code="tst", released_at="2020-01-01"):
+    """Just enough Scryfall JSON for add_to_catalog."""
+    return {"id": scryfall_id, "name": name, "set": set_code, "set_name": set_code.upper(), "collector_number": "1",
+            "rarity": "rare", "released_at": released_at, "colors": ["R"], "prices": {"usd": usd}}
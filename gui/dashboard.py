@@ -1,18 +1,23 @@
 from PySide6.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
-                               QLabel, QFrame, QScrollArea, QStackedWidget, QPushButton, QGridLayout, QMessageBox)
-from PySide6.QtCore import Qt
+                               QLabel, QFrame, QScrollArea, QStackedWidget, QPushButton, QGridLayout, QMessageBox,
+                               QLineEdit)
+from PySide6.QtCore import Qt, QTimer
 from PySide6.QtGui import QPixmap, QFont
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import os
-import requests
-from data.db_manager import DBManager
+from core.db_worker import AsyncDB
+from services.image_fetcher import get_fetcher
 from gui.ui_util import get_app_icon
 import config
 from core.inspector import Inspector 
+from core.batch_identifier import BatchIdentifyThread
 from PySide6.QtCore import Signal, Slot
 
 class DashboardWindow(QMainWindow):
+    # Signal: (ScryfallID, StoreKey) - Background image download finished
+    image_ready_signal = Signal(str, str)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("MTG Collection Dashboard")
@@ -26,17 +31,18 @@ class DashboardWindow(QMainWindow):
             QWidget { background-color: #121212; color: #e0e0e0; }
         """)
         
-        self.db = DBManager()
+        self.queries = AsyncDB(self) # Every DB call runs on its worker thread
         self.inspector = Inspector() # Initialize Worker
 
         # Connect Signals
         self.inspector.inspection_complete_signal.connect(self.on_inspection_complete)
         self.inspector.status_signal.connect(self.on_inspection_status)
         self.inspector.start() # Start thread
-        
-        # Ensure cache directory exists
-        self.cache_dir = os.path.join(config.BASE_DIR, "data", "cache")
-        os.makedirs(self.cache_dir, exist_ok=True)
+        self.batch_thread = None # "Identify All Printings" job (started on demand)
+
+        # Official art is read from the image store on the DB worker and downloaded by the fetcher pool
+        self.image_ready_signal.connect(self.on_image_ready)
+
 
         self.central_stack = QStackedWidget()
         self.setCentralWidget(self.central_stack)
@@ -49,29 +55,61 @@ class DashboardWindow(QMainWindow):
         
         # Pages
         self.home_page = None # Lazy load
+        self.value_chart_slot = None # Home page layout the value chart goes into
         self.refresh_home()
 
 
-    def get_cached_image(self, url, card_id):
-        if not url: return None
-        ext = url.split('.')[-1].split('?')[0]
-        filename = f"{card_id}.{ext}"
-        local_path = os.path.join(self.cache_dir, filename)
-        if os.path.exists(local_path): return local_path
+    def load_official_art(self, url, card_id):
+        """Shows the official art once read from the image store, downloading it in the background if missing."""
+        def load(db):
+            fetcher = get_fetcher() # Opens the image store on the worker on first use
+            key = fetcher.art_key(card_id)
+            data = fetcher.store.get_bytes(key)
+            if not data:
+                # Not cached: download in the background, image_ready_signal fires when it lands
+                print(f"Downloading cache: {url}")
+                def done(future):
+                    stored = future.result()
+                    if stored: self.image_ready_signal.emit(card_id, stored)
+                fetcher.fetch(url, key).add_done_callback(done)
+            return data
+        self.queries.submit(load, lambda data: self.show_official_art(card_id, data), channel="art")
+
+    @Slot(str, str)
+    def on_image_ready(self, card_id, key):
+        """Fill in the official art if the user is still on that card"""
+        if getattr(self, 'web_img_id', None) != card_id: return
+        self.queries.submit(lambda db: get_fetcher().store.get_bytes(key),
+                            lambda data: self.show_official_art(card_id, data), channel="art")
+
+    def show_official_art(self, card_id, data):
+        if not data or getattr(self, 'web_img_id', None) != card_id: return
         try:
-            print(f"Downloading cache: {url}")
-            response = requests.get(url, headers={"User-Agent": config.API_USER_AGENT})
-            if response.status_code == 200:
-                with open(local_path, 'wb') as f: f.write(response.content)
-                return local_path
-        except: pass
-        return None
+            pix = QPixmap()
+            pix.loadFromData(data)
+            pix = pix.scaled(300, 420, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self.web_img_ref.setPixmap(pix)
+            self.web_img_ref.setText("")
+        except RuntimeError:
+            pass # Page was torn down in the meantime
 
     def refresh_home(self):
+        """
+        Loads the home page numbers on the DB worker; show_home rebuilds the page with them.
+        The value chart is its own request and is drawn into the page when it arrives.
+        """
+        self.queries.cancel() # Whatever the previous page was still loading
+        self.value_chart_slot = None # Only the page this refresh builds gets the chart
+        def load(db):
+            return db.get_dashboard_stats(), db.get_recent_scans(8)
+        self.queries.submit(load, self.show_home, channel="home")
+        self.queries.submit(lambda db: db.get_value_history(), self.show_value_history, channel="chart")
+
+    def show_home(self, data):
+        self.stats, self.recent_scans = data
         if self.home_page:
             self.central_stack.removeWidget(self.home_page)
             self.home_page.deleteLater()
-        self.stats = self.db.get_dashboard_stats()
         self.home_page = self.create_home_page()
         self.central_stack.insertWidget(0, self.home_page)
         self.central_stack.setCurrentIndex(0)
@@ -100,6 +138,10 @@ class DashboardWindow(QMainWindow):
             charts_layout.addWidget(chart_rar)
             
         layout.addLayout(charts_layout, stretch=1)
+
+        # Collection value over time, filled in by show_value_history
+        self.value_chart_slot = QVBoxLayout()
+        layout.addLayout(self.value_chart_slot, stretch=1)
         
         # Gallery
         gallery = self.create_recent_gallery()
@@ -124,6 +166,23 @@ class DashboardWindow(QMainWindow):
 
         add_box("Cards", stats['total_count'])
         add_box("Collection Value", f"${stats['total_value']}", config.PRICE_ALERTS["rare"]["color"])
+
+        # Full-text search (Enter opens the results page)
+        search = QLineEdit()
+        search.setPlaceholderText("🔍 Search name, type, text, artist, set...")
+        search.setFixedWidth(320)
+        search.setStyleSheet("background-color: #252525; border: 1px solid #444; border-radius: 4px; padding: 6px;")
+        search.returnPressed.connect(lambda: self.show_search(search.text()))
+        layout.addWidget(search)
+
+        # Batch printing identification (survives home page rebuilds)
+        batch_btn = QPushButton("🧬 Identify All Printings")
+        if self.batch_thread and self.batch_thread.isRunning():
+            batch_btn.setText("⏳ Identifying...")
+        batch_btn.setCursor(Qt.PointingHandCursor)
+        batch_btn.clicked.connect(self.toggle_batch_identify)
+        self.batch_btn_ref = batch_btn
+        layout.addWidget(batch_btn)
         
         if stats['top_card']:
             tc = stats['top_card']
@@ -181,6 +240,36 @@ class DashboardWindow(QMainWindow):
         layout.addWidget(canvas)
         return frame
 
+    def show_value_history(self, history):
+        # Queued after the home request, so its page is already built (needs two snapshots for a line)
+        if self.value_chart_slot is not None and len(history) > 1:
+            self.value_chart_slot.addWidget(self.create_value_chart(history))
+
+    def create_value_chart(self, history):
+        frame = QFrame()
+        frame.setStyleSheet("background-color: #2d2d2d; border-radius: 12px;")
+        layout = QVBoxLayout(frame)
+
+        canvas = FigureCanvas(Figure(figsize=(8, 2.5), facecolor='#2d2d2d'))
+        ax = canvas.figure.add_subplot(111)
+        days = [day for day, _ in history]
+        values = [value for _, value in history]
+        color = config.PRICE_ALERTS["rare"]["color"]
+        ax.plot(days, values, color=color, linewidth=2)
+        ax.fill_between(days, values, color=color, alpha=0.15)
+
+        # Style
+        ax.set_facecolor('#2d2d2d')
+        ax.set_title("Collection Value", color='white', pad=10)
+        ax.tick_params(colors='#888')
+        for spine in ax.spines.values(): spine.set_color('#444')
+        ax.yaxis.set_major_formatter(lambda v, _: f"${v:,.0f}")
+        canvas.figure.autofmt_xdate()
+        canvas.figure.tight_layout()
+
+        layout.addWidget(canvas)
+        return frame
+
     def create_recent_gallery(self):
         # ... (Same as before but maybe ensure background is clean) ...
         # Can copy previous code here, logic is unchanged.
@@ -194,8 +283,7 @@ class DashboardWindow(QMainWindow):
         h_layout = QHBoxLayout(content)
         h_layout.setAlignment(Qt.AlignLeft)
         
-        scans = self.db.get_recent_scans(8)
-        for card in scans:
+        for card in self.recent_scans:
             btn = QPushButton()
             btn.setFixedSize(130, 200)
             btn.setStyleSheet("border: none; background: transparent;")
@@ -229,8 +317,7 @@ class DashboardWindow(QMainWindow):
 
     # --- LIST PAGE ---
     def show_list(self, filter_type, filter_value):
-        cards = self.db.get_cards_by_filter(filter_type, filter_value, limit=200)
-        
+        self.queries.cancel()
         page = QWidget()
         layout = QVBoxLayout(page)
         
@@ -256,67 +343,178 @@ class DashboardWindow(QMainWindow):
         grid = QGridLayout(container)
         grid.setSpacing(15)
         
-        row, col = 0, 0
-        for card in cards:
-            # Card Wrapper
-            wrapper = QFrame()
-            wrapper.setFixedSize(180, 280)
-            wrapper.setStyleSheet("background-color: #252525; border-radius: 8px; border: 1px solid #333;")
-            
-            v = QVBoxLayout(wrapper)
-            v.setContentsMargins(10,10,10,10)
-            
-            # Image (Use Local scan for speed)
-            img_lbl = QLabel()
-            path = card['local_image_path']
-            if path and os.path.exists(path):
-                pix = QPixmap(path).scaled(160, 220, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                img_lbl.setPixmap(pix)
+        # Keyset pages of LIST_PAGE_SIZE, fetched on the DB worker as the user scrolls
+        state = {"after": None, "tiles": 0, "done": False, "loading": False}
+
+        def load_page():
+            if state["done"] or state["loading"]: return
+            state["loading"] = True
+            after = state["after"]
+            self.queries.submit(lambda db: db.get_cards_by_filter(filter_type, filter_value,
+                                                                  limit=config.LIST_PAGE_SIZE, after=after),
+                                show_page, channel=page)
+
+        def show_page(cards):
+            self.add_card_tiles(grid, cards, state["tiles"])
+            state["tiles"] += len(cards)
+            state["loading"] = False
+            if len(cards) < config.LIST_PAGE_SIZE:
+                state["done"] = True
             else:
-                img_lbl.setText("No Image")
-                img_lbl.setAlignment(Qt.AlignCenter)
-            
-            # Price
-            p_val = card['price_usd']
-            p_str = f"${p_val}" if p_val else "N/A"
-            
-            # Color logic based on config
-            p_color = config.PRICE_ALERTS['bulk']['color']
-            if p_val:
-                pv = float(p_val)
-                if pv >= config.PRICE_ALERTS['mythic']['min']: p_color = config.PRICE_ALERTS['mythic']['color']
-                elif pv >= config.PRICE_ALERTS['rare']['min']: p_color = config.PRICE_ALERTS['rare']['color']
-                elif pv >= config.PRICE_ALERTS['uncommon']['min']: p_color = config.PRICE_ALERTS['uncommon']['color']
-            
-            price_lbl = QLabel(p_str)
-            price_lbl.setAlignment(Qt.AlignCenter)
-            price_lbl.setStyleSheet(f"color: {p_color}; font-weight: bold; font-size: 14px;")
-            
-            v.addWidget(img_lbl)
-            v.addWidget(price_lbl)
-            
-            # Interaction
-            btn = QPushButton(wrapper)
-            btn.setGeometry(0, 0, 180, 280)
-            btn.setStyleSheet("background: transparent; border: none;")
-            btn.setCursor(Qt.PointingHandCursor)
-            btn.clicked.connect(lambda checked=False, tid=card['tracker_id']: self.show_details(tid))
-            
-            grid.addWidget(wrapper, row, col)
-            col += 1
-            if col > 5: # 6 columns
-                col = 0
-                row += 1
-                
+                state["after"] = (cards[-1]['price_usd'], cards[-1]['scan_id'])
+
+        load_page()
         scroll.setWidget(container)
         layout.addWidget(scroll)
+        self.load_on_scroll(scroll, load_page)
         
         self.central_stack.addWidget(page)
         self.central_stack.setCurrentWidget(page)
 
+    # --- SEARCH PAGE ---
+    def show_search(self, text):
+        self.queries.cancel()
+        page = QWidget()
+        layout = QVBoxLayout(page)
+
+        # Top Bar
+        top = QHBoxLayout()
+        back = QPushButton("← Dashboard")
+        back.setFixedSize(120, 40)
+        back.clicked.connect(self.refresh_home)
+
+        box = QLineEdit(text)
+        box.setPlaceholderText("Search name, type, text, artist, set...")
+        box.setStyleSheet("font-size: 18px; background-color: #252525; border: 1px solid #444; border-radius: 4px; padding: 6px;")
+        count_lbl = QLabel()
+        count_lbl.setStyleSheet("color: #888; margin-left: 10px;")
+
+        top.addWidget(back)
+        top.addWidget(box, stretch=1)
+        top.addWidget(count_lbl)
+        layout.addLayout(top)
+
+        # Grid
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        container = QWidget()
+        outer = QVBoxLayout(container)
+        grid = QGridLayout()
+        grid.setSpacing(15)
+        outer.addLayout(grid)
+        outer.addStretch()
+        scroll.setWidget(container)
+        layout.addWidget(scroll)
+
+        # Pages are COLLECTION_SEARCH_PAGE_SIZE matching printings; tiles keep count of what is shown.
+        # The first page's (capped) match counts are handed back for the rest of the query's pages.
+        state = {"offset": 0, "tiles": 0, "counts": None, "loading": False}
+
+        def load_page():
+            counts = state["counts"]
+            if state["loading"] or (counts and state["offset"] >= counts[0]): return
+            state["loading"] = True
+            text, offset = box.text(), state["offset"]
+            self.queries.submit(lambda db: db.search(text, config.COLLECTION_SEARCH_PAGE_SIZE, offset, counts),
+                                lambda result: show_page(text, *result), channel=page)
+
+        def show_page(text, rows, counts):
+            state["counts"] = counts
+            self.add_card_tiles(grid, rows, state["tiles"])
+            state["offset"] += config.COLLECTION_SEARCH_PAGE_SIZE
+            state["tiles"] += len(rows)
+            state["loading"] = False
+            total = f"{config.SEARCH_COUNT_MAX}+" if counts[0] > config.SEARCH_COUNT_MAX else counts[0]
+            count_lbl.setText(f"{total} matches" if text.strip() else "")
+
+        def restart():
+            # A new query supersedes (and interrupts) the one still running on this page's channel
+            while grid.count():
+                grid.takeAt(0).widget().deleteLater()
+            state.update(offset=0, tiles=0, counts=None, loading=False)
+            load_page()
+
+        # Search as you type, once typing pauses
+        debounce = QTimer(page)
+        debounce.setSingleShot(True)
+        debounce.setInterval(150)
+        debounce.timeout.connect(restart)
+        box.textEdited.connect(lambda _: debounce.start())
+        box.returnPressed.connect(restart)
+        restart()
+        self.load_on_scroll(scroll, load_page)
+
+        self.central_stack.addWidget(page)
+        self.central_stack.setCurrentWidget(page)
+        box.setFocus()
+
+    def load_on_scroll(self, scroll, load_page):
+        """Calls load_page() whenever the view is within a screen of the bottom (or not yet scrollable)."""
+        bar = scroll.verticalScrollBar()
+        def check(*_):
+            if bar.maximum() - bar.value() < scroll.viewport().height():
+                load_page()
+        bar.valueChanged.connect(check)
+        bar.rangeChanged.connect(check)
+
+    def add_card_tiles(self, grid, cards, start=0):
+        """Appends cards to a 6-column grid, continuing after the first `start` tiles."""
+        for i, card in enumerate(cards, start):
+            grid.addWidget(self.create_card_tile(card), i // 6, i % 6)
+
+    def create_card_tile(self, card):
+        # Card Wrapper
+        wrapper = QFrame()
+        wrapper.setFixedSize(180, 280)
+        wrapper.setStyleSheet("background-color: #252525; border-radius: 8px; border: 1px solid #333;")
+
+        v = QVBoxLayout(wrapper)
+        v.setContentsMargins(10,10,10,10)
+
+        # Image (Use Local scan for speed)
+        img_lbl = QLabel()
+        path = card['local_image_path']
+        if path and os.path.exists(path):
+            pix = QPixmap(path).scaled(160, 220, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            img_lbl.setPixmap(pix)
+        else:
+            img_lbl.setText("No Image")
+            img_lbl.setAlignment(Qt.AlignCenter)
+
+        # Price
+        p_val = card['price_usd']
+        p_str = f"${p_val}" if p_val else "N/A"
+
+        # Color logic based on config
+        p_color = config.PRICE_ALERTS['bulk']['color']
+        if p_val:
+            pv = float(p_val)
+            if pv >= config.PRICE_ALERTS['mythic']['min']: p_color = config.PRICE_ALERTS['mythic']['color']
+            elif pv >= config.PRICE_ALERTS['rare']['min']: p_color = config.PRICE_ALERTS['rare']['color']
+            elif pv >= config.PRICE_ALERTS['uncommon']['min']: p_color = config.PRICE_ALERTS['uncommon']['color']
+
+        price_lbl = QLabel(p_str)
+        price_lbl.setAlignment(Qt.AlignCenter)
+        price_lbl.setStyleSheet(f"color: {p_color}; font-weight: bold; font-size: 14px;")
+
+        v.addWidget(img_lbl)
+        v.addWidget(price_lbl)
+
+        # Interaction
+        btn = QPushButton(wrapper)
+        btn.setGeometry(0, 0, 180, 280)
+        btn.setStyleSheet("background: transparent; border: none;")
+        btn.setCursor(Qt.PointingHandCursor)
+        btn.clicked.connect(lambda checked=False, tid=card['tracker_id']: self.show_details(tid))
+        return wrapper
+
     # --- DETAIL PAGE ---
     def show_details(self, tracker_id):
-        card = self.db.get_card_details(tracker_id)
+        self.queries.cancel()
+        self.queries.submit(lambda db: db.get_card_details(tracker_id),
+                            lambda card: self.show_card(tracker_id, card), channel="details")
+
+    def show_card(self, tracker_id, card):
         if not card: return
 
         # Store current tracker_id context for callbacks
@@ -402,11 +600,10 @@ class DashboardWindow(QMainWindow):
         web_img.setStyleSheet("background-color: #050505; border: 1px solid #333; border-radius: 8px;")
         web_img.setAlignment(Qt.AlignCenter)
         
-        web_path = self.get_cached_image(card['image_url'], card['scryfall_id'])
-        if web_path:
-            pix = QPixmap(web_path).scaled(300, 420, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            web_img.setPixmap(pix)
-            web_img.setText("")
+        self.web_img_ref = web_img
+        self.web_img_id = card['scryfall_id']
+        if card['image_url']:
+            self.load_official_art(card['image_url'], card['scryfall_id'])
         else:
             web_img.setText("No Image Available")
         imgs_col2.addWidget(web_img)
@@ -545,7 +742,8 @@ class DashboardWindow(QMainWindow):
                                      f"Permanently remove '{name}'?",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
-            self.db.delete_scan(tracker_id)
+            # Not cancellable; the home page reload queued behind it sees the delete
+            self.queries.submit(lambda db: db.delete_scan(tracker_id))
             self.refresh_home()
     
         # --- INSPECTOR HANDLERS ---
@@ -578,8 +776,40 @@ class DashboardWindow(QMainWindow):
             msg.setStyleSheet("background-color: #2b2b2b; color: white;")
             msg.exec()
 
+    # --- BATCH IDENTIFICATION HANDLERS ---
+
+    def toggle_batch_identify(self):
+        """Start the whole-collection job, or ask a running one to pause (it resumes next time)."""
+        if self.batch_thread and self.batch_thread.isRunning():
+            if self.batch_thread.job: self.batch_thread.job.stop()
+            self.batch_btn_ref.setText("⏳ Pausing...")
+            return
+        self.batch_thread = BatchIdentifyThread()
+        self.batch_thread.progress_signal.connect(self.on_batch_progress)
+        self.batch_thread.finished_signal.connect(self.on_batch_finished)
+        self.batch_thread.start()
+        self.batch_btn_ref.setText("⏳ Identifying...")
+
+    @Slot(int, int, float)
+    def on_batch_progress(self, done, total, rate):
+        try:
+            self.batch_btn_ref.setText(f"⏸ {done}/{total} ({rate:.1f}/s)")
+        except RuntimeError:
+            pass # Header was rebuilt; next refresh picks up the running state
+
+    @Slot(int, int)
+    def on_batch_finished(self, done, total):
+        self.refresh_home()
+        msg = QMessageBox(self)
+        msg.setWindowTitle("Printings Identified")
+        msg.setText(f"Identified {done} of {total} scans" if total else "Every scan already has a printing")
+        msg.setStyleSheet("background-color: #2b2b2b; color: white;")
+        msg.exec()
+
     # ... (closeEvent) ...
     def closeEvent(self, event):
         # Clean shutdown of worker thread
         self.inspector.stop()
+        if self.batch_thread: self.batch_thread.stop()
+        self.queries.close()
         super().closeEvent(event)
\ No newline at end of file
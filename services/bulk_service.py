@@ -0,0 +1,73 @@
+import os
+import logging
+import config
+from services.http_client import get_client
+from data.bulk_mirror import BulkMirror
+
+class BulkDataService:
+    """
+    Keeps the local BulkMirror in sync with Scryfall's /bulk-data files.
+    A refresh is skipped entirely when Scryfall's updated_at hasn't moved.
+    """
+    def __init__(self, mirror=None):
+        self.client = get_client()
+        self.mirror = mirror or BulkMirror()
+        os.makedirs(config.BULK_DOWNLOAD_DIR, exist_ok=True)
+
+    def get_bulk_info(self, bulk_type):
+        """Metadata for one bulk file (download_uri, updated_at, size) or None."""
+        response = self.client.get(f"{config.API_BASE_URL}/bulk-data/{bulk_type}")
+        if response is None or response.status_code != 200:
+            logging.error(f"[Bulk] Could not fetch metadata for {bulk_type}")
+            return None
+        return response.json()
+
+    def _download(self, url, dest):
+        """Streams the file to disk (never held in memory). Returns dest or None."""
+        tmp = dest + ".part"
+        # Bulk files are served from a CDN, not the rate-limited API
+        response = self.client.get(url, stream=True, rate_limited=False,
+                                   timeout=(config.API_TIMEOUT[0], 120))
+        if response is None or response.status_code != 200:
+            logging.error(f"[Bulk] Download failed: {url}")
+            return None
+        try:
+            with open(tmp, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1 << 20):
+                    f.write(chunk)
+            os.replace(tmp, dest)
+        finally:
+            response.close()
+            if os.path.exists(tmp): os.remove(tmp)
+        return dest
+
+    def refresh(self, bulk_type=None, force=False, progress=None):
+        """
+        Downloads and imports the bulk file if it is newer than the last import.
+        Returns (rows_seen, rows_written), or (0, 0) when already current.
+        """
+        bulk_type = bulk_type or config.BULK_DATA_TYPE
+        info = self.get_bulk_info(bulk_type)
+        if not info: return 0, 0
+
+        updated_at = info.get('updated_at')
+        last = self.mirror.get_meta(f"{bulk_type}_updated_at")
+        if not force and last and updated_at and updated_at <= last:
+            logging.info(f"[Bulk] {bulk_type} is current ({last})")
+            return 0, 0
+
+        dest = os.path.join(config.BULK_DOWNLOAD_DIR, f"{bulk_type}.json")
+        logging.info(f"[Bulk] Downloading {bulk_type} ({info.get('size', 0) / 1e6:.0f} MB)...")
+        if not self._download(info['download_uri'], dest): return 0, 0
+
+        result = self.import_file(dest, bulk_type, updated_at, progress)
+        if not config.BULK_KEEP_DOWNLOAD:
+            os.remove(dest)
+        return result
+
+    def import_file(self, path, bulk_type=None, updated_at=None, progress=None):
+        """Imports an already-downloaded bulk file (offline setup)."""
+        result = self.mirror.import_file(path, progress=progress)
+        if updated_at:
+            self.mirror.record_refresh(bulk_type or config.BULK_DATA_TYPE, updated_at)
+        return result
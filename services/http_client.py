@@ -0,0 +1,194 @@
+import threading
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+import config
+from services.response_cache import ResponseCache, CachedResponse
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    Refills one token every `interval` seconds, holds at most `capacity` (the burst size).
+    """
+    def __init__(self, interval, capacity):
+        self.interval = interval
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        if self.interval > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) / self.interval)
+        else:
+            self.tokens = self.capacity
+        self.last_refill = now
+
+    def acquire(self):
+        """Blocks until a token is available. Returns seconds spent waiting."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                sleep_for = (1 - self.tokens) * self.interval
+            time.sleep(sleep_for)
+            waited += sleep_for
+
+    def drain(self, seconds):
+        """Server told us to back off: empty the bucket and push the next refill out."""
+        with self.lock:
+            self.tokens = 0.0
+            self.last_refill = time.monotonic() + seconds
+
+
+class HttpClient:
+    """
+    Process-wide HTTP client for Scryfall.
+    One pooled keep-alive session, one shared rate limit, explicit timeouts,
+    retries with exponential backoff (honours 429 Retry-After), and counters.
+    GETs given a cache_ttl go through the on-disk ResponseCache.
+    """
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": config.API_USER_AGENT,
+            "Accept": "*/*"
+        })
+        adapter = HTTPAdapter(pool_connections=config.API_POOL_SIZE, pool_maxsize=config.API_POOL_SIZE)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.limiter = TokenBucket(config.API_RATE_LIMIT, config.API_RATE_BURST)
+        self.cache = ResponseCache() if config.RESPONSE_CACHE_ENABLED else None
+        self.stats_lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "retries": 0,
+            "throttled": 0,     # 429 responses
+            "failures": 0,      # Gave up (connection error or retries exhausted)
+            "latency_total": 0.0,
+            "latency_max": 0.0,
+            "wait_total": 0.0   # Time spent blocked on the local limiter
+        }
+
+    def _count(self, key, amount=1):
+        with self.stats_lock:
+            self.stats[key] += amount
+
+    def _retry_delay(self, response, attempt):
+        """Retry-After (seconds) if the server sent one, otherwise exponential backoff."""
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try: return max(0.0, float(retry_after))
+                except ValueError: pass
+        return config.API_BACKOFF_BASE * (2 ** attempt)
+
+    def request(self, method, url, rate_limited=True, **kwargs):
+        """
+        Performs a request with limiter, timeout and retries.
+        Returns the final Response, or None if the connection never succeeded.
+        """
+        kwargs.setdefault("timeout", config.API_TIMEOUT)
+        response = None
+
+        for attempt in range(config.API_MAX_RETRIES + 1):
+            if rate_limited:
+                self._count("wait_total", self.limiter.acquire())
+
+            start = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as e:
+                response = None
+                logging.warning(f"[HTTP] {method} {url} failed: {e}")
+            elapsed = time.monotonic() - start
+
+            with self.stats_lock:
+                self.stats["requests"] += 1
+                self.stats["latency_total"] += elapsed
+                self.stats["latency_max"] = max(self.stats["latency_max"], elapsed)
+
+            if response is not None and response.status_code not in self.RETRY_STATUS:
+                return response
+
+            if attempt == config.API_MAX_RETRIES: break
+
+            delay = self._retry_delay(response, attempt)
+            if response is not None and response.status_code == 429:
+                self._count("throttled")
+                # Everyone sharing this client backs off, not just this caller
+                self.limiter.drain(delay)
+            self._count("retries")
+            logging.info(f"[HTTP] Retry {attempt + 1}/{config.API_MAX_RETRIES} in {delay:.1f}s: {url}")
+            time.sleep(delay)
+
+        self._count("failures")
+        return response
+
+    def get(self, url, cache_ttl=None, **kwargs):
+        """
+        GET, optionally cached for cache_ttl seconds.
+        Fresh entries never touch the network; stale ones are revalidated
+        with If-None-Match / If-Modified-Since, and served as-is if we're offline.
+        """
+        if cache_ttl is None or self.cache is None:
+            return self.request("GET", url, **kwargs)
+
+        entry = self.cache.get(url)
+        if entry:
+            body, etag, last_modified, fresh = entry
+            if fresh:
+                self.cache.count("hits")
+                return CachedResponse(200, body)
+            headers = dict(kwargs.pop('headers', None) or {})
+            if etag: headers['If-None-Match'] = etag
+            if last_modified: headers['If-Modified-Since'] = last_modified
+            kwargs['headers'] = headers
+
+        response = self.request("GET", url, **kwargs)
+
+        if entry and (response is None or response.status_code == 304):
+            if response is not None:
+                self.cache.touch(url, cache_ttl)
+                self.cache.count("revalidated")
+            else:
+                self.cache.count("hits") # Stale, but better than nothing offline
+            return CachedResponse(200, entry[0])
+
+        self.cache.count("misses")
+        if response is not None and response.status_code == 200:
+            self.cache.put(url, response.content, cache_ttl,
+                           response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def get_stats(self):
+        """Snapshot of counters, plus average latency."""
+        with self.stats_lock:
+            snap = dict(self.stats)
+        snap["latency_avg"] = snap["latency_total"] / snap["requests"] if snap["requests"] else 0.0
+        if self.cache: snap["cache"] = self.cache.get_stats()
+        return snap
+
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Returns the shared HttpClient (created on first use)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
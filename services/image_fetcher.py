@@ -0,0 +1,95 @@
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, Future
+import config
+from services.http_client import get_client
+from data.thumb_store import ThumbStore
+
+
+class ImageFetcher:
+    """
+    Shared card-image downloader.
+    A bounded thread pool on the pooled HttpClient session; concurrent requests
+    for the same image share one download. Images land in the single-file
+    ThumbStore (one transaction each), so readers never see a half-written image.
+    """
+    def __init__(self):
+        self.client = get_client()
+        self.store = ThumbStore()
+        self.pool = ThreadPoolExecutor(max_workers=config.IMAGE_FETCH_WORKERS, thread_name_prefix="ImageFetcher")
+        self.inflight = {} # store key -> Future
+        self.lock = threading.Lock()
+        self._import_legacy()
+
+    def _import_legacy(self):
+        """One-time move of the old one-file-per-image caches into the store."""
+        if os.path.isdir(config.THUMB_DIR):
+            self.store.import_legacy_files(os.path.join(config.THUMB_DIR, "*_small.jpg"),
+                                           lambda f: self.thumb_key(f[:-len("_small.jpg")]),
+                                           config.THUMB_STORE_WIDTH)
+        self.store.import_legacy_files(os.path.join(config.CACHE_DIR, "*.jpg"),
+                                       lambda f: self.art_key(os.path.splitext(f)[0]))
+
+    def _download(self, url, key, max_width):
+        # Images come from Scryfall's CDN, which isn't subject to the API rate limit
+        response = self.client.get(url, rate_limited=False)
+        if response is None or response.status_code != 200:
+            logging.warning(f"[Images] Download failed: {url}")
+            return None
+        if not self.store.put(key, response.content, max_width):
+            logging.warning(f"[Images] Undecodable image: {url}")
+            return None
+        return key
+
+    def fetch(self, url, key, max_width=None):
+        """
+        Returns a Future resolving to key (or None on failure).
+        Already stored -> completed Future; already downloading -> the same Future.
+        """
+        stored = self.store.has(key)
+        if stored or not url:
+            done = Future()
+            done.set_result(key if stored else None)
+            return done
+
+        with self.lock:
+            future = self.inflight.get(key)
+            if future: return future
+            future = self.pool.submit(self._download, url, key, max_width)
+            self.inflight[key] = future
+
+        def _forget(_):
+            with self.lock:
+                self.inflight.pop(key, None)
+        future.add_done_callback(_forget)
+        return future
+
+    def thumb_key(self, card_id):
+        """Matcher-sized thumbnail of a printing."""
+        return f"thumb:{card_id}"
+
+    def art_key(self, card_id):
+        """Full 'normal' image shown in the dashboard."""
+        return f"art:{card_id}"
+
+    def prefetch(self, cards):
+        """Queues matcher thumbnails for a list of printings. Returns {card_id: Future}."""
+        futures = {}
+        for card in cards:
+            uris = card.get('image_uris')
+            if not uris or not uris.get('normal'): continue
+            futures[card['id']] = self.fetch(uris['normal'], self.thumb_key(card['id']), config.THUMB_STORE_WIDTH)
+        return futures
+
+
+_fetcher = None
+_fetcher_lock = threading.Lock()
+
+def get_fetcher():
+    """Returns the shared ImageFetcher (created on first use)."""
+    global _fetcher
+    with _fetcher_lock:
+        if _fetcher is None:
+            _fetcher = ImageFetcher()
+        return _fetcher
@@ -1,45 +1,50 @@
-import requests
-import time
+import os
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import config
+from services.http_client import get_client
+from data.bulk_mirror import BulkMirror
 
 class MTGService:
     """
     Handles communication with Scryfall API.
-    Enforces rate limits and user-agent requirements.
+    Rate limiting, pooling and retries live in the shared HttpClient,
+    so every MTGService instance draws from the same budget.
+    When a local bulk mirror exists it is asked first; the network is the fallback.
     """
     def __init__(self):
         self.base_url = config.API_BASE_URL
-        self.last_request_time = 0
-        self.min_delay = config.API_RATE_LIMIT
-        
-        self.headers = {
-            "User-Agent": config.API_USER_AGENT,
-            "Accept": "*/*"
-        }
+        self.client = get_client()
 
-    def _wait_for_rate_limit(self):
-        elapsed = time.time() - self.last_request_time
-        if elapsed < self.min_delay:
-            time.sleep(self.min_delay - elapsed)
-        self.last_request_time = time.time()
+        self.mirror = None
+        if config.USE_LOCAL_MIRROR and os.path.exists(config.MIRROR_DB_PATH):
+            mirror = BulkMirror()
+            if mirror.is_populated():
+                self.mirror = mirror
+                logging.info("[API] Using local bulk mirror")
 
     def get_card_by_name(self, query_text):
         """
         Fuzzy lookup for a single card (Fast Path).
         Returns the default/most recent printing.
         """
-        self._wait_for_rate_limit()
-        
+        if self.mirror:
+            card = self.mirror.get_card_by_name(query_text)
+            if card: return card
+
         safe_query = urllib.parse.quote(query_text)
         url = f"{self.base_url}/cards/named?fuzzy={safe_query}"
         
         print(f"[API] Requesting: {query_text}...")
         try:
-            response = requests.get(url, headers=self.headers)
+            # The card comes back with prices and goes straight into the catalog: price TTL
+            response = self.client.get(url, cache_ttl=config.CACHE_TTL_PRICE)
             
-            if response.status_code == 200:
+            if response is None:
+                print(f"[API] Connection Failure: {query_text}")
+                return self._offline_fuzzy(query_text)
+            elif response.status_code == 200:
                 print("[API] Success.")
                 return response.json()
             elif response.status_code == 404:
@@ -53,31 +58,190 @@ class MTGService:
             print(f"[API] Connection Failure: {e}")
             return None
 
-    def search_all_printings(self, card_name):
+    def _offline_fuzzy(self, query_text):
+        """No connectivity: approximate Scryfall's fuzzy match against the mirror."""
+        if not self.mirror: return None
+        name = self.mirror.fuzzy_name(query_text)
+        if not name: return None
+        print(f"[API] Offline match: {query_text} -> {name}")
+        return self.mirror.get_card_by_name(name)
+
+    def get_card_by_id(self, scryfall_id):
+        """Single printing by Scryfall ID (current prices included)."""
+        if self.mirror:
+            card = self.mirror.get_card_by_id(scryfall_id)
+            if card: return card
+        response = self.client.get(f"{self.base_url}/cards/{scryfall_id}", cache_ttl=config.CACHE_TTL_PRICE)
+        if response is not None and response.status_code == 200:
+            return response.json()
+        return None
+
+    def get_cards_by_ids(self, scryfall_ids):
         """
-        Fetches ALL unique paper printings of a card name.
-        Used for Visual Fingerprinting/Matching.
+        Many printings by Scryfall ID (current prices included) via /cards/collection,
+        COLLECTION_BATCH_SIZE per request. Returns {scryfall_id: card JSON}; IDs that
+        could not be fetched are left out.
         """
-        self._wait_for_rate_limit()
-        
+        found = {}
+        remote = []
+        for sid in dict.fromkeys(scryfall_ids):
+            card = self.mirror.get_card_by_id(sid) if self.mirror else None
+            if card: found[sid] = card
+            else: remote.append(sid)
+        url = f"{self.base_url}/cards/collection"
+
+        for i in range(0, len(remote), config.COLLECTION_BATCH_SIZE):
+            chunk = remote[i:i + config.COLLECTION_BATCH_SIZE]
+            payload = {"identifiers": [{"id": sid} for sid in chunk]}
+            try:
+                response = self.client.post(url, json=payload)
+                if response is None or response.status_code != 200:
+                    status = response.status_code if response is not None else "no response"
+                    logging.error(f"[API] Batch Error {status}")
+                    continue
+                data = response.json()
+            except Exception as e:
+                logging.error(f"[API] Batch Failure: {e}")
+                continue
+            for card in data.get('data', []):
+                found[card['id']] = card
+
+        return found
+
+    def get_card_by_set_number(self, set_code, collector_number):
+        """Exact printing from its set code and collector number (e.g. 'dmu', '123')."""
+        if self.mirror:
+            card = self.mirror.get_by_set_number(set_code, collector_number)
+            if card: return card
+        set_code = urllib.parse.quote(set_code.lower())
+        number = urllib.parse.quote(str(collector_number))
+        response = self.client.get(f"{self.base_url}/cards/{set_code}/{number}", cache_ttl=config.CACHE_TTL_PRICE)
+        if response is not None and response.status_code == 200:
+            return response.json()
+        return None
+
+    def get_cards_by_names(self, names):
+        """
+        Exact-name lookup for many cards at once via /cards/collection
+        (up to COLLECTION_BATCH_SIZE identifiers per request).
+        Returns (found, missing): found maps lowercased input name -> card JSON,
+        missing lists the inputs Scryfall could not match exactly.
+        """
+        found = {}
+        missing = []
+        unique = list(dict.fromkeys(n.strip() for n in names if n and n.strip()))
+
+        if self.mirror:
+            remote = []
+            for name in unique:
+                card = self.mirror.get_card_by_name(name)
+                if card: found[name.lower()] = card
+                else: remote.append(name)
+            unique = remote
+        url = f"{self.base_url}/cards/collection"
+
+        for i in range(0, len(unique), config.COLLECTION_BATCH_SIZE):
+            chunk = unique[i:i + config.COLLECTION_BATCH_SIZE]
+            payload = {"identifiers": [{"name": n} for n in chunk]}
+            print(f"[API] Batch lookup: {len(chunk)} names...")
+            try:
+                response = self.client.post(url, json=payload)
+                if response is None or response.status_code != 200:
+                    status = response.status_code if response is not None else "no response"
+                    logging.error(f"[API] Batch Error {status}")
+                    missing.extend(chunk)
+                    continue
+                data = response.json()
+            except Exception as e:
+                logging.error(f"[API] Batch Failure: {e}")
+                missing.extend(chunk)
+                continue
+
+            # Results don't echo the identifier, so map back by name (and by face for DFCs)
+            by_name = {}
+            for card in data.get('data', []):
+                by_name[card['name'].lower()] = card
+                for face in card['name'].split(' // '):
+                    by_name.setdefault(face.lower(), card)
+
+            for name in chunk:
+                card = by_name.get(name.lower())
+                if card: found[name.lower()] = card
+                else: missing.append(name)
+
+        return found, missing
+
+    def _fetch_search_page(self, url):
+        """
+        One page of /cards/search. Returns the list JSON (an empty one for "no results"),
+        or None if the request failed.
+        Cached for CACHE_TTL_CARD, so its prices can be that old: re-fetch a printing
+        with get_card_by_id before storing it.
+        """
+        try:
+            response = self.client.get(url, cache_ttl=config.CACHE_TTL_CARD)
+            if response is None:
+                logging.error(f"[API] Connection Failure: {url}")
+                return None
+            elif response.status_code == 200:
+                return response.json()
+            elif response.status_code == 404: # Zero results
+                return {"data": [], "has_more": False}
+            logging.error(f"[API] Search Error {response.status_code}: {response.text}")
+            return None
+        except Exception as e:
+            logging.error(f"[API] Connection Failure: {e}")
+            return None
+
+    def iter_printings(self, card_name):
+        """
+        Yields ALL unique paper printings of a card name, one page (list) at a time.
+        Follows has_more/next_page; the next page downloads while the caller works
+        on the current one. Closing the generator early skips the remaining pages.
+        A failed request ends the iteration early.
+        """
+        for page in self._printing_pages(card_name):
+            if page is None: return
+            yield page
+
+    def _printing_pages(self, card_name):
+        """iter_printings, but a failed request yields None (last) instead of just stopping."""
+        if self.mirror:
+            printings = self.mirror.search_printings(card_name)
+            if printings:
+                for i in range(0, len(printings), config.SEARCH_PAGE_SIZE):
+                    yield printings[i:i + config.SEARCH_PAGE_SIZE]
+                return
+
         # Syntax: !"Card Name" (Exact) + unique:prints + game:paper
         query = f'!"{card_name}" unique:prints game:paper'
         safe_query = urllib.parse.quote(query)
-        
         url = f"{self.base_url}/cards/search?q={safe_query}"
-        
+        logging.info(f"[API] Searching printings for: {card_name}")
+
+        pool = ThreadPoolExecutor(max_workers=1)
         try:
-            logging.info(f"[API] Searching printings for: {card_name}")
-            response = requests.get(url, headers=self.headers)
-            
-            if response.status_code == 200:
-                data = response.json()
-                # If there are pages (unlikely for most cards except basics), 
-                # we only take the first page (175 cards) for performance.
-                return data.get('data', [])
-            else:
-                logging.error(f"[API] Search Error {response.status_code}: {response.text}")
-                return []
-        except Exception as e:
-            logging.error(f"[API] Connection Failure: {e}")
-            return []
\ No newline at end of file
+            future = pool.submit(self._fetch_search_page, url)
+            while future:
+                page = future.result()
+                if page is None:
+                    yield None
+                    return
+                next_url = page.get('next_page') if page.get('has_more') else None
+                # Prefetch before handing this page to the caller
+                future = pool.submit(self._fetch_search_page, next_url) if next_url else None
+                yield page.get('data', [])
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def search_all_printings(self, card_name):
+        """
+        Fetches ALL unique paper printings of a card name (every page).
+        Used for Visual Fingerprinting/Matching. Returns None if any page could not
+        be fetched (offline, server error), [] if Scryfall knows no such card.
+        """
+        printings = []
+        for page in self._printing_pages(card_name):
+            if page is None: return None
+            printings.extend(page)
+        return printings
@@ -1,16 +1,42 @@
 import easyocr
 import cv2
 import numpy as np
+import re
 import time
 import logging
 import os
+import threading
 import config
 
+# "0123/280 R" -> collector number (leading zeros dropped, Scryfall style)
+COLLECTOR_RE = re.compile(r'\b0*(\d{1,4}[A-Z]?)(?:\s*/\s*\d{1,4})?\b')
+# "DMU • EN" -> set code right before the language tag
+SET_LANG_RE = re.compile(r'\b([A-Z0-9]{3,5})\s*[•·.*+-]?\s*EN\b')
+SET_CODE_RE = re.compile(r'\b(?=[A-Z0-9]*[A-Z])[A-Z0-9]{3,5}\b')
+
+
+def parse_set_line(text):
+    """
+    Pulls (set_code, collector_number) out of an OCR'd collector line.
+    Returns (None, None) if either part is missing.
+    """
+    # Digits misread as letters are common in this tiny font
+    line = re.sub(r'(?<=\d)O|O(?=\d)', '0', text.upper())
+    number = COLLECTOR_RE.search(line)
+    if not number: return None, None
+    rest = line[number.end():]
+    set_code = SET_LANG_RE.search(rest) or SET_CODE_RE.search(rest)
+    if not set_code: return None, None
+    return set_code.group(1 if set_code.re is SET_LANG_RE else 0).lower(), number.group(1).lower()
+
+
 class OCRService:
     def __init__(self):
         logging.info("Initializing EasyOCR Engine (GPU)...")
         # Load model into memory once.
         self.reader = easyocr.Reader(['en'], gpu=True) 
+        # The Librarian and Inspector share one reader
+        self.lock = threading.Lock()
 
     def _enhance_image(self, crop):
         """
@@ -43,7 +69,8 @@ class OCRService:
         
         # detail=1 gives coords, text, confidence
         try:
-            result = self.reader.readtext(ai_input, detail=1)
+            with self.lock:
+                result = self.reader.readtext(ai_input, detail=1)
         except Exception as e:
             logging.error(f"[OCR] Error in readtext: {e}")
             return "", 0.0
@@ -136,4 +163,34 @@ class OCRService:
 
         logging.info(f"[OCR] Winner: '{best_txt}' (Score {max_score:.1f}). Total: {time.time()-start_total:.2f}s")
 
-        return best_txt, best_conf, best_img
\ No newline at end of file
+        return best_txt, best_conf, best_img
+
+    def read_set_line(self, card_image):
+        """
+        Input: Upright flattened card image.
+        Output: (set_code, collector_number, confidence); (None, None, 0.0) if unreadable.
+        """
+        h, w = card_image.shape[:2]
+        x0, y0, x1, y1 = config.CROP_SETLINE_BOX
+        crop = card_image[int(h * y0):int(h * y1), int(w * x0):int(w * x1)]
+        if crop.size == 0: return None, None, 0.0
+
+        txt, conf = self._get_text_from_crop(crop, "SetLine")
+        set_code, number = parse_set_line(txt)
+        if not set_code:
+            logging.info(f"[OCR] No collector line in '{txt}'")
+            return None, None, 0.0
+        logging.info(f"[OCR] Collector line: {set_code.upper()} #{number} ({conf:.2f})")
+        return set_code, number, conf
+
+
+_ocr = None
+_ocr_lock = threading.Lock()
+
+def get_ocr_service():
+    """Returns the shared OCRService (model loaded on first use)."""
+    global _ocr
+    with _ocr_lock:
+        if _ocr is None:
+            _ocr = OCRService()
+        return _ocr
\ No newline at end of file
@@ -0,0 +1,153 @@
+import sqlite3
+import os
+import time
+import json
+import threading
+import config
+
+
+class CachedResponse:
+    """Stands in for requests.Response when the body comes from disk."""
+    def __init__(self, status_code, content, headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.content)
+
+
+class ResponseCache:
+    """
+    Size-bounded on-disk cache of raw API responses (SQLite).
+    Entries carry an expiry plus ETag/Last-Modified so stale ones can be
+    revalidated with a conditional request instead of re-downloaded.
+    Least recently used entries are evicted once max_bytes is exceeded. Hits only
+    note their access time in memory; those are written in one batch every
+    RESPONSE_CACHE_ACCESS_FLUSH seconds (and before any eviction), so a hit costs
+    no write transaction.
+    """
+    def __init__(self, db_path=None, max_bytes=None):
+        self.db_path = db_path or config.RESPONSE_CACHE_PATH
+        self.max_bytes = max_bytes or config.RESPONSE_CACHE_MAX_BYTES
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "evicted": 0}
+        self.accessed = {} # url -> access time not yet written
+        self.accessed_flushed = time.time()
+        self._init_db()
+        self.total_bytes = self._sum_bytes()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS responses (
+                url TEXT PRIMARY KEY,
+                body BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                expires_at REAL,
+                last_access REAL,
+                size INTEGER
+            )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+        conn.commit()
+        conn.close()
+
+    def _sum_bytes(self):
+        conn = self._connect()
+        row = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        conn.close()
+        return row[0]
+
+    def get(self, url):
+        """Returns (body, etag, last_modified, fresh) or None."""
+        with self.lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT body, etag, last_modified, expires_at FROM responses WHERE url = ?", (url,)).fetchone()
+            if row:
+                self.accessed[url] = time.time()
+                if time.time() - self.accessed_flushed >= config.RESPONSE_CACHE_ACCESS_FLUSH:
+                    self._flush_access(conn)
+                    conn.commit()
+            conn.close()
+        if not row: return None
+        return row[0], row[1], row[2], time.time() < row[3]
+
+    def put(self, url, body, ttl, etag=None, last_modified=None):
+        now = time.time()
+        size = len(body)
+        if size > self.max_bytes: return
+        with self.lock:
+            conn = self._connect()
+            old = conn.execute("SELECT size FROM responses WHERE url = ?", (url,)).fetchone()
+            conn.execute('''
+                INSERT OR REPLACE INTO responses (url, body, etag, last_modified, expires_at, last_access, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (url, body, etag, last_modified, now + ttl, now, size))
+            self.total_bytes += size - (old[0] if old else 0)
+            self._flush_access(conn)
+            self._evict(conn)
+            conn.commit()
+            conn.close()
+
+    def touch(self, url, ttl):
+        """304 Not Modified: the stored body is good for another ttl."""
+        now = time.time()
+        with self.lock:
+            conn = self._connect()
+            conn.execute("UPDATE responses SET expires_at = ?, last_access = ? WHERE url = ?", (now + ttl, now, url))
+            conn.commit()
+            conn.close()
+
+    def _flush_access(self, conn):
+        """Writes the buffered access times (caller holds the lock and commits)."""
+        if self.accessed:
+            conn.executemany("UPDATE responses SET last_access = ? WHERE url = ? AND last_access < ?",
+                             [(t, url, t) for url, t in self.accessed.items()])
+        self.accessed = {}
+        self.accessed_flushed = time.time()
+
+    def _evict(self, conn):
+        """Drops least recently used entries until back under budget (caller holds the lock)."""
+        if self.total_bytes <= self.max_bytes: return
+        target = self.max_bytes * 0.9 # Hysteresis: don't evict on every put
+        rows = conn.execute("SELECT url, size FROM responses ORDER BY last_access ASC").fetchall()
+        victims = []
+        for url, size in rows:
+            if self.total_bytes <= target: break
+            victims.append((url,))
+            self.total_bytes -= size
+        conn.executemany("DELETE FROM responses WHERE url = ?", victims)
+        self.stats["evicted"] += len(victims)
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def get_stats(self):
+        with self.lock:
+            snap = dict(self.stats)
+        lookups = snap["hits"] + snap["misses"]
+        snap["hit_rate"] = snap["hits"] / lookups if lookups else 0.0
+        snap["bytes"] = self.total_bytes
+        return snap
+
+    def clear(self):
+        with self.lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM responses")
+            conn.commit()
+            conn.close()
+            self.total_bytes = 0
+            self.accessed = {}
@@ -0,0 +1,174 @@
+import os
+import json
+import tempfile
+import threading
+import urllib.parse
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+from services import http_client
+from services.mtg_service import MTGService
+from data.db_manager import DBManager
+from core.batch_identifier import BatchIdentifier
+from fixtures import card
+
+# Minimal local catalog served by the stand-in
+CARDS = {
+    "lightning bolt": {"id": "b1", "name": "Lightning Bolt"},
+    "counterspell": {"id": "c1", "name": "Counterspell"},
+    "delver of secrets // insectile aberration": {"id": "d1", "name": "Delver of Secrets // Insectile Aberration"},
+}
+for i in range(60):
+    CARDS[f"pile card {i}"] = {"id": f"p{i}", "name": f"Pile Card {i}"}
+
+
+class StandInScryfall(BaseHTTPRequestHandler):
+    """Implements just /cards/collection, /cards/named?fuzzy= and /cards/search like Scryfall."""
+    calls = []
+
+    def _send(self, status, body):
+        raw = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _lookup(self, name):
+        name = name.lower()
+        for key, card in CARDS.items():
+            if name == key or name in key.split(" // "):
+                return card
+        return None
+
+    def do_POST(self):
+        StandInScryfall.calls.append("collection")
+        length = int(self.headers.get("Content-Length", 0))
+        identifiers = json.loads(self.rfile.read(length))["identifiers"]
+        if len(identifiers) > 75:
+            return self._send(422, {"object": "error"})
+        data, not_found = [], []
+        for ident in identifiers:
+            if "id" in ident:
+                card = next((c for c in CARDS.values() if c["id"] == ident["id"]), None)
+            else:
+                card = self._lookup(ident["name"])
+            if card: data.append(card)
+            else: not_found.append(ident)
+        self._send(200, {"object": "list", "data": data, "not_found": not_found})
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+        if self.path.startswith("/cards/search"):
+            StandInScryfall.calls.append("search")
+            name = query["q"][0].split('"')[1] # !"Card Name" unique:prints ...
+            if name.lower() == "server down": return self._send(503, {"object": "error"})
+            card = self._lookup(name)
+            if card: self._send(200, {"object": "list", "data": [card], "has_more": False})
+            else: self._send(404, {"object": "error"})
+            return
+        StandInScryfall.calls.append("named")
+        fuzzy = query.get("fuzzy", [""])[0].lower().replace("0", "o")
+        card = self._lookup(fuzzy)
+        if card: self._send(200, card)
+        else: self._send(404, {"object": "error"})
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def stand_in():
+    """Serves the stand-in and points MTGService at it; config and the shared client are restored after."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInScryfall)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    overrides = {
+        "API_BASE_URL": f"http://127.0.0.1:{server.server_port}",
+        # Keep the stand-in fast: no real rate limit needed against localhost
+        "API_RATE_LIMIT": 0.0,
+        "API_BACKOFF_BASE": 0.0,
+        # Every lookup must reach the stand-in, not a local bulk mirror or the disk cache
+        "USE_LOCAL_MIRROR": False,
+        "RESPONSE_CACHE_ENABLED": False,
+    }
+    saved = {name: getattr(config, name) for name in overrides}
+    saved_client = http_client._client
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    http_client._client = None # The shared client reads the rate limit and cache switch once
+    StandInScryfall.calls = []
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        for name, value in saved.items():
+            setattr(config, name, value)
+        http_client._client = saved_client
+
+
+def test_pile_uses_one_request():
+    with stand_in():
+        names = [f"Pile Card {i}" for i in range(60)]
+        found, missing = MTGService().get_cards_by_names(names)
+        assert len(found) == 60 and not missing
+        assert StandInScryfall.calls == ["collection"]
+
+
+def test_chunks_at_batch_limit():
+    with stand_in():
+        names = [f"Pile Card {i}" for i in range(60)] + [f"Unknown {i}" for i in range(30)]
+        found, missing = MTGService().get_cards_by_names(names)
+        assert len(found) == 60 and len(missing) == 30
+        assert StandInScryfall.calls == ["collection", "collection"]
+
+
+def test_maps_faces_and_reports_misses():
+    with stand_in():
+        found, missing = MTGService().get_cards_by_names(["lightning bolt", "Delver of Secrets", "C0unterspell"])
+        assert found["lightning bolt"]["id"] == "b1"
+        assert found["delver of secrets"]["id"] == "d1"
+        assert missing == ["C0unterspell"]
+
+        # The Librarian falls back to fuzzy for leftovers only
+        assert MTGService().get_card_by_name(missing[0])["id"] == "c1"
+        assert StandInScryfall.calls == ["collection", "named"]
+
+
+def test_printings_by_id_share_requests():
+    with stand_in():
+        found = MTGService().get_cards_by_ids([f"p{i}" for i in range(60)] + ["b1", "b1", "nope"])
+        assert len(found) == 61 and found["b1"]["name"] == "Lightning Bolt"
+        assert StandInScryfall.calls == ["collection"]
+
+
+def test_failed_search_is_not_an_empty_answer():
+    with stand_in():
+        api = MTGService()
+        assert [c["id"] for c in api.search_all_printings("Lightning Bolt")] == ["b1"]
+        assert api.search_all_printings("No Such Card") == []
+        assert api.search_all_printings("Server Down") is None
+
+
+def test_batch_job_retries_what_it_could_not_fetch():
+    with stand_in(), tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, "inventory.db"))
+        for i, name in enumerate(("Server Down", "No Such Card")):
+            db.add_to_catalog(card(f"x{i}", name), as_default=True)
+            db.update_scan(f"T{i}", name, "")
+        job = BatchIdentifier.__new__(BatchIdentifier) # No matcher needed: nothing gets matched
+        job.db, job.api, job.workers, job.progress, job._stop = db, MTGService(), 1, None, False
+
+        assert job.run() == (1, 2)
+        checked = dict(db._conn().execute("SELECT tracker_id, printing_checked IS NOT NULL FROM collection"))
+        assert checked == {"T0": 0, "T1": 1} # The failed search is left for the next run
+        assert [row[1] for row in db.get_unidentified_scans()] == ["server down"]
+
+
+if __name__ == "__main__":
+    test_pile_uses_one_request()
+    test_chunks_at_batch_limit()
+    test_maps_faces_and_reports_misses()
+    test_printings_by_id_share_requests()
+    test_failed_search_is_not_an_empty_answer()
+    test_batch_job_retries_what_it_could_not_fetch()
+    print("Batch lookup tests passed.")
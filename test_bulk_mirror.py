@@ -0,0 +1,41 @@
+import io
+import json
+from data.bulk_mirror import iter_json_array
+
+
+SAMPLES = (
+    '[{"id": "a", "name": "Fire // Ice"}, {"id": "b", "prices": {"usd": "1.50"}}]',
+    '[{"text": "[bracketed] {braced} \\"quoted\\" \\\\ ]"}, "a ] string", "\\u00e9t\\u00e9"]',
+    '[12345, 678, -9, 1.5, 2e10, -3.25E-4, 0, true, false, null]',
+    ' [\n  [1, [2, 3]],\n  {"nested": [{"deep": []}]} ,\n  [] \n] ',
+    '[]',
+)
+
+
+def test_every_chunk_size_yields_the_same_elements():
+    for text in SAMPLES:
+        expected = json.loads(text)
+        for chunk_size in range(1, len(text) + 2):
+            got = list(iter_json_array(io.StringIO(text), chunk_size=chunk_size))
+            assert got == expected, (text, chunk_size, got)
+
+
+def test_numbers_across_chunk_boundaries():
+    assert list(iter_json_array(io.StringIO("[12345, 678]"), chunk_size=2)) == [12345, 678]
+    assert list(iter_json_array(io.StringIO("[1.5,2e3]"), chunk_size=2)) == [1.5, 2000.0]
+
+
+def test_rejects_non_arrays():
+    for text in ('{"object": true}', '[{"truncated": '):
+        try:
+            list(iter_json_array(io.StringIO(text), chunk_size=4))
+            assert False, f"{text!r} should not parse"
+        except ValueError: # JSONDecodeError is one
+            pass
+
+
+if __name__ == "__main__":
+    test_every_chunk_size_yields_the_same_elements()
+    test_numbers_across_chunk_boundaries()
+    test_rejects_non_arrays()
+    print("Bulk parser tests passed.")
@@ -0,0 +1,49 @@
+import os
+import tempfile
+from data.db_manager import DBManager
+from core.collection_io import export_collection, import_collection
+from fixtures import card
+
+
+class OfflineAPI:
+    """Every printing in these exports is already catalogued: the importer must not ask Scryfall."""
+    def __getattr__(self, name):
+        raise AssertionError(f"unexpected API call: {name}")
+
+
+def collection(db):
+    return db._conn().execute(
+        "SELECT tracker_id, normalized_name, scryfall_id FROM collection ORDER BY tracker_id").fetchall()
+
+
+def catalogue(db):
+    for i, usd in enumerate(("2.00", "0.50")):
+        db.add_to_catalog(card(f"p{i}", f"Card {i}", usd), as_default=True)
+
+
+def test_reimporting_an_export_into_the_same_db_changes_nothing():
+    for fmt in ("csv", "jsonl"):
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DBManager(os.path.join(tmp, "inventory.db"))
+            catalogue(db)
+            for t in range(5):
+                db.update_scan(f"T{t}", f"Card {t % 2}", "")
+            before = collection(db)
+
+            path = os.path.join(tmp, f"export.{fmt}")
+            assert export_collection(db, path, fmt)[0] == 5
+            imported, unresolved, _ = import_collection(db, path, fmt, api=OfflineAPI())
+            assert (imported, unresolved) == (0, [])
+            assert collection(db) == before
+            assert db.get_collection_summary() == (5, 7.0)
+
+            # Into a fresh database the same file restores every scan under its own ID
+            fresh = DBManager(os.path.join(tmp, "restored.db"))
+            catalogue(fresh)
+            assert import_collection(fresh, path, fmt, api=OfflineAPI())[0] == 5
+            assert collection(fresh) == before
+
+
+if __name__ == "__main__":
+    test_reimporting_an_export_into_the_same_db_changes_nothing()
+    print("Import/export tests passed.")
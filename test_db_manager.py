@@ -0,0 +1,302 @@
+import os
+import random
+import tempfile
+from datetime import date, timedelta
+import config
+from data.db_manager import DBManager, day_number
+from core.price_refresh import refresh_prices
+from data.write_behind import WriteBehindQueue
+from fixtures import card
+
+
+LEA_BOLT = card("lea", "Lightning Bolt", "500.00", "lea", "1993-08-05")
+M10_BOLT = card("m10", "Lightning Bolt", "1.00", "m10", "2009-07-17")
+
+
+def scan_printing(db, tracker_id):
+    return db._conn().execute("SELECT scryfall_id FROM collection WHERE tracker_id = ?", (tracker_id,)).fetchone()[0]
+
+
+def triggers(db):
+    return {name for (name,) in db._conn().execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+
+
+class BaselineDB(DBManager):
+    """A database as the first release left it: the version-0 schema, no migrations."""
+    MIGRATIONS = ()
+
+
+def test_migrates_a_baseline_database():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "inventory.db")
+        old = BaselineDB(path)
+        conn = old._conn()
+        conn.executemany('''INSERT INTO catalog (normalized_name, scryfall_id, display_name, set_code, rarity,
+                                                type_line, colors, artist, price_usd)
+                              VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''', [
+            ("lightning bolt", "m10", "Lightning Bolt", "m10", "common", "Instant", '["R"]', "Christopher Rush", 1.0),
+            ("counterspell", None, "Counterspell", "lea", "uncommon", "Instant", '["U"]', "Mark Poole", 2.5),
+        ])
+        conn.executemany("INSERT INTO collection (tracker_id, normalized_name, scryfall_id) VALUES (?, ?, ?)", [
+            ("T1", "lightning bolt", None),
+            ("T2", "lightning bolt", "lea-bolt"), # Identified as a printing the old catalog never stored
+            ("T3", "counterspell", None),
+        ])
+        conn.execute("INSERT INTO aliases (input_text, real_name) VALUES ('lightnlng bo1t', 'lightning bolt')")
+        conn.commit()
+        assert old.get_collection_summary() == (3, 4.5) # Legacy triggers
+        old.close()
+
+        db = DBManager(path)
+        assert db.schema_version() == DBManager.MIGRATIONS[-1][0]
+        assert [scan_printing(db, t) for t in ("T1", "T2", "T3")] == ["m10", "m10", "legacy:counterspell"]
+        assert db.get_catalog_card("Counterspell")["price_usd"] == 2.5
+        assert db.get_alias("Lightnlng Bo1t") == "lightning bolt"
+
+        assert db.get_collection_summary() == (3, 4.5)
+        assert db.get_breakdown("color") == {"R": (2, 2.0), "U": (1, 2.5)}
+        assert db.get_breakdown("rarity") == {"common": (2, 2.0), "uncommon": (1, 2.5)}
+        assert [r["price_usd"] for r in db.get_top_cards()] == [2.5, 1.0, 1.0]
+        assert [r["tracker_id"] for r in db.get_cards_by_filter()] == ["T3", "T1", "T2"]
+        assert db.search("rush")[1] == (1, 0) # Artist, through the FTS index
+        assert db._conn().execute("SELECT COUNT(*) FROM price_history").fetchone()[0] == 2 # Seeded
+        assert db.get_value_history() == [(date.today(), 4.5)]
+
+        db.update_scan("T4", "Counterspell", "") # Still writable the new way
+        assert db.get_collection_summary() == (4, 7.0)
+        assert db._conn().execute("PRAGMA foreign_key_list(collection)").fetchall() == []
+        assert triggers(db) == triggers(DBManager(os.path.join(tmp, "fresh.db")))
+
+        db.close()
+        assert DBManager(path).get_collection_summary() == (4, 7.0) # Reopening migrates nothing
+
+
+def aggregates(db):
+    """The trigger-maintained rows, in a form comparable with a full rebuild."""
+    conn = db._conn()
+    count, value = conn.execute("SELECT card_count, total_value FROM collection_summary").fetchone()
+    breakdown = {(dim, key): (n, round(v, 2)) for dim, key, n, v in conn.execute(
+        "SELECT dimension, key, card_count, total_value FROM collection_breakdown WHERE card_count != 0")}
+    top = sorted(p for (p,) in conn.execute("SELECT price_usd FROM collection_top")) # Ties may pick other scans
+    return count, round(value, 2), breakdown, top
+
+
+def test_aggregate_triggers_match_a_rebuild():
+    colors = (["W"], ["U"], ["B", "R"], [], ["G"])
+    for seed in range(5):
+        rng = random.Random(seed)
+        with tempfile.TemporaryDirectory() as tmp:
+            db = DBManager(os.path.join(tmp, "inventory.db"))
+            printings = {} # name -> [scryfall_id]
+
+            def catalogue(name, sid, **extra):
+                price = rng.choice([None, f"{rng.randint(1, 3000) / 100:.2f}"])
+                data = card(sid, name, price, rng.choice(["lea", "m10", "2xm"]), **extra)
+                data["rarity"] = rng.choice(["common", "uncommon", "rare", "mythic"])
+                data["colors"] = rng.choice(colors)
+                db.add_to_catalog(data, as_default=rng.random() < 0.3)
+                printings.setdefault(name, []).append(sid)
+
+            for i in range(6):
+                for j in range(2):
+                    catalogue(f"Card {i}", f"p{i}-{j}")
+
+            for step in range(300):
+                trackers = [t for (t,) in db._conn().execute("SELECT tracker_id FROM collection")]
+                op = rng.random()
+                if op < 0.35 or not trackers: # New scan
+                    db.update_scan(f"T{step}", rng.choice(list(printings)), "")
+                elif op < 0.5: # Rescanned, possibly as another card
+                    db.update_scan(rng.choice(trackers), rng.choice(list(printings)), "")
+                elif op < 0.6:
+                    db.delete_scan(rng.choice(trackers))
+                elif op < 0.75: # Inspector picks a printing (not necessarily of the scanned name)
+                    db.set_scan_printing(rng.choice(trackers), rng.choice(sum(printings.values(), [])), 0.9)
+                elif op < 0.9: # Price refresh; some printings drop their price
+                    ids = rng.sample(sum(printings.values(), []), 4)
+                    db.record_prices([(sid, rng.choice([None, rng.randint(1, 3000) / 100]), None) for sid in ids])
+                else: # Newly catalogued printing, or a refetch that changes rarity, set and colours
+                    name = rng.choice(list(printings))
+                    catalogue(name, rng.choice(printings[name] + [f"new-{step}"]))
+                    printings[name] = list(dict.fromkeys(printings[name]))
+
+                if step % 25 == 24:
+                    maintained = aggregates(db)
+                    db.reconcile_collection_summary() # Full GROUP BYs via _rebuild_aggregates
+                    assert maintained == aggregates(db), f"seed {seed}, step {step}"
+
+
+def test_keyset_pages_follow_the_full_order():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, "inventory.db"))
+        prices = [None, "3.00", "1.50", None, "3.00", "0.25", "1.50", "3.00"] # Ties and an unpriced tail
+        for i, usd in enumerate(prices):
+            data = card(f"p{i}", f"Card {i}", usd)
+            data["rarity"] = "rare" if i % 2 else "common"
+            db.add_to_catalog(data, as_default=True)
+            for copy in range(3):
+                db.update_scan(f"T{i}-{copy}", data["name"], "")
+
+        for filter_type, filter_value in ((None, None), ("rarity", "rare"), ("color", "R")):
+            everything = db.get_cards_by_filter(filter_type, filter_value, limit=None)
+            # Price desc, ties by scan id, unpriced last
+            assert everything == sorted(everything, key=lambda r: (r["price_usd"] is None, -(r["price_usd"] or 0), r["scan_id"]))
+            for limit in (1, 4, 7):
+                paged, after = [], None
+                while True:
+                    rows = db.get_cards_by_filter(filter_type, filter_value, limit=limit, after=after)
+                    paged += rows
+                    if len(rows) < limit: break
+                    after = (rows[-1]["price_usd"], rows[-1]["scan_id"])
+                assert paged == everything, (filter_type, limit)
+        assert len(db.get_cards_by_filter(limit=None)) == 24
+
+
+def test_price_snapshots_record_the_collection_value():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, "inventory.db"))
+        db.add_to_catalog(M10_BOLT, as_default=True)
+        db.add_to_catalog(LEA_BOLT)
+        db.update_scan("T1", "Lightning Bolt", "")
+        db.update_scan("T2", "Lightning Bolt", "")
+        db.set_scan_printing("T2", "lea", 0.9)
+
+        today = date.today()
+        for days_ago, m10, lea in ((30, 2.0, 400.0), (20, 1.5, None), (10, 1.0, 500.0)):
+            db.record_prices([("m10", m10, None), ("lea", lea, None)])
+            db.snapshot_prices(today - timedelta(days=days_ago))
+        db.update_scan("T3", "Lightning Bolt", "") # Bought after the last snapshot: not in its value
+
+        assert db.get_value_history() == [(today - timedelta(days=30), 402.0),
+                                          (today - timedelta(days=20), 1.5),
+                                          (today - timedelta(days=10), 501.0)]
+        assert db.get_value_history(points=2)[-1] == (today - timedelta(days=10), 501.0) # Newest always kept
+        assert db.get_value_history(days=15) == [(today - timedelta(days=10), 501.0)]
+
+        # A mirror last updated 10 days ago: its prices are filed under that day, but
+        # the value row is today's collection, not a rewrite of day -10's
+        mirror = StaleMirror(today - timedelta(days=10), {"m10": (3.0, None), "lea": (500.0, None)})
+        refresh_prices(db, mirror)
+        assert db.get_value_history(days=15) == [(today - timedelta(days=10), 501.0), (today, 506.0)]
+        assert db._conn().execute("SELECT usd_cents FROM price_history WHERE day = ? AND scryfall_id = 'm10'",
+                                  (day_number(today - timedelta(days=10)),)).fetchone() == (300,)
+
+
+class StaleMirror:
+    """Just the BulkMirror calls refresh_prices makes."""
+    def __init__(self, updated, prices):
+        self.updated, self.prices = updated, prices
+
+    def is_populated(self):
+        return True
+
+    def get_meta(self, key):
+        return self.updated.isoformat() + "T09:00:00+00:00"
+
+    def get_prices(self, ids):
+        return {sid: self.prices[sid] for sid in ids if sid in self.prices}
+
+
+def goblin_db(tmp):
+    """7 owned Goblin-named printings, then 5 other cards whose rules text mentions goblins."""
+    db = DBManager(os.path.join(tmp, "inventory.db"))
+    for i in range(12):
+        data = card(f"g{i}", f"Goblin {i}" if i < 7 else f"Warchief {i}")
+        data["oracle_text"] = "Other Goblins you control get +1/+0." if i >= 7 else ""
+        db.add_to_catalog(data, as_default=True)
+        db.update_scan(f"T{i}", data["name"], "")
+    return db
+
+
+def test_search_pages_reuse_the_first_counts():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = goblin_db(tmp)
+        everything, counts = db.search("goblin", 100)
+        assert counts == (12, 7)
+        assert {r["tracker_id"] for r in everything[:7]} == {f"T{i}" for i in range(7)} # Name hits first
+
+        paged, first = [], None
+        for offset in range(0, 12, 5):
+            rows, got = db.search("goblin", 5, offset, first)
+            first = first or got
+            assert got == counts
+            paged += rows
+        assert paged == everything
+
+
+def test_search_count_is_capped():
+    cap = config.SEARCH_COUNT_MAX
+    config.SEARCH_COUNT_MAX = 5
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = goblin_db(tmp)
+            rows, counts = db.search("goblin", 4)
+            assert counts == (6, 6) # "5+", for both parts
+            more, _ = db.search("goblin", 4, 4, counts)
+            assert len(rows + more) == 7 # The capped name part runs on past the cap
+            assert all(r["display_name"].startswith("Goblin") for r in rows + more)
+    finally:
+        config.SEARCH_COUNT_MAX = cap
+
+
+def test_search_survives_vacuum():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, "inventory.db"))
+        for i in range(50):
+            db.add_to_catalog(card(f"x{i}", f"Filler {i}"))
+        db.add_to_catalog(card("s1", "Shivan Dragon"), as_default=True)
+        db.add_to_catalog(card("s2", "Shivan Dragonlord"), as_default=True)
+        db.update_scan("T1", "Shivan Dragonlord", "")
+        db.update_scan("T2", "Shivan Dragon", "")
+        db._conn().execute("DELETE FROM catalog WHERE scryfall_id LIKE 'x%'")
+        db._conn().commit()
+        # Index rows mirror a declared INTEGER PRIMARY KEY, which VACUUM may not renumber
+        assert ("id", "INTEGER", 1) in [(r[1], r[2], r[5]) for r in db._conn().execute("PRAGMA table_info(catalog)")]
+        db._conn().execute("VACUUM")
+
+        rows, counts = db.search("shivan drag")
+        assert counts == (2, 2)
+        assert [r["display_name"] for r in rows] == ["Shivan Dragon", "Shivan Dragonlord"] # Closest name first
+
+
+def test_name_lookup_sets_the_default_printing():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, "inventory.db"))
+        db.add_to_catalog(LEA_BOLT) # e.g. a scan identified as Alpha
+        assert db.get_catalog_card("Lightning Bolt")["scryfall_id"] == "lea" # Only printing known so far
+
+        db.add_to_catalog(M10_BOLT, as_default=True) # The name lookup's answer
+        db.add_to_catalog(LEA_BOLT) # Identified again: stays catalogued, not the default
+        assert db.get_catalog_card("Lightning Bolt")["scryfall_id"] == "m10"
+
+        db.update_scan("T1", "Lightning Bolt", "")
+        assert scan_printing(db, "T1") == "m10"
+        assert db.get_collection_summary() == (1, 1.0)
+
+
+def test_name_lookup_sets_the_default_printing_queued():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, "inventory.db"))
+        db.add_to_catalog(LEA_BOLT)
+        db.writer = WriteBehindQueue(db)
+        db.add_to_catalog(M10_BOLT, as_default=True)
+        db.add_to_catalog(LEA_BOLT)
+        db.update_scan("T1", "Lightning Bolt", "")
+        assert db.get_catalog_card("Lightning Bolt")["scryfall_id"] == "m10" # Read through the queue
+
+        db.writer.flush()
+        assert db.get_catalog_card("Lightning Bolt")["scryfall_id"] == "m10"
+        assert scan_printing(db, "T1") == "m10"
+
+
+if __name__ == "__main__":
+    test_migrates_a_baseline_database()
+    test_aggregate_triggers_match_a_rebuild()
+    test_keyset_pages_follow_the_full_order()
+    test_price_snapshots_record_the_collection_value()
+    test_search_pages_reuse_the_first_counts()
+    test_search_count_is_capped()
+    test_search_survives_vacuum()
+    test_name_lookup_sets_the_default_printing()
+    test_name_lookup_sets_the_default_printing_queued()
+    print("Database tests passed.")
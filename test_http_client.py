@@ -0,0 +1,93 @@
+import os
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+from services.http_client import HttpClient, TokenBucket
+
+
+class StandInServer(BaseHTTPRequestHandler):
+    """/busy answers 429 (Retry-After) once, then 200; /card is an ETag'd resource."""
+    calls = []
+
+    def do_GET(self):
+        StandInServer.calls.append((self.path, self.headers.get("If-None-Match")))
+        if self.path == "/busy" and len(StandInServer.calls) == 1:
+            self.send_response(429)
+            self.send_header("Retry-After", "0.3")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path == "/card" and self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = b'{"object": "card"}'
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def stand_in(tmp):
+    """Serves StandInServer; yields (HttpClient, base URL) with a cache in tmp. config is restored after."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    overrides = {"API_RATE_LIMIT": 0.01, "API_RATE_BURST": 4, "API_BACKOFF_BASE": 0.0,
+                 "RESPONSE_CACHE_ENABLED": True, "RESPONSE_CACHE_PATH": os.path.join(tmp, "http_cache.db")}
+    saved = {name: getattr(config, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    StandInServer.calls = []
+    try:
+        yield HttpClient(), f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+
+def test_token_bucket_bursts_then_spaces_calls():
+    bucket = TokenBucket(0.05, 3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0] # The burst
+    assert 0.03 < bucket.acquire() < 0.2 # Then one token per interval
+
+    bucket.drain(0.2) # Server said back off
+    start = time.monotonic()
+    bucket.acquire()
+    assert time.monotonic() - start >= 0.2
+
+
+def test_retry_after_is_honoured():
+    with tempfile.TemporaryDirectory() as tmp, stand_in(tmp) as (client, base):
+        start = time.monotonic()
+        response = client.get(f"{base}/busy")
+        assert response.status_code == 200
+        assert time.monotonic() - start >= 0.3 # Waited what the server asked, not the (zero) backoff
+        stats = client.get_stats()
+        assert (stats["throttled"], stats["retries"], stats["failures"]) == (1, 1, 0)
+
+
+def test_stale_entries_are_revalidated_not_refetched():
+    with tempfile.TemporaryDirectory() as tmp, stand_in(tmp) as (client, base):
+        url = f"{base}/card"
+        assert client.get(url, cache_ttl=0).json() == {"object": "card"} # Cached, already stale
+        assert client.get(url, cache_ttl=60).json() == {"object": "card"} # 304: body from disk
+        assert client.get(url, cache_ttl=60).json() == {"object": "card"} # Fresh again: no request
+        assert StandInServer.calls == [("/card", None), ("/card", '"v1"')]
+        cache = client.cache.get_stats()
+        assert (cache["misses"], cache["revalidated"], cache["hits"]) == (1, 1, 1)
+
+
+if __name__ == "__main__":
+    test_token_bucket_bursts_then_spaces_calls()
+    test_retry_after_is_honoured()
+    test_stale_entries_are_revalidated_not_refetched()
+    print("HTTP client tests passed.")
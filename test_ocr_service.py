@@ -0,0 +1,21 @@
+from services.ocr_service import parse_set_line
+
+
+def test_collector_lines():
+    assert parse_set_line("0123/280 R DMU • EN") == ("dmu", "123")
+    assert parse_set_line("0123/280 R DMU EN Chris Rahn") == ("dmu", "123") # Artist after the language tag
+    assert parse_set_line("123/280 C M21 • EN") == ("m21", "123")
+    assert parse_set_line("045 MH2 EN") == ("mh2", "45") # No set size
+    assert parse_set_line("7 LEA") == ("lea", "7") # No language tag
+
+
+def test_misreads():
+    assert parse_set_line("O45/271 U NEO • EN") == ("neo", "45") # Letter O for a zero
+    assert parse_set_line("0123/280 R") == (None, None) # No set code
+    assert parse_set_line("Lightning Bolt") == (None, None)
+
+
+if __name__ == "__main__":
+    test_collector_lines()
+    test_misreads()
+    print("OCR parsing tests passed.")
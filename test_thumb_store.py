@@ -0,0 +1,43 @@
+import os
+import time
+import sqlite3
+import tempfile
+from data.thumb_store import ThumbStore
+
+
+def stored_access(store, key):
+    conn = sqlite3.connect(store.db_path)
+    row = conn.execute("SELECT last_access FROM images WHERE key = ?", (key,)).fetchone()
+    conn.close()
+    return row[0]
+
+
+def test_reads_are_buffered_and_still_count_for_eviction():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ThumbStore(os.path.join(tmp, "images.db"), max_bytes=350)
+        for key in ("a", "b", "c"):
+            store.put(key, key.encode() * 100)
+            time.sleep(0.01)
+        written = stored_access(store, "a")
+
+        assert store.get_bytes("a") == b"a" * 100
+        assert store.load("missing") is None
+        assert stored_access(store, "a") == written # Read without a write transaction
+
+        store.put("d", b"d" * 100) # Over budget: buffered reads land before choosing victims
+        assert store.has("a") and store.has("d")
+        assert not store.has("b") # Least recently used, counting the read of "a"
+
+
+def test_store_runs_in_wal_mode():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ThumbStore(os.path.join(tmp, "images.db"))
+        conn = sqlite3.connect(store.db_path)
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        conn.close()
+
+
+if __name__ == "__main__":
+    test_reads_are_buffered_and_still_count_for_eviction()
+    test_store_runs_in_wal_mode()
+    print("Image store tests passed.")
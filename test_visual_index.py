@@ -0,0 +1,60 @@
+import tempfile
+import numpy as np
+import config
+from core.visual_index import VisualIndex, dhash_bits, CHUNKS
+
+
+def flipped(packed, bits_per_chunk):
+    """Copy of a packed hash with the given number of bits flipped in each 32-bit substring."""
+    bits = np.unpackbits(packed).reshape(CHUNKS, -1).copy()
+    for chunk, n in enumerate(bits_per_chunk):
+        bits[chunk, :n] ^= 1
+    return np.packbits(bits.reshape(-1))
+
+
+def built(tmp, entries):
+    index = VisualIndex(tmp)
+    index.build(entries)
+    return index.load()
+
+
+def test_recall_matches_the_probe_radius():
+    rng = np.random.default_rng(7)
+    target = np.packbits(rng.integers(0, 2, 256).astype(bool))
+    with tempfile.TemporaryDirectory() as tmp:
+        index = built(tmp, [("near", "Near", flipped(target, [3] * 7 + [2])),  # 23 bits: one chunk within 2
+                            ("far", "Far", flipped(target, [3] * 8))])          # 24 bits: no chunk within 2
+        assert VisualIndex.recall(2) == 23
+        assert [h['id'] for h in index.query(target[None, :], k=None, radius=2)] == ["near"]
+        hits = index.query(target[None, :], k=None, radius=3)
+        assert [(h['id'], h['dist']) for h in hits] == [("near", 23), ("far", 24)]
+
+
+def test_gap_check_sees_rivals_beyond_the_default_probe():
+    rng = np.random.default_rng(11)
+    image = rng.integers(0, 256, (64, 64, 3), dtype=np.uint8)
+    packed = np.packbits(dhash_bits(image))
+    top = flipped(packed, [2] * 6 + [3] * 2) # 18 bits
+    assert config.VISUAL_INDEX_PROBE_RADIUS == 2 and config.VISUAL_ID_MIN_GAP > 6
+
+    with tempfile.TemporaryDirectory() as tmp:
+        index = built(tmp, [("a1", "Alpha", top)])
+        hit = index.identify(image)
+        assert (hit['id'], hit['name'], hit['dist']) == ("a1", "Alpha", 18)
+
+    # A different card 24 bits out: only 6 bits behind, and no substring within radius 2
+    with tempfile.TemporaryDirectory() as tmp:
+        index = built(tmp, [("a1", "Alpha", top), ("b1", "Beta", flipped(packed, [3] * 8))])
+        assert index.identify(image) is None
+
+    # Many printings of the same card ahead of the rival don't hide it
+    with tempfile.TemporaryDirectory() as tmp:
+        same = [(f"a{i}", "Alpha", flipped(packed, [2] * 6 + [3] * 2)) for i in range(15)]
+        index = built(tmp, same + [("b1", "Beta", flipped(packed, [3] * 7 + [2]))])
+        assert index.identify(image) is None
+
+
+if __name__ == "__main__":
+    test_recall_matches_the_probe_radius()
+    test_gap_check_sees_rivals_beyond_the_default_probe()
+    print("Visual index tests passed.")
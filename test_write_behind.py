@@ -0,0 +1,110 @@
+import os
+import tempfile
+from data.db_manager import DBManager
+from data.write_behind import WriteBehindQueue
+from fixtures import card
+
+
+def queued_db(tmp):
+    """DBManager with a write-behind queue that only commits when the test calls flush()."""
+    db = DBManager(os.path.join(tmp, "inventory.db"))
+    db.writer = WriteBehindQueue(db) # Not started: no timer thread
+    return db
+
+
+def rows(db):
+    return db._conn().execute(
+        "SELECT tracker_id, normalized_name, local_image_path FROM collection ORDER BY tracker_id").fetchall()
+
+
+def test_repeated_writes_collapse_to_the_latest():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = queued_db(tmp)
+        db.add_to_catalog(card("b1", "Lightning Bolt"), as_default=True)
+        db.add_to_catalog(card("c1", "Counterspell"), as_default=True)
+        for i in range(5):
+            db.update_scan("T1", "Lightning Bolt", f"bolt_{i}.jpg")
+        db.update_scan("T1", "Counterspell", "counter.jpg")
+        db.update_scan("T2", "Lightning Bolt", "bolt.jpg")
+        assert rows(db) == [] # Nothing committed yet
+        assert len(db.writer.scans) == 2
+
+        assert db.writer.flush() == 9 # Every queued operation...
+        assert rows(db) == [("T1", "counterspell", "counter.jpg"), ("T2", "lightning bolt", "bolt.jpg")] # ...one row each
+        assert db.get_collection_summary() == (2, 2.0)
+        assert db.writer.flush() == 0
+
+
+def test_pending_writes_are_readable_before_the_flush():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = queued_db(tmp)
+        db.add_to_catalog(card("b1", "Lightning Bolt", "2.50"), as_default=True)
+        db.add_alias("Lightnlng Bo1t", "Lightning Bolt")
+        db.add_alias("xxxx", None)
+
+        assert db.get_catalog_card("lightning bolt")["price_usd"] == 2.5
+        assert db.get_printing("b1")["display_name"] == "Lightning Bolt"
+        assert db.get_alias("Lightnlng Bo1t") == "lightning bolt"
+        assert db.get_alias("xxxx") is False # Known miss, not "never seen"
+        assert db.get_alias("never seen") is None
+
+        db.writer.flush()
+        assert db.get_catalog_card("lightning bolt")["scryfall_id"] == "b1"
+        assert db.get_printing("b1")["price_usd"] == 2.5 and db.get_printing("b2") is None
+        assert db.get_alias("Lightnlng Bo1t") == "lightning bolt"
+
+
+def test_delete_and_superseded_images():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = queued_db(tmp)
+        db.add_to_catalog(card("b1", "Lightning Bolt"), as_default=True)
+        first, second = os.path.join(tmp, "first.jpg"), os.path.join(tmp, "second.jpg")
+        for path in (first, second):
+            open(path, "wb").close()
+
+        db.update_scan("T1", "Lightning Bolt", first)
+        db.update_scan("T1", "Lightning Bolt", second) # first.jpg never reaches the DB
+        db.update_scan("T2", "Lightning Bolt", "")
+        db.delete_scan("T2") # Inserted and deleted in the same batch
+        db.writer.flush()
+
+        assert rows(db) == [("T1", "lightning bolt", second)]
+        assert not os.path.exists(first) and os.path.exists(second)
+
+        db.delete_scan("T1")
+        db.writer.flush()
+        assert rows(db) == []
+        assert not os.path.exists(second) # Deleted scans take their image along
+        assert db.get_collection_summary() == (0, 0.0)
+
+
+def test_failed_flush_keeps_the_batch():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = queued_db(tmp)
+        db.add_to_catalog(card("b1", "Lightning Bolt"), as_default=True)
+        db.update_scan("T1", "Lightning Bolt", "old.jpg")
+
+        apply = db._apply_writes
+        def broken(*args):
+            raise RuntimeError("disk full")
+        db._apply_writes = broken
+        try:
+            db.writer.flush()
+            assert False, "flush should re-raise"
+        except RuntimeError:
+            pass
+        # Queued after the failure: wins over the failed batch's copy
+        db.update_scan("T1", "Lightning Bolt", "new.jpg")
+        assert db.get_catalog_card("lightning bolt") is not None
+
+        db._apply_writes = apply
+        assert db.writer.flush() == 3
+        assert rows(db) == [("T1", "lightning bolt", "new.jpg")]
+
+
+if __name__ == "__main__":
+    test_repeated_writes_collapse_to_the_latest()
+    test_pending_writes_are_readable_before_the_flush()
+    test_delete_and_superseded_images()
+    test_failed_flush_keeps_the_batch()
+    print("Write-behind tests passed.")
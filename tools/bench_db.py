@@ -0,0 +1,98 @@
+import sys
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+from datetime import datetime, timedelta
+
+# Add project root to path so we can import config if needed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.db_manager import DBManager, color_mask
+
+RARITIES = ("common", "uncommon", "rare", "mythic")
+COLORS = ('[]', '["W"]', '["U"]', '["B"]', '["R"]', '["G"]', '["U", "R"]', '["W", "B", "G"]')
+
+
+def populate(db, rows, names):
+    """Synthetic inventory: `names` catalog entries, `rows` scans spread across them."""
+    conn = db._conn()
+    rng = random.Random(42)
+    conn.executemany(
+        "INSERT INTO oracle (normalized_name, display_name, colors, color_mask, default_printing) VALUES (?, ?, ?, ?, ?)",
+        [(f"card {i}", f"Card {i}", colors, color_mask(json.loads(colors)), f"id-{i}")
+         for i, colors in enumerate(rng.choice(COLORS) for _ in range(names))])
+    conn.executemany(
+        "INSERT INTO catalog (scryfall_id, normalized_name, rarity, price_usd) VALUES (?, ?, ?, ?)",
+        [(f"id-{i}", f"card {i}", rng.choice(RARITIES),
+          round(rng.lognormvariate(-1, 1.5), 2) if rng.random() > 0.05 else None) for i in range(names)])
+    start = datetime(2024, 1, 1)
+    conn.executemany(
+        "INSERT INTO collection (tracker_id, normalized_name, scryfall_id, date_scanned, local_image_path) VALUES (?, ?, ?, ?, ?)",
+        [(f"T{i}", f"card {n}", f"id-{n}", (start + timedelta(seconds=i * 7)).isoformat(), "")
+         for i, n in enumerate(rng.randrange(names) for _ in range(rows))])
+    conn.commit()
+    db.reconcile_collection_summary() # Also refreshes planner statistics
+
+
+def time_query(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t) * 1000)
+    return statistics.median(samples)
+
+
+def run_suite(db, rows, repeat):
+    rng = random.Random(7)
+    tracker = lambda: f"T{rng.randrange(rows)}"
+    # Keyset cursor halfway down the leaderboard
+    middle = db.get_cards_by_filter('all', None, limit=rows // 2)[-1]
+    deep = (middle['price_usd'], middle['scan_id'])
+    suite = [
+        ("get_card_details", lambda: db.get_card_details(tracker())),
+        ("get_recent_scans(10)", lambda: db.get_recent_scans(10)),
+        ("filter rarity=rare (200)", lambda: db.get_cards_by_filter('rarity', 'rare', limit=200)),
+        ("leaderboard (200)", lambda: db.get_cards_by_filter('all', None, limit=200)),
+        ("leaderboard mid page (120)", lambda: db.get_cards_by_filter('all', None, limit=120, after=deep)),
+        ("get_dashboard_stats", db.get_dashboard_stats),
+        ("filter color=U (200)", lambda: db.get_cards_by_filter('color', 'U', limit=200)),
+        ("search 'card 12' (60)", lambda: db.search("card 12", 60)),
+        ("update_scan", lambda: db.update_scan(tracker(), "card 1", "")),
+        ("delete_scan", lambda: db.delete_scan(tracker())),
+    ]
+    return [(label, time_query(fn, repeat)) for label, fn in suite]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inventory DB query latencies with and without the migration indexes")
+    parser.add_argument("--rows", type=int, default=100_000, help="Collection rows")
+    parser.add_argument("--names", type=int, default=20_000, help="Distinct catalog cards")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per query (median reported)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DBManager(os.path.join(tmp, "bench.db"))
+        print(f"Populating {args.rows:,} scans / {args.names:,} cards (schema v{db.schema_version()})...")
+        populate(db, args.rows, args.names)
+
+        indexed = run_suite(db, args.rows, args.repeat)
+
+        # Same data without the v2 indexes, as on a pre-migration inventory.db
+        conn = db._conn()
+        for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_%'").fetchall():
+            conn.execute(f"DROP INDEX {name}")
+        conn.execute("ANALYZE")
+        conn.commit()
+        plain = run_suite(db, args.rows, args.repeat)
+
+    print(f"\n{'query':<28}{'no index':>12}{'indexed':>12}{'speedup':>10}")
+    for (label, before), (_, after) in zip(plain, indexed):
+        print(f"{label:<28}{before:>10.2f}ms{after:>10.2f}ms{before / max(after, 1e-6):>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import sys
+import os
+import time
+import argparse
+import logging
+
+# Add project root to path so we can import config if needed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from data.bulk_mirror import BulkMirror
+from data.fingerprint_store import FingerprintStore
+from core.visual_index import VisualIndex
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the whole-catalog visual index used for OCR-free identification")
+    parser.add_argument("--download", action="store_true",
+                        help="Fingerprint every paper printing in the mirror first (downloads missing thumbnails)")
+    parser.add_argument("--batch", type=int, default=500, help="Printings fingerprinted per batch")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+    mirror = BulkMirror()
+    if not mirror.is_populated():
+        print("Mirror is empty. Run tools/import_bulk.py first.")
+        return
+
+    start = time.time()
+    if args.download:
+        # Imported lazily: pulls in the image fetcher and its thread pool
+        from core.printing_matcher import PrintingMatcher
+        matcher = PrintingMatcher()
+        done = 0
+        for cards in mirror.iter_paper_cards(args.batch):
+            done += len(cards)
+            matcher.warm(cards)
+            rate = done / max(time.time() - start, 1e-6)
+            print(f"\r  {done:>8} printings fingerprinted  ({rate:,.0f}/s)", end="", flush=True)
+        print()
+
+    store = FingerprintStore()
+    hashes = dict(store.iter_hashes())
+    names = mirror.get_names(hashes.keys())
+    entries = ((sid, names[sid], packed) for sid, packed in hashes.items() if sid in names)
+    count = VisualIndex().build(entries)
+
+    print(f"Done: {count} printings indexed in {time.time() - start:.1f}s")
+    print(f"Index: {config.VISUAL_INDEX_DIR}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+import sys
+import os
+import argparse
+import logging
+
+# Add project root to path so we can import config if needed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.db_manager import DBManager
+from core.collection_io import export_collection, FORMATS
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the collection (streams, constant memory)")
+    parser.add_argument("path", help="Output file")
+    parser.add_argument("--format", choices=FORMATS, default="csv",
+                        help="csv/jsonl: one row per scan; moxfield/deckbox/arena: one row per printing with a count")
+    parser.add_argument("--images", action="store_true", help="Include local scan image paths (csv/jsonl)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+
+    def progress(rows, rate):
+        print(f"\r  {rows:>8} rows  ({rate:,.0f}/s)", end="", flush=True)
+
+    rows, elapsed = export_collection(DBManager(), args.path, args.format, args.images, progress)
+    print(f"\nDone: {rows} rows -> {args.path} in {elapsed:.1f}s ({rows / max(elapsed, 1e-6):,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import sys
+import os
+import time
+import argparse
+import logging
+
+# Add project root to path so we can import config if needed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from core.batch_identifier import BatchIdentifier
+
+def main():
+    parser = argparse.ArgumentParser(description="Identify the printing of every scanned card (resumable)")
+    parser.add_argument("--workers", type=int, default=config.BATCH_ID_WORKERS, help="Matcher processes")
+    parser.add_argument("--recheck", action="store_true", help="Also retry scans whose last match was unsure")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+
+    def progress(done, total, rate):
+        eta = (total - done) / rate if rate else 0
+        print(f"\r  {done:>6}/{total} scans  ({rate:,.1f}/s, ~{eta:.0f}s left)", end="", flush=True)
+
+    job = BatchIdentifier(workers=args.workers, progress=progress)
+    start = time.time()
+    try:
+        done, total = job.run(include_unsure=args.recheck)
+    except KeyboardInterrupt:
+        print("\nInterrupted. Finished groups are saved; run again to resume.")
+        return
+
+    print(f"\nDone: {done}/{total} scans identified in {time.time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
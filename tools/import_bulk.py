@@ -0,0 +1,37 @@
+import sys
+import os
+import time
+import argparse
+import logging
+
+# Add project root to path so we can import config if needed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from services.bulk_service import BulkDataService
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the local Scryfall bulk mirror")
+    parser.add_argument("--file", help="Import an already-downloaded bulk JSON (.json or .json.gz)")
+    parser.add_argument("--type", default=config.BULK_DATA_TYPE, help="default_cards or all_cards")
+    parser.add_argument("--force", action="store_true", help="Re-import even if Scryfall's updated_at hasn't changed")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    service = BulkDataService()
+    start = time.time()
+
+    def progress(n):
+        rate = n / max(time.time() - start, 1e-6)
+        print(f"\r  {n:>8} cards  ({rate:,.0f}/s)", end="", flush=True)
+
+    if args.file:
+        seen, written = service.import_file(args.file, args.type, progress=progress)
+    else:
+        seen, written = service.refresh(args.type, force=args.force, progress=progress)
+
+    print(f"\nDone: {seen} cards read, {written} rows written in {time.time() - start:.1f}s")
+    print(f"Mirror: {config.MIRROR_DB_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import sys
+import os
+import argparse
+import logging
+
+# Add project root to path so we can import config if needed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.db_manager import DBManager
+from core.collection_io import import_collection, FORMATS
+
+def main():
+    parser = argparse.ArgumentParser(description="Import cards into the collection (streams, batched inserts)")
+    parser.add_argument("path", help="Input file")
+    parser.add_argument("--format", choices=FORMATS, default="csv",
+                        help="csv/jsonl: our own exports; moxfield/deckbox: their CSV exports; arena: deck text")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format='%(message)s')
+
+    def progress(rows, rate):
+        print(f"\r  {rows:>8} rows  ({rate:,.0f}/s)", end="", flush=True)
+
+    db = DBManager()
+    rows, unresolved, elapsed = import_collection(db, args.path, args.format, progress=progress)
+    print(f"\nDone: {rows} rows imported in {elapsed:.1f}s ({rows / max(elapsed, 1e-6):,.0f} rows/s)")
+    if unresolved:
+        print(f"{len(unresolved)} entries matched no card:")
+        for entry in unresolved[:20]:
+            print(f"  {entry['count']}x {entry['name']} {entry.get('set_code') or ''} {entry.get('number') or ''}")
+        if len(unresolved) > 20: print(f"  ... and {len(unresolved) - 20} more")
+    db.reconcile_collection_summary()
+
+if __name__ == "__main__":
+    main()
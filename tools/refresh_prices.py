@@ -0,0 +1,29 @@
+import sys
+import os
+import argparse
+import logging
+
+# Add project root to path so we can import config if needed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.db_manager import DBManager
+from core.price_refresh import refresh_prices
+
+def main():
+    parser = argparse.ArgumentParser(description="Record today's prices for every catalogued printing from the bulk mirror")
+    parser.add_argument("--download", action="store_true", help="Refresh the bulk mirror from Scryfall first")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    def progress(done, rate):
+        print(f"\r  {done:>8} printings  ({rate:,.0f}/s)", end="", flush=True)
+
+    db = DBManager()
+    recorded, changed, elapsed = refresh_prices(db, download=args.download, progress=progress)
+    print(f"\nDone: {recorded} printings priced, {changed} changed in {elapsed:.1f}s")
+    count, value = db.reconcile_collection_summary()
+    print(f"Collection: {count} cards, ${value:,.2f}")
+
+if __name__ == "__main__":
+    main()